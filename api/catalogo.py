@@ -0,0 +1,346 @@
+"""
+Catálogo local de mangás (SQLite) para sortear o /rl sem chamar a API
+"""
+import asyncio
+import hashlib
+import json
+import random
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from api.models import MangaRecord
+from utils.constants import (
+    CATALOGO_TTL, CATALOGO_PAGE_INTERVAL, CATALOGO_REFRESH_INTERVAL, CATALOGO_RELOAD_INTERVAL
+)
+from utils.logger import setup_logger
+from utils.metrics import metrics
+
+logger = setup_logger()
+
+# Incrementada quando o formato ou o critério SFW das linhas muda; o catálogo é então reconstruído
+CATALOGO_VERSAO = 3
+
+class MangaCatalog:
+    """Catálogo local alimentado por um job de ingestão retomável da listagem /manga"""
+
+    def __init__(self, jikan, caminho, ttl=CATALOGO_TTL, intervalo_pagina=CATALOGO_PAGE_INTERVAL,
+                 intervalo_refresh=CATALOGO_REFRESH_INTERVAL, intervalo_recarga=CATALOGO_RELOAD_INTERVAL):
+        """
+        Inicializa o catálogo sem abrir o arquivo
+
+        Args:
+            jikan: Instância de JikanAPI usada pela ingestão e para revalidar entradas
+            caminho: Caminho do arquivo SQLite
+            ttl: Idade máxima (s) de uma entrada ou página antes de ser buscada de novo
+            intervalo_pagina: Pausa (s) entre páginas, para deixar a cota da API aos comandos
+            intervalo_refresh: Pausa (s) entre o fim de uma volta completa e a próxima
+            intervalo_recarga: Intervalo (s) entre verificações do arquivo quando outro processo ingere
+        """
+        self.jikan = jikan
+        self.caminho = Path(caminho)
+        self.ttl = ttl
+        self.intervalo_pagina = intervalo_pagina
+        self.intervalo_refresh = intervalo_refresh
+        self.intervalo_recarga = intervalo_recarga
+
+        self._conn = None
+        self._lock = threading.Lock()
+        self.task = None
+        self._ingerir = False
+
+        # Lista + índice para sorteio uniforme e remoção em O(1)
+        self._sfw_ids = []
+        self._posicao = {}
+        self._versao_dados = None
+
+        self.paginas_ingeridas = 0
+        self.paginas_inalteradas = 0
+        self.recargas = 0
+
+    async def start(self, ingerir=True):
+        """
+        Carrega os IDs SFW do disco e inicia o job de ingestão em background
+
+        Args:
+            ingerir: Se False, não ingere; o arquivo, mantido por outro processo, é
+                relido periodicamente sempre que for alterado
+        """
+        self._versao_dados, ids = await asyncio.to_thread(self._carregar_ids_sfw)
+        for mal_id in ids:
+            self._adicionar_sfw(mal_id)
+        logger.info(f"Catálogo local carregado com {len(self._sfw_ids)} mangás SFW")
+
+        if self.task is None or self.task.done():
+            self._ingerir = ingerir
+            self.task = asyncio.create_task(self._ingestao() if ingerir else self._recarga())
+
+    async def close(self):
+        """Para a ingestão (ou a recarga) e fecha o arquivo"""
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        await asyncio.to_thread(self._close)
+
+    async def amostrar(self, max_attempts=3):
+        """
+        Sorteia uniformemente um mangá SFW do catálogo
+
+        Entradas ausentes ou mais antigas que o TTL são revalidadas pela API.
+
+        Returns:
+            MangaRecord ou None: None se o catálogo estiver vazio ou as tentativas falharem
+        """
+        for _ in range(max_attempts):
+            if not self._sfw_ids:
+                metrics.log_counter("catalogo_vazio")
+                return None
+
+            mal_id = random.choice(self._sfw_ids)
+            linha = await asyncio.to_thread(self._ler, mal_id)
+
+            if linha is not None and time.time() - linha[1] <= self.ttl:
+                metrics.log_counter("catalogo_hit")
+                return MangaRecord.from_dict(json.loads(linha[0]))
+
+            metrics.log_counter("catalogo_stale")
+            manga = await self.jikan.fetch_manga_info(mal_id, return_full_data=True)
+            if manga is None:
+                continue
+
+            await asyncio.to_thread(self._gravar, [manga])
+            self._atualizar_sfw([manga])
+            if manga.is_sfw:
+                return manga
+
+        return None
+
+    def get_stats(self):
+        """Retorna estatísticas do catálogo"""
+        return {
+            "sfw_entries": len(self._sfw_ids),
+            "pages_ingested": self.paginas_ingeridas,
+            "pages_unchanged": self.paginas_inalteradas,
+            "reloads": self.recargas,
+            "ingesting": self._ingerir and self.task is not None and not self.task.done(),
+        }
+
+    async def _ingestao(self):
+        """Percorre a listagem página a página, retomando do cursor salvo e pulando páginas recentes"""
+        while True:
+            pagina = int(await asyncio.to_thread(self._ler_progresso, "proxima_pagina", 1))
+
+            try:
+                atualizada_em = await asyncio.to_thread(self._pagina_atualizada_em, pagina)
+                # Metade do TTL: a página é revisitada antes de suas entradas ficarem velhas
+                if atualizada_em is not None and time.time() - atualizada_em <= self.ttl / 2:
+                    # Página recente: avança sem gastar requisição
+                    await asyncio.to_thread(self._salvar_progresso, "proxima_pagina", pagina + 1)
+                    continue
+
+                resultado = await self.jikan.listar_mangas(pagina)
+                if resultado is None:
+                    await asyncio.sleep(self.intervalo_pagina * 10)
+                    continue
+
+                mangas, tem_proxima = resultado
+                if mangas:
+                    await self._ingerir_pagina(pagina, mangas, final=not tem_proxima)
+
+                if tem_proxima:
+                    await asyncio.to_thread(self._salvar_progresso, "proxima_pagina", pagina + 1)
+                    await asyncio.sleep(self.intervalo_pagina)
+                else:
+                    await asyncio.to_thread(self._salvar_progresso, "proxima_pagina", 1)
+                    logger.info(f"Ingestão do catálogo concluída ({len(self._sfw_ids)} mangás SFW)")
+                    await asyncio.sleep(self.intervalo_refresh)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                metrics.log_error("catalogo_ingest_error")
+                logger.error(f"Erro na ingestão do catálogo (página {pagina}): {e}")
+                await asyncio.sleep(self.intervalo_pagina * 10)
+
+    async def _recarga(self):
+        """Relê os IDs SFW quando outro processo grava no arquivo (PRAGMA data_version muda)"""
+        while True:
+            await asyncio.sleep(self.intervalo_recarga)
+            try:
+                versao = await asyncio.to_thread(self._ler_versao_dados)
+                if versao == self._versao_dados:
+                    continue
+
+                self._versao_dados, ids = await asyncio.to_thread(self._carregar_ids_sfw)
+                self._sfw_ids = list(ids)
+                self._posicao = {mal_id: posicao for posicao, mal_id in enumerate(self._sfw_ids)}
+                self.recargas += 1
+                metrics.set_gauge("catalogo_sfw_entries", len(self._sfw_ids))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                metrics.log_error("catalogo_reload_error")
+                logger.error(f"Erro ao recarregar o catálogo: {e}")
+
+    async def _ingerir_pagina(self, pagina, mangas, final):
+        """Grava uma página somente se o conteúdo mudou desde a última ingestão"""
+        assinatura = hashlib.sha1(
+            json.dumps([m.to_dict() for m in mangas], sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
+        # A última página segue incompleta até surgirem novos mangás; nunca é marcada como recente
+        atualizada_em = 0 if final else time.time()
+        alterada = await asyncio.to_thread(self._registrar_pagina, pagina, assinatura, atualizada_em)
+
+        if alterada:
+            await asyncio.to_thread(self._gravar, mangas)
+            self._atualizar_sfw(mangas)
+            self.paginas_ingeridas += 1
+        else:
+            await asyncio.to_thread(self._tocar, [m.mal_id for m in mangas])
+            self.paginas_inalteradas += 1
+
+        metrics.set_gauge("catalogo_sfw_entries", len(self._sfw_ids))
+
+    def _atualizar_sfw(self, mangas):
+        """Sincroniza o índice em memória com o flag SFW dos mangás gravados"""
+        for manga in mangas:
+            if manga.is_sfw:
+                self._adicionar_sfw(manga.mal_id)
+            else:
+                self._remover_sfw(manga.mal_id)
+
+    def _adicionar_sfw(self, mal_id):
+        if mal_id not in self._posicao:
+            self._posicao[mal_id] = len(self._sfw_ids)
+            self._sfw_ids.append(mal_id)
+
+    def _remover_sfw(self, mal_id):
+        posicao = self._posicao.pop(mal_id, None)
+        if posicao is None:
+            return
+        ultimo = self._sfw_ids.pop()
+        if ultimo != mal_id:
+            self._sfw_ids[posicao] = ultimo
+            self._posicao[ultimo] = posicao
+
+    def _conectar(self):
+        """Abre (e cria, se necessário) o banco SQLite; deve ser chamado com o lock"""
+        if self._conn is None:
+            self.caminho.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.caminho, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+
+            versao = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            if versao != CATALOGO_VERSAO:
+                # O catálogo é derivado da API: linhas de versões antigas (ex.: sem
+                # explicit_genres) não são confiáveis e a ingestão recomeça do zero
+                logger.warning(f"Catálogo na versão {versao}; reconstruindo para a versão {CATALOGO_VERSAO}")
+                self._conn.executescript('''
+                    DROP TABLE IF EXISTS mangas;
+                    DROP TABLE IF EXISTS paginas;
+                    DROP TABLE IF EXISTS progresso;
+                ''')
+                self._conn.execute(f"PRAGMA user_version = {CATALOGO_VERSAO}")
+
+            self._conn.executescript('''
+                CREATE TABLE IF NOT EXISTS mangas (
+                    mal_id INTEGER PRIMARY KEY,
+                    dados TEXT NOT NULL,
+                    sfw INTEGER NOT NULL,
+                    atualizado_em REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_mangas_sfw ON mangas (sfw);
+                CREATE TABLE IF NOT EXISTS paginas (
+                    pagina INTEGER PRIMARY KEY,
+                    assinatura TEXT NOT NULL,
+                    atualizado_em REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS progresso (
+                    chave TEXT PRIMARY KEY,
+                    valor TEXT NOT NULL
+                );
+            ''')
+            self._conn.commit()
+        return self._conn
+
+    def _carregar_ids_sfw(self):
+        """Retorna a versão dos dados e os IDs SFW"""
+        with self._lock:
+            conn = self._conectar()
+            # Versão lida antes dos IDs: um commit entre as duas leituras só causa uma recarga a mais
+            versao = conn.execute("PRAGMA data_version").fetchone()[0]
+            ids = [row[0] for row in conn.execute("SELECT mal_id FROM mangas WHERE sfw = 1")]
+            return versao, ids
+
+    def _ler_versao_dados(self):
+        """Muda a cada commit feito por outra conexão no arquivo"""
+        with self._lock:
+            return self._conectar().execute("PRAGMA data_version").fetchone()[0]
+
+    def _ler(self, mal_id):
+        with self._lock:
+            return self._conectar().execute(
+                "SELECT dados, atualizado_em FROM mangas WHERE mal_id = ?", (mal_id,)
+            ).fetchone()
+
+    def _gravar(self, mangas):
+        agora = time.time()
+        linhas = [
+            (m.mal_id, json.dumps(m.to_dict(), ensure_ascii=False), int(m.is_sfw), agora)
+            for m in mangas
+        ]
+        with self._lock:
+            conn = self._conectar()
+            conn.executemany(
+                "INSERT OR REPLACE INTO mangas (mal_id, dados, sfw, atualizado_em) VALUES (?, ?, ?, ?)",
+                linhas
+            )
+            conn.commit()
+
+    def _tocar(self, ids):
+        agora = time.time()
+        with self._lock:
+            conn = self._conectar()
+            conn.executemany("UPDATE mangas SET atualizado_em = ? WHERE mal_id = ?", [(agora, i) for i in ids])
+            conn.commit()
+
+    def _pagina_atualizada_em(self, pagina):
+        with self._lock:
+            row = self._conectar().execute(
+                "SELECT atualizado_em FROM paginas WHERE pagina = ?", (pagina,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _registrar_pagina(self, pagina, assinatura, atualizada_em):
+        """Grava a assinatura da página; retorna True se ela mudou"""
+        with self._lock:
+            conn = self._conectar()
+            row = conn.execute("SELECT assinatura FROM paginas WHERE pagina = ?", (pagina,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO paginas (pagina, assinatura, atualizado_em) VALUES (?, ?, ?)",
+                (pagina, assinatura, atualizada_em)
+            )
+            conn.commit()
+        return row is None or row[0] != assinatura
+
+    def _ler_progresso(self, chave, padrao):
+        with self._lock:
+            row = self._conectar().execute("SELECT valor FROM progresso WHERE chave = ?", (chave,)).fetchone()
+        return row[0] if row else padrao
+
+    def _salvar_progresso(self, chave, valor):
+        with self._lock:
+            conn = self._conectar()
+            conn.execute("INSERT OR REPLACE INTO progresso (chave, valor) VALUES (?, ?)", (chave, str(valor)))
+            conn.commit()
+
+    def _close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
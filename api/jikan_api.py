@@ -4,19 +4,153 @@ Cliente para a API Jikan (MyAnimeList)
 import asyncio
 import aiohttp
 import time
-from utils.constants import API_BASE
+from collections import deque
+from api.catalogo import MangaCatalog
+from api.models import MangaRecord
+from utils.cache import LRUCache
+from utils.constants import (
+    API_BASE, JIKAN_CACHE_MAX_BYTES, JIKAN_CACHE_TTL, JIKAN_CACHE_STALE_TTL,
+    JIKAN_RATE_LIMIT_PER_SECOND, JIKAN_RATE_LIMIT_PER_MINUTE,
+    DISK_CACHE_PATH, DISK_CACHE_MAX_BYTES, DISK_CACHE_TTL, CATALOGO_PATH
+)
+from utils.disk_cache import DiskCache
 from utils.logger import setup_logger
 from utils.metrics import metrics
 
 logger = setup_logger()
 
+class TokenBucketLimiter:
+    """
+    Limitador token-bucket com várias janelas simultâneas e fila FIFO
+
+    Cada janela (requisicoes, periodo, rajada) vira um balde de capacidade `rajada`
+    reabastecido a (requisicoes - rajada + 1) / periodo tokens por segundo, o que garante
+    no máximo `requisicoes` em qualquer intervalo [t, t + periodo). Com 1 <= rajada <=
+    requisicoes, até uma janela de 1 requisição é válida.
+    """
+
+    def __init__(self, janelas, clock=time.monotonic, sleep=asyncio.sleep, nome="jikan_rate_limit"):
+        """
+        Inicializa o limitador com os baldes cheios
+
+        Args:
+            janelas: Sequência de tuplas (requisicoes, periodo, rajada)
+            clock: Função que retorna o tempo atual em segundos (monotônico)
+            sleep: Corrotina usada para aguardar
+            nome: Prefixo das métricas registradas em utils.metrics
+        """
+        self.clock = clock
+        self.sleep = sleep
+        self.nome = nome
+
+        self._baldes = []
+        for requisicoes, periodo, rajada in janelas:
+            if not 1 <= rajada <= requisicoes:
+                raise ValueError(f"Rajada inválida para a janela {requisicoes}/{periodo}s: {rajada}")
+            self._baldes.append({
+                "capacidade": rajada,
+                # A rajada consome o primeiro token; os outros requisicoes - rajada chegam
+                # até o fim da janela, que é aberta à direita
+                "taxa": (requisicoes - rajada + 1) / periodo,
+                "tokens": float(rajada),
+            })
+
+        self._ultimo = clock()
+        self._lock = asyncio.Lock()
+        self.aguardando = 0
+
+        self.adquiridos = 0
+        self.esperas = 0
+        self._tempos_espera = deque(maxlen=100)
+
+    async def acquire(self):
+        """Aguarda, na ordem de chegada, até haver um token em todos os baldes e o consome"""
+        inicio = self.clock()
+        self.aguardando += 1
+        try:
+            async with self._lock:
+                while True:
+                    self._reabastecer()
+                    espera = self._tempo_ate_token()
+                    if espera <= 0:
+                        break
+                    await self.sleep(espera)
+
+                for balde in self._baldes:
+                    balde["tokens"] = max(0.0, balde["tokens"] - 1)
+        finally:
+            self.aguardando -= 1
+
+        espera_ms = (self.clock() - inicio) * 1000
+        self.adquiridos += 1
+        self._tempos_espera.append(espera_ms)
+        if espera_ms > 0:
+            self.esperas += 1
+            metrics.log_counter(f"{self.nome}_wait")
+        metrics.set_gauge(f"{self.nome}_wait_ms", round(espera_ms, 2))
+
+    def get_stats(self):
+        """Retorna estatísticas do limitador"""
+        return {
+            "queued": self.aguardando,
+            "acquired": self.adquiridos,
+            "waited": self.esperas,
+            "avg_wait_ms": round(sum(self._tempos_espera) / len(self._tempos_espera), 2) if self._tempos_espera else 0,
+            "max_wait_ms": round(max(self._tempos_espera), 2) if self._tempos_espera else 0,
+        }
+
+    def _reabastecer(self):
+        """Adiciona os tokens acumulados desde a última verificação"""
+        agora = self.clock()
+        decorrido = agora - self._ultimo
+        self._ultimo = agora
+        for balde in self._baldes:
+            balde["tokens"] = min(balde["capacidade"], balde["tokens"] + decorrido * balde["taxa"])
+
+    def _tempo_ate_token(self):
+        """Segundos até todos os baldes terem ao menos um token"""
+        return max(
+            (1 - balde["tokens"]) / balde["taxa"] if balde["tokens"] < 1 - 1e-9 else 0
+            for balde in self._baldes
+        )
+
+def janelas_jikan(por_segundo=JIKAN_RATE_LIMIT_PER_SECOND, por_minuto=JIKAN_RATE_LIMIT_PER_MINUTE):
+    """
+    Janelas do TokenBucketLimiter para a cota da API Jikan
+
+    Args:
+        por_segundo: Requisições permitidas por segundo
+        por_minuto: Requisições permitidas por minuto
+
+    Returns:
+        list: Tuplas (requisicoes, periodo, rajada)
+    """
+    return [
+        (por_segundo, 1.0, 1),
+        (por_minuto, 60.0, min(5, por_minuto)),
+    ]
+
 class JikanAPI:
     """Cliente para API Jikan (MyAnimeList)"""
 
     def __init__(self):
         self.session = None
-        self.cache = {}
-        self.cache_ttl = 3600
+        self.cache = LRUCache(
+            max_bytes=JIKAN_CACHE_MAX_BYTES,
+            ttl=JIKAN_CACHE_TTL,
+            stale_ttl=JIKAN_CACHE_STALE_TTL,
+            nome="jikan_cache"
+        )
+        self.disk_cache = DiskCache(
+            caminho=DISK_CACHE_PATH,
+            max_bytes=DISK_CACHE_MAX_BYTES,
+            ttl=DISK_CACHE_TTL,
+            nome="jikan_disk_cache"
+        ) if DISK_CACHE_PATH else None
+        self.rate_limiter = TokenBucketLimiter(janelas_jikan())
+        self.catalogo = MangaCatalog(self, CATALOGO_PATH) if CATALOGO_PATH else None
+        self._revalidando = {}
+        self._em_voo = {}
 
     async def get_session(self):
         """Retorna sessão HTTP, criando uma se necessário"""
@@ -25,74 +159,143 @@ class JikanAPI:
         return self.session
 
     async def close(self):
-        """Fecha a sessão HTTP se estiver aberta"""
+        """Fecha a sessão HTTP se estiver aberta, o catálogo e o cache em disco"""
+        for task in list(self._revalidando.values()) + list(self._em_voo.values()):
+            task.cancel()
+        self._revalidando.clear()
+        self._em_voo.clear()
+
         if self.session and not self.session.closed:
             await self.session.close()
             self.session = None
 
-    def _get_from_cache(self, key):
-        """Recupera dados do cache se ainda forem válidos"""
-        if key in self.cache:
-            cached_time, data = self.cache[key]
-            if time.time() - cached_time < self.cache_ttl:
-                logger.debug(f"Cache hit para: {key}")
-                metrics.log_cache_hit()
-                return data
-            else:
-                del self.cache[key]
-        metrics.log_cache_miss()
-        return None
+        if self.catalogo:
+            await self.catalogo.close()
 
-    def _store_in_cache(self, key, data):
-        """Armazena dados no cache com timestamp atual"""
-        self.cache[key] = (time.time(), data)
+        if self.disk_cache:
+            await self.disk_cache.close()
 
-        if len(self.cache) > 100:
-            oldest_key = min(self.cache.keys(), key=lambda k: self.cache[k][0])
-            del self.cache[oldest_key]
     async def fetch_manga_info(self, manga_id, return_full_data=False):
         """
         Busca informações de um mangá pelo ID
 
         Args:
             manga_id: ID do mangá no MyAnimeList
-            return_full_data: Se True, retorna o objeto completo do mangá em vez da string formatada
+            return_full_data: Se True, retorna o MangaRecord em vez da string formatada
 
         Returns:
-            str ou dict: String formatada com link ou dados completos do mangá
+            str ou MangaRecord: String formatada com link, ou o registro do mangá (None em caso de falha)
+        """
+        manga = await self._obter_manga(manga_id)
+
+        if return_full_data:
+            return manga
+
+        if not manga:
+            return f"Manga ID {manga_id} (Falha ao buscar informações)"
+
+        return f"[{manga.title}]({manga.url})"
+
+    async def _obter_manga(self, manga_id):
+        """
+        Retorna os dados do mangá do cache em memória, do cache em disco ou da API
+
+        Entradas expiradas em memória são revalidadas em background.
         """
-        cache_key = f"manga_{manga_id}_{return_full_data}"
+        cache_key = f"manga_{manga_id}"
+
+        manga, stale = self.cache.get(cache_key)
+        if manga is not None:
+            logger.debug(f"Cache hit para: {cache_key}")
+            metrics.log_cache_hit()
+            if stale:
+                self._agendar_revalidacao(manga_id)
+            return manga
+
+        task = self._em_voo.get(manga_id)
+        if task is None:
+            task = asyncio.create_task(self._carregar_manga(manga_id, cache_key))
+            self._em_voo[manga_id] = task
+            task.add_done_callback(lambda t: self._finalizar_carga(manga_id, t))
+        else:
+            logger.debug(f"Requisição coalescida para: {cache_key}")
+            metrics.log_counter("jikan_coalesced")
+
+        # shield: o cancelamento de um chamador não cancela a carga compartilhada pelos demais
+        return await asyncio.shield(task)
+
+    async def _carregar_manga(self, manga_id, cache_key):
+        """Busca o mangá no cache em disco ou na API e preenche os caches"""
+        if self.disk_cache:
+            manga = self._decodificar_disco(await self.disk_cache.get(cache_key))
+            if manga is not None:
+                logger.debug(f"Cache em disco hit para: {cache_key}")
+                metrics.log_cache_hit()
+                self.cache.set(cache_key, manga)
+                return manga
+
+        metrics.log_cache_miss()
+        manga = await self._buscar_manga(manga_id)
+        if manga:
+            await self._armazenar_manga(cache_key, manga)
+        return manga
+
+    def _finalizar_carga(self, manga_id, task):
+        """Remove a carga concluída do registro de requisições em voo"""
+        if self._em_voo.get(manga_id) is task:
+            del self._em_voo[manga_id]
+        if not task.cancelled() and task.exception() is not None:
+            metrics.log_error("jikan_fetch_error")
+
+    async def _armazenar_manga(self, cache_key, manga):
+        """Grava o MangaRecord nos caches em memória e em disco"""
+        self.cache.set(cache_key, manga)
+        if self.disk_cache:
+            await self.disk_cache.set(cache_key, manga.to_dict())
+
+    def _decodificar_disco(self, dados):
+        """Converte uma entrada do cache em disco em MangaRecord; formatos antigos contam como miss"""
+        # Entradas gravadas sem explicit_genres não permitem avaliar se o mangá é SFW
+        if dados is None or "explicit_genres" not in dados:
+            return None
+        try:
+            return MangaRecord.from_dict(dados)
+        except TypeError:
+            return None
 
-        cached_result = self._get_from_cache(cache_key)
-        if cached_result:
-            return cached_result
+    def _agendar_revalidacao(self, manga_id):
+        """Atualiza uma entrada expirada em background, no máximo uma vez por mangá"""
+        if manga_id in self._revalidando:
+            return
 
+        async def revalidar():
+            try:
+                manga = await self._buscar_manga(manga_id)
+                if manga:
+                    await self._armazenar_manga(f"manga_{manga_id}", manga)
+            finally:
+                self._revalidando.pop(manga_id, None)
+
+        self._revalidando[manga_id] = asyncio.create_task(revalidar())
+
+    async def _buscar_manga(self, manga_id):
+        """Busca um mangá na API, com novas tentativas; retorna o MangaRecord ou None em caso de falha"""
         url = f"{API_BASE}/manga/{manga_id}"
         max_retries = 3
         retry_delay = 1
 
         session = await self.get_session()
-        start_time = time.time()
 
         for attempt in range(max_retries):
             try:
+                await self.rate_limiter.acquire()
+                start_time = time.time()
                 async with session.get(url) as resp:
                     metrics.log_api_response(start_time, endpoint="manga_info")
 
                     if resp.status == 200:
                         data = await resp.json()
-                        manga = data.get("data", {})
-
-                        if return_full_data:
-                            self._store_in_cache(cache_key, manga)
-                            return manga
-                        else:
-                            titulo = manga.get("title", f"Manga ID {manga_id}")
-                            url_manga = manga.get("url", "")
-                            result = f"[{titulo}]({url_manga})"
-
-                            self._store_in_cache(cache_key, result)
-                            return result
+                        return MangaRecord.from_api(data.get("data"))
                     elif resp.status == 429:
                         metrics.log_error("rate_limit")
                         await asyncio.sleep(retry_delay * 2)
@@ -105,24 +308,66 @@ class JikanAPI:
                 if attempt < max_retries - 1:
                     await asyncio.sleep(retry_delay)
 
-        return f"Manga ID {manga_id} (Falha ao buscar informações)" if not return_full_data else {}
+        return None
     
+    async def listar_mangas(self, pagina, max_retries=3):
+        """
+        Busca uma página da listagem de mangás SFW, ordenada por ID
+
+        Args:
+            pagina: Número da página (a partir de 1)
+
+        Returns:
+            tuple ou None: (lista de MangaRecord, tem_proxima_pagina); None em caso de falha
+        """
+        session = await self.get_session()
+        params = {"page": pagina, "order_by": "mal_id", "sort": "asc", "sfw": "true"}
+
+        for attempt in range(max_retries):
+            try:
+                await self.rate_limiter.acquire()
+                start_time = time.time()
+                async with session.get(f"{API_BASE}/manga", params=params) as resp:
+                    metrics.log_api_response(start_time, endpoint="manga_list")
+
+                    if resp.status == 200:
+                        data = await resp.json()
+                        mangas = [MangaRecord.from_api(item) for item in data.get("data") or []]
+                        tem_proxima = bool((data.get("pagination") or {}).get("has_next_page"))
+                        return [m for m in mangas if m], tem_proxima
+
+                    metrics.log_error(f"api_error_{resp.status}")
+                    await asyncio.sleep(2 if resp.status == 429 else 1)
+            except Exception as e:
+                metrics.log_error("connection_error")
+                logger.error(f"Erro ao listar mangás (página {pagina}): {e}")
+                if attempt < max_retries - 1:
+                    await asyncio.sleep(1)
+
+        return None
+
     async def obter_manga_aleatorio(self, max_attempts=5):
         """
-        Busca um mangá aleatório (apenas SFW)
+        Sorteia um mangá aleatório (apenas SFW) do catálogo local, ou da API se ele estiver vazio
         
         Args:
-            max_attempts: Número máximo de tentativas para encontrar um mangá SFW
+            max_attempts: Número máximo de tentativas para encontrar um mangá SFW na API
             
         Returns:
-            dict: Dados do mangá SFW encontrado
+            MangaRecord: Mangá SFW encontrado, também gravado nos caches
         """
+        if self.catalogo:
+            manga = await self.catalogo.amostrar()
+            if manga:
+                self.cache.set(f"manga_{manga.mal_id}", manga)
+                return manga
+
         session = await self.get_session()
         
         for attempt in range(max_attempts):
-            start_time = time.time()
-            
             try:
+                await self.rate_limiter.acquire()
+                start_time = time.time()
                 params = {"sfw": "true"}
                 async with session.get(f"{API_BASE}/random/manga", params=params) as resp:
                     metrics.log_api_response(start_time, endpoint="random_manga")
@@ -133,13 +378,14 @@ class JikanAPI:
                             raise Exception(f"Erro ao buscar mangá aleatório: status {resp.status}")
                         continue
 
-                    manga_data = (await resp.json()).get("data", {})
+                    manga = MangaRecord.from_api((await resp.json()).get("data"))
                     
-                    if self._is_manga_sfw(manga_data):
-                        logger.debug(f"Mangá SFW encontrado: {manga_data.get('title', 'Título não disponível')}")
-                        return manga_data
+                    if manga and manga.is_sfw:
+                        logger.debug(f"Mangá SFW encontrado: {manga.title}")
+                        await self._armazenar_manga(f"manga_{manga.mal_id}", manga)
+                        return manga
                     else:
-                        logger.debug(f"Mangá não-SFW filtrado: {manga_data.get('title', 'Título não disponível')}")
+                        logger.debug(f"Mangá não-SFW ou inválido filtrado: {manga.title if manga else 'Título não disponível'}")
                         
             except Exception as e:
                 if attempt == max_attempts - 1:
@@ -150,40 +396,3 @@ class JikanAPI:
         logger.warning("Não foi possível encontrar um mangá SFW após várias tentativas")
         metrics.log_error("no_sfw_manga_found")
         raise Exception("Não foi possível encontrar um mangá adequado no momento")
-
-    def _is_manga_sfw(self, manga_data):
-        """
-        Verifica se um mangá é SFW (Safe for Work) baseado nos gêneros
-        
-        Args:
-            manga_data: Dados do mangá retornados pela API
-            
-        Returns:
-            bool: True se o mangá for SFW, False caso contrário
-        """
-        if not manga_data:
-            return False
-            
-        nsfw_genres = {
-            'Hentai', 'Ecchi', 'Erotica', 'Smut'
-        }
-        
-        nsfw_demographics = {
-            'Hentai'
-        }
-        
-        genres = manga_data.get('genres', [])
-        for genre in genres:
-            if genre.get('name') in nsfw_genres:
-                return False
-        
-        demographics = manga_data.get('demographics', [])
-        for demo in demographics:
-            if demo.get('name') in nsfw_demographics:
-                return False
-        
-        rating = manga_data.get('rating')
-        if rating and 'Rx' in rating:
-            return False
-            
-        return True
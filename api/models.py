@@ -0,0 +1,126 @@
+"""
+Modelos compactos dos dados retornados pela API Jikan
+"""
+import zlib
+from dataclasses import dataclass
+from utils.constants import COMPRIMIR_SINOPSE, calcular_criptogenes
+
+SINOPSE_COMPRIMIR_A_PARTIR = 256
+
+NSFW_GENRES = frozenset({'Hentai', 'Ecchi', 'Erotica', 'Smut'})
+NSFW_DEMOGRAPHICS = frozenset({'Hentai'})
+
+@dataclass(frozen=True, slots=True)
+class MangaRecord:
+    """Projeção imutável apenas com os campos do mangá que o bot utiliza"""
+
+    mal_id: int
+    title: str
+    url: str = ""
+    image_url: str = None
+    sinopse_armazenada: object = None
+    popularity: int = None
+    score: float = None
+    members: int = None
+    favorites: int = None
+    status: str = None
+    genres: tuple = ()
+    explicit_genres: tuple = ()
+    demographics: tuple = ()
+    rating: str = None
+
+    @classmethod
+    def from_api(cls, data):
+        """
+        Constrói o registro a partir do objeto `data` da API
+
+        Args:
+            data: Dicionário retornado pela API Jikan
+
+        Returns:
+            MangaRecord ou None: None se faltar ID ou título
+        """
+        if not data or not data.get("mal_id") or not data.get("title"):
+            return None
+
+        imagens = (data.get("images") or {}).get("jpg") or {}
+
+        return cls(
+            mal_id=data["mal_id"],
+            title=data["title"],
+            url=data.get("url") or "",
+            image_url=imagens.get("large_image_url") or imagens.get("image_url"),
+            sinopse_armazenada=cls._armazenar_sinopse(data.get("synopsis")),
+            popularity=data.get("popularity"),
+            score=data.get("score"),
+            members=data.get("members"),
+            favorites=data.get("favorites"),
+            status=data.get("status"),
+            genres=tuple(g.get("name") for g in data.get("genres") or () if g.get("name")),
+            explicit_genres=tuple(g.get("name") for g in data.get("explicit_genres") or () if g.get("name")),
+            demographics=tuple(d.get("name") for d in data.get("demographics") or () if d.get("name")),
+            rating=data.get("rating"),
+        )
+
+    @classmethod
+    def from_dict(cls, dados):
+        """Reconstrói o registro a partir de to_dict() (ex.: cache em disco)"""
+        dados = dict(dados)
+        sinopse = dados.pop("synopsis", None)
+        dados["genres"] = tuple(dados.get("genres") or ())
+        dados["explicit_genres"] = tuple(dados.get("explicit_genres") or ())
+        dados["demographics"] = tuple(dados.get("demographics") or ())
+        return cls(sinopse_armazenada=cls._armazenar_sinopse(sinopse), **dados)
+
+    def to_dict(self):
+        """Serializa o registro em um dicionário compatível com JSON"""
+        return {
+            "mal_id": self.mal_id,
+            "title": self.title,
+            "url": self.url,
+            "image_url": self.image_url,
+            "synopsis": self.synopsis,
+            "popularity": self.popularity,
+            "score": self.score,
+            "members": self.members,
+            "favorites": self.favorites,
+            "status": self.status,
+            "genres": list(self.genres),
+            "explicit_genres": list(self.explicit_genres),
+            "demographics": list(self.demographics),
+            "rating": self.rating,
+        }
+
+    @property
+    def synopsis(self):
+        """Sinopse em texto, descomprimida sob demanda"""
+        if isinstance(self.sinopse_armazenada, bytes):
+            return zlib.decompress(self.sinopse_armazenada).decode("utf-8")
+        return self.sinopse_armazenada
+
+    @property
+    def is_sfw(self):
+        """True se nenhum gênero, demografia ou classificação indicar conteúdo adulto"""
+        # A Jikan lista Hentai/Erotica em explicit_genres; qualquer gênero explícito basta
+        if self.explicit_genres:
+            return False
+        if NSFW_GENRES.intersection(self.genres) or NSFW_DEMOGRAPHICS.intersection(self.demographics):
+            return False
+        return not (self.rating and 'Rx' in self.rating)
+
+    def criptogenes(self):
+        """Valor do mangá em Pecinhas"""
+        return calcular_criptogenes(
+            popularidade=self.popularity or 0,
+            score=self.score or 0,
+            members=self.members or 0,
+            favorites=self.favorites or 0,
+            status=self.status or ""
+        )
+
+    @staticmethod
+    def _armazenar_sinopse(sinopse):
+        """Comprime sinopses longas, que raramente são exibidas"""
+        if COMPRIMIR_SINOPSE and sinopse and len(sinopse) >= SINOPSE_COMPRIMIR_A_PARTIR:
+            return zlib.compress(sinopse.encode("utf-8"))
+        return sinopse
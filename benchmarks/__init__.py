@@ -0,0 +1,10 @@
+"""
+Benchmarks do bot, executados como módulos: python -m benchmarks.<nome>
+
+Nenhum se conecta ao Discord; os que usam PostgreSQL exigem TEST_DATABASE_URL
+apontando para um banco descartável e são pulados sem ela.
+"""
+import os
+
+os.environ.setdefault("DISCORD_TOKEN", "benchmark")
+os.environ.setdefault("DATABASE_URL", os.environ.get("TEST_DATABASE_URL", "postgresql://benchmark@localhost/benchmark"))
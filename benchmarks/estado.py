@@ -0,0 +1,116 @@
+"""
+Vazão dos backends de estado: consumo de limites e reivindicação de mangás pendentes
+
+Uso:
+    python -m benchmarks.estado [--operacoes 20000] [--concorrencia 32]
+
+O backend PostgreSQL só é medido com TEST_DATABASE_URL definida.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from database.state_store import InMemoryStateStore, PostgresStateStore
+
+LIMITES = {"bench_rl": (10, 3600), "bench_pegar": (1, 18000)}
+# IDs de mensagem fora do intervalo de snowflakes reais, removidos ao final
+MESSAGE_ID_BASE = 1
+
+async def _medir(operacoes, concorrencia, operacao):
+    """Executa `operacao(i)` para i em range(operacoes) com concorrência limitada"""
+    latencias = []
+    proximo = iter(range(operacoes))
+
+    async def trabalhador():
+        for i in proximo:
+            inicio = time.perf_counter()
+            await operacao(i)
+            latencias.append(time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabalhador() for _ in range(concorrencia)))
+    duracao = time.perf_counter() - inicio
+
+    latencias.sort()
+    return {
+        "ops_s": round(operacoes / duracao),
+        "p50_ms": round(statistics.median(latencias) * 1000, 3),
+        "p99_ms": round(latencias[int(len(latencias) * 0.99) - 1] * 1000, 3),
+    }
+
+async def medir_backend(estado, operacoes, concorrencia, disputantes=4):
+    """
+    Mede consumir_limite e a disputa de reivindicar_pendente em um backend
+
+    Args:
+        estado: Instância de StateStore
+        operacoes: Quantidade de operações por medição
+        concorrencia: Corrotinas simultâneas
+        disputantes: Reações simultâneas disputando cada mangá pendente
+
+    Returns:
+        dict: Resultados por medição
+    """
+    usuarios = max(1, operacoes // 10)
+    resultados = {
+        "consumir_limite": await _medir(
+            operacoes, concorrencia,
+            lambda i: estado.consumir_limite("bench_rl", i % usuarios)
+        ),
+    }
+
+    mensagens = max(1, operacoes // disputantes)
+    for i in range(mensagens):
+        await estado.adicionar_pendente(MESSAGE_ID_BASE + i, {"manga_id": i, "title": "bench", "pecinhas": 1})
+
+    vencedores = [0] * mensagens
+
+    async def reivindicar(i):
+        mensagem = i % mensagens
+        if await estado.reivindicar_pendente(MESSAGE_ID_BASE + mensagem) is not None:
+            vencedores[mensagem] += 1
+
+    resultados["reivindicar_pendente"] = await _medir(mensagens * disputantes, concorrencia, reivindicar)
+    if any(v != 1 for v in vencedores):
+        raise AssertionError("Algum mangá pendente teve zero ou mais de um vencedor")
+    return resultados
+
+async def _postgres(dsn, operacoes, concorrencia):
+    from database.manga_db import MangaDatabase
+
+    db = MangaDatabase(dsn=dsn, max_size=max(10, concorrencia))
+    await db.connect()
+    try:
+        await db.init_db()
+        estado = PostgresStateStore(db, LIMITES)
+        return await medir_backend(estado, operacoes, concorrencia)
+    finally:
+        async with db._acquire() as conn:
+            await conn.execute("DELETE FROM limite_uso WHERE escopo LIKE 'bench_%'")
+            await conn.execute(
+                "DELETE FROM mangas_pendentes WHERE message_id < $1", MESSAGE_ID_BASE + operacoes
+            )
+        await db.close()
+
+async def executar(operacoes, concorrencia):
+    print(f"{operacoes} operações, concorrência {concorrencia}")
+    backends = {"memoria": medir_backend(InMemoryStateStore(LIMITES), operacoes, concorrencia)}
+
+    dsn = os.environ.get("TEST_DATABASE_URL")
+    if dsn:
+        backends["postgres"] = _postgres(dsn, operacoes, concorrencia)
+    else:
+        print("postgres: pulado (defina TEST_DATABASE_URL)")
+
+    for nome, medicao in backends.items():
+        for operacao, resultado in (await medicao).items():
+            print(f"{nome:>8} {operacao:<22} {resultado['ops_s']:>9} ops/s  "
+                  f"p50 {resultado['p50_ms']:.3f} ms  p99 {resultado['p99_ms']:.3f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--operacoes", type=int, default=20000)
+    parser.add_argument("--concorrencia", type=int, default=32)
+    args = parser.parse_args()
+    asyncio.run(executar(args.operacoes, args.concorrencia))
@@ -0,0 +1,134 @@
+"""
+SlidingWindowLimiter com 100 mil usuários ativos, comparado às listas filtradas de antes
+
+Uso:
+    python -m benchmarks.limitador [--usuarios 100000] [--eventos 1000000]
+
+O relógio é simulado: os eventos se espalham por uma hora e, ao final, o relógio
+avança além da janela para medir a expiração pela roda de tempo.
+"""
+import argparse
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from utils.rate_limiter import SlidingWindowLimiter
+
+LIMITE = 10
+JANELA = 3600
+
+class ListasFiltradas:
+    """Implementação anterior: lista de datetimes por usuário, refiltrada a cada chamada"""
+
+    def __init__(self, limite, janela):
+        self.limite = limite
+        self.janela = timedelta(seconds=janela)
+        self.registros = {}
+
+    def consumir(self, chave, agora):
+        recentes = [t for t in self.registros.get(chave, []) if agora - t < self.janela]
+        self.registros[chave] = recentes
+        if len(recentes) >= self.limite:
+            return False
+        recentes.append(agora)
+        return True
+
+    def limpar(self, agora):
+        """Tarefa periódica que varria todos os usuários"""
+        for chave in list(self.registros):
+            self.registros[chave] = [t for t in self.registros[chave] if agora - t < self.janela]
+            if not self.registros[chave]:
+                del self.registros[chave]
+
+def _percentil(latencias, p):
+    latencias = sorted(latencias)
+    return latencias[min(len(latencias) - 1, int(len(latencias) * p))] * 1e6
+
+def memoria_limitador(chaves, instantes):
+    """Memória (bytes) ocupada pelo limitador após todos os eventos, medida à parte do tempo"""
+    relogio = [0.0]
+    tracemalloc.start()
+    limitador = SlidingWindowLimiter(LIMITE, JANELA, clock=lambda: relogio[0])
+    for chave, instante in zip(chaves, instantes):
+        relogio[0] = instante
+        limitador.consumir(chave)
+    memoria = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return memoria
+
+def medir_limitador(chaves, instantes):
+    relogio = [0.0]
+    limitador = SlidingWindowLimiter(LIMITE, JANELA, clock=lambda: relogio[0])
+
+    latencias = []
+    inicio = time.perf_counter()
+    for chave, instante in zip(chaves, instantes):
+        relogio[0] = instante
+        t = time.perf_counter()
+        limitador.consumir(chave)
+        latencias.append(time.perf_counter() - t)
+    duracao = time.perf_counter() - inicio
+
+    ativos = len(limitador)
+    relogio[0] = instantes[-1] + JANELA + 1
+    t = time.perf_counter()
+    limitador.verificar(chaves[0])
+    expiracao = time.perf_counter() - t
+
+    return {
+        "ops_s": len(chaves) / duracao,
+        "p50_us": _percentil(latencias, 0.5),
+        "p99_us": _percentil(latencias, 0.99),
+        "max_us": max(latencias) * 1e6,
+        "ativos": ativos,
+        "restantes_apos_janela": len(limitador),
+        "expiracao_ms": expiracao * 1000,
+    }
+
+def medir_listas(chaves, instantes):
+    base = datetime(2024, 1, 1)
+    listas = ListasFiltradas(LIMITE, JANELA)
+
+    latencias = []
+    inicio = time.perf_counter()
+    for chave, instante in zip(chaves, instantes):
+        agora = base + timedelta(seconds=instante)
+        t = time.perf_counter()
+        listas.consumir(chave, agora)
+        latencias.append(time.perf_counter() - t)
+    duracao = time.perf_counter() - inicio
+
+    t = time.perf_counter()
+    listas.limpar(base + timedelta(seconds=instantes[-1]))
+    varredura = time.perf_counter() - t
+
+    return {
+        "ops_s": len(chaves) / duracao,
+        "p50_us": _percentil(latencias, 0.5),
+        "p99_us": _percentil(latencias, 0.99),
+        "varredura_ms": varredura * 1000,
+    }
+
+def executar(usuarios, eventos):
+    rng = random.Random(19)
+    chaves = [str(rng.randrange(usuarios)) for _ in range(eventos)]
+    instantes = sorted(rng.uniform(0, JANELA) for _ in range(eventos))
+
+    novo = medir_limitador(chaves, instantes)
+    memoria = memoria_limitador(chaves, instantes)
+    antigo = medir_listas(chaves, instantes)
+
+    print(f"{usuarios} usuários, {eventos} eventos em {JANELA}s, limite {LIMITE}/janela")
+    print(f"roda de tempo   {novo['ops_s']:10.0f} ops/s  p50 {novo['p50_us']:.2f} us  "
+          f"p99 {novo['p99_us']:.2f} us  max {novo['max_us']:.0f} us  {memoria / 2 ** 20:.1f} MB")
+    print(f"listas antigas  {antigo['ops_s']:10.0f} ops/s  p50 {antigo['p50_us']:.2f} us  "
+          f"p99 {antigo['p99_us']:.2f} us  varredura de limpeza {antigo['varredura_ms']:.0f} ms")
+    print(f"chaves ativas {novo['ativos']}; após a janela: {novo['restantes_apos_janela']} "
+          f"(todas expiradas em uma chamada: {novo['expiracao_ms']:.1f} ms)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--usuarios", type=int, default=100_000)
+    parser.add_argument("--eventos", type=int, default=1_000_000)
+    args = parser.parse_args()
+    executar(args.usuarios, args.eventos)
@@ -0,0 +1,110 @@
+"""
+Memória por entrada do cache: objeto `data` completo da API Jikan contra MangaRecord
+
+Uso:
+    python -m benchmarks.memoria_manga [--entradas 5000]
+
+Os objetos seguem o formato de /v4/manga/{id}/full, com tamanhos típicos de
+sinopse, background, imagens, autores e relações.
+"""
+import argparse
+import json
+import random
+import tracemalloc
+from api.models import MangaRecord
+
+PALAVRAS = "the of and a to in is was that his her manga story school world power life".split()
+
+def _texto(rng, palavras):
+    return " ".join(rng.choice(PALAVRAS) for _ in range(palavras))
+
+def _imagens(mal_id):
+    base = f"https://cdn.myanimelist.net/images/manga/{mal_id % 10}/{mal_id}"
+    return {
+        formato: {
+            "image_url": f"{base}.{formato}",
+            "small_image_url": f"{base}t.{formato}",
+            "large_image_url": f"{base}l.{formato}",
+        }
+        for formato in ("jpg", "webp")
+    }
+
+def _entidade(rng, tipo):
+    mal_id = rng.randint(1, 100000)
+    nome = _texto(rng, 2).title()
+    return {"mal_id": mal_id, "type": tipo, "name": nome, "url": f"https://myanimelist.net/{tipo}/{mal_id}/{nome.replace(' ', '_')}"}
+
+def gerar_payload(rng, mal_id):
+    """Objeto `data` sintético no formato da API"""
+    titulo = _texto(rng, rng.randint(2, 6)).title()
+    return {
+        "mal_id": mal_id,
+        "url": f"https://myanimelist.net/manga/{mal_id}/{titulo.replace(' ', '_')}",
+        "images": _imagens(mal_id),
+        "approved": True,
+        "titles": [{"type": t, "title": titulo} for t in ("Default", "Synonym", "Japanese", "English")],
+        "title": titulo,
+        "title_english": titulo,
+        "title_japanese": titulo,
+        "title_synonyms": [titulo],
+        "type": "Manga",
+        "chapters": rng.randint(1, 500),
+        "volumes": rng.randint(1, 50),
+        "status": rng.choice(["Publishing", "Finished", "On Hiatus"]),
+        "publishing": True,
+        "published": {
+            "from": "2010-01-01T00:00:00+00:00", "to": None,
+            "prop": {"from": {"day": 1, "month": 1, "year": 2010}, "to": {"day": None, "month": None, "year": None}},
+            "string": "Jan 1, 2010 to ?",
+        },
+        "score": round(rng.uniform(5, 9.5), 2),
+        "scored": round(rng.uniform(5, 9.5), 2),
+        "scored_by": rng.randint(100, 500000),
+        "rank": rng.randint(1, 60000),
+        "popularity": rng.randint(1, 60000),
+        "members": rng.randint(100, 1000000),
+        "favorites": rng.randint(0, 100000),
+        "synopsis": _texto(rng, rng.randint(80, 250)),
+        "background": _texto(rng, rng.randint(0, 120)),
+        "authors": [_entidade(rng, "people") for _ in range(rng.randint(1, 3))],
+        "serializations": [_entidade(rng, "magazine")],
+        "genres": [_entidade(rng, "manga") for _ in range(rng.randint(1, 5))],
+        "explicit_genres": [],
+        "themes": [_entidade(rng, "manga") for _ in range(rng.randint(0, 4))],
+        "demographics": [_entidade(rng, "manga")],
+        "relations": [
+            {"relation": "Adaptation", "entry": [_entidade(rng, "anime") for _ in range(rng.randint(1, 3))]}
+            for _ in range(rng.randint(0, 3))
+        ],
+        "external": [{"name": "Wikipedia", "url": "https://en.wikipedia.org/wiki/" + titulo.replace(" ", "_")}],
+    }
+
+def _memoria(construir):
+    """Bytes alocados (e mantidos) pela estrutura retornada por `construir`"""
+    tracemalloc.start()
+    antes = tracemalloc.get_traced_memory()[0]
+    objetos = construir()
+    depois = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return depois - antes, objetos
+
+def executar(entradas):
+    rng = random.Random(13)
+    # JSON serializado, como chega da rede: cada decodificação cria objetos independentes
+    brutos = [json.dumps(gerar_payload(rng, mal_id)) for mal_id in range(1, entradas + 1)]
+
+    memoria_dict, dicts = _memoria(lambda: [json.loads(b) for b in brutos])
+    # O dict decodificado é descartado logo após a projeção, como em fetch_manga_info
+    memoria_registro, registros = _memoria(lambda: [MangaRecord.from_api(json.loads(b)) for b in brutos])
+
+    assert all(r is not None for r in registros) and len(dicts) == entradas
+    print(f"{entradas} entradas")
+    print(f"dict completo da API  {memoria_dict / entradas:8.0f} bytes/entrada")
+    print(f"MangaRecord           {memoria_registro / entradas:8.0f} bytes/entrada  "
+          f"({1 - memoria_registro / memoria_dict:.0%} menos)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entradas", type=int, default=5000)
+    args = parser.parse_args()
+    executar(args.entradas)
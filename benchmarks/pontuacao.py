@@ -0,0 +1,59 @@
+"""
+Cálculo de Pecinhas: laço escalar contra o cálculo em lote (NumPy)
+
+Uso:
+    python -m benchmarks.pontuacao [--linhas 1000000] [--amostra-escalar 100000]
+
+O laço escalar roda só sobre as primeiras linhas da amostra e o tempo é extrapolado.
+"""
+import argparse
+import time
+import numpy as np
+from utils.constants import calcular_criptogenes
+from utils.pontuacao import STATUS_PAUSADO, calcular_criptogenes_lote
+
+NOMES_STATUS = ["", "Publishing", "Finished", "On Hiatus"]
+
+def gerar_colunas(linhas, semente=15):
+    """Colunas sintéticas com a distribuição aproximada do catálogo"""
+    rng = np.random.default_rng(semente)
+    return {
+        "popularidade": rng.integers(0, 30000, linhas),
+        "score": np.round(rng.uniform(0, 10, linhas), 2),
+        "members": rng.integers(0, 5_000_000, linhas),
+        "favorites": rng.integers(0, 500_000, linhas),
+        "status": rng.integers(0, STATUS_PAUSADO + 1, linhas),
+    }
+
+def executar(linhas, amostra_escalar):
+    colunas = gerar_colunas(linhas)
+
+    inicio = time.perf_counter()
+    lote = calcular_criptogenes_lote(
+        colunas["popularidade"], colunas["score"], colunas["members"], colunas["favorites"], colunas["status"]
+    )
+    tempo_lote = time.perf_counter() - inicio
+
+    amostra = min(linhas, amostra_escalar)
+    linhas_python = list(zip(*(
+        colunas[c][:amostra].tolist() for c in ("popularidade", "score", "members", "favorites", "status")
+    )))
+    inicio = time.perf_counter()
+    escalar = [
+        calcular_criptogenes(p, s, m, f, NOMES_STATUS[st])
+        for p, s, m, f, st in linhas_python
+    ]
+    tempo_escalar = (time.perf_counter() - inicio) * linhas / amostra
+
+    divergentes = int(np.count_nonzero(lote[:amostra] != np.array(escalar)))
+    print(f"{linhas} linhas")
+    print(f"escalar {tempo_escalar:8.3f} s  ({linhas / tempo_escalar:12.0f} linhas/s)  extrapolado de {amostra} linhas")
+    print(f"lote    {tempo_lote:8.3f} s  ({linhas / tempo_lote:12.0f} linhas/s)  {tempo_escalar / tempo_lote:.0f}x")
+    print(f"valores divergentes na amostra de {amostra}: {divergentes}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--linhas", type=int, default=1_000_000)
+    parser.add_argument("--amostra-escalar", type=int, default=100_000)
+    args = parser.parse_args()
+    executar(args.linhas, args.amostra_escalar)
@@ -0,0 +1,89 @@
+"""
+Ranking global: agregação sobre user_collection contra a contagem mantida por usuário
+
+Uso:
+    TEST_DATABASE_URL=postgresql://... python -m benchmarks.ranking [--usuarios 100000] [--mangas 50]
+
+Os dados sintéticos ficam em tabelas temporárias com a mesma estrutura e índices
+das tabelas reais; nada é gravado no banco.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+CONSULTA_AGREGADA = """
+    SELECT usuario_id, COUNT(*) AS total
+    FROM user_collection
+    GROUP BY usuario_id
+    ORDER BY total DESC
+    LIMIT 10
+"""
+
+CONSULTA_CONTAGEM = """
+    SELECT usuario_id, mangas AS total
+    FROM usuario_colecao_contagem
+    WHERE mangas > 0
+    ORDER BY mangas DESC
+    LIMIT 10
+"""
+
+async def _tempo_ms(conn, consulta, repeticoes):
+    """Mediana do tempo de execução, em ms, da consulta repetida"""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        await conn.fetch(consulta)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos)
+
+async def executar(dsn, usuarios, mangas_por_usuario, repeticoes):
+    import asyncpg
+    from database.migrator import aplicar_migracoes
+
+    conn = await asyncpg.connect(dsn)
+    try:
+        await aplicar_migracoes(conn)
+
+        # As tabelas temporárias têm precedência sobre as reais no search_path
+        await conn.execute("""
+            CREATE TEMP TABLE user_collection (LIKE public.user_collection INCLUDING ALL);
+            CREATE TEMP TABLE usuario_colecao_contagem (LIKE public.usuario_colecao_contagem INCLUDING ALL);
+        """)
+        await conn.execute("""
+            INSERT INTO user_collection (usuario_id, manga_id, first_claimed, last_claimed)
+            SELECT u::text, m, LOCALTIMESTAMP, LOCALTIMESTAMP
+            FROM generate_series(1, $1) AS u,
+                 generate_series(1, 1 + (hashint4(u) & 2147483647) % ($2 * 2)) AS m
+        """, usuarios, mangas_por_usuario)
+        await conn.execute("""
+            INSERT INTO usuario_colecao_contagem (usuario_id, mangas)
+            SELECT usuario_id, COUNT(*) FROM user_collection GROUP BY usuario_id
+        """)
+        await conn.execute("ANALYZE user_collection; ANALYZE usuario_colecao_contagem")
+
+        linhas = await conn.fetchval("SELECT COUNT(*) FROM user_collection")
+        agregada = await conn.fetch(CONSULTA_AGREGADA)
+        contagem = await conn.fetch(CONSULTA_CONTAGEM)
+        if [r["total"] for r in agregada] != [r["total"] for r in contagem]:
+            raise AssertionError("As duas consultas não retornam o mesmo ranking")
+
+        print(f"{usuarios} usuários, {linhas} linhas em user_collection")
+        print(f"agregação GROUP BY   {await _tempo_ms(conn, CONSULTA_AGREGADA, repeticoes):10.3f} ms")
+        print(f"contagem por usuário {await _tempo_ms(conn, CONSULTA_CONTAGEM, repeticoes):10.3f} ms")
+    finally:
+        await conn.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--usuarios", type=int, default=100000)
+    parser.add_argument("--mangas", type=int, default=50, help="média de mangás por usuário")
+    parser.add_argument("--repeticoes", type=int, default=20)
+    args = parser.parse_args()
+
+    dsn = os.environ.get("TEST_DATABASE_URL")
+    if not dsn:
+        print("Defina TEST_DATABASE_URL com um banco PostgreSQL descartável")
+    else:
+        asyncio.run(executar(dsn, args.usuarios, args.mangas, args.repeticoes))
@@ -2,38 +2,72 @@
 Cliente Discord principal com comandos e gerenciamento de estado
 """
 import discord
-import asyncio
+import math
+import time
+from collections import Counter
+from datetime import datetime
 from discord import app_commands
-from datetime import datetime, timedelta
 from database.manga_db import MangaDatabase
+from database.state_store import criar_state_store
 from api.jikan_api import JikanAPI
 from bot.commands import Commands
+from bot.manga_pool import MangaPrefetchPool
+from bot.leaderboard_cache import LeaderboardCache
+from bot.user_resolver import UserResolver
 from utils.constants import (
     LIMITE_MANGA_POR_HORA, LIMITE_MANGA_RESET,
     LIMITE_PEGAR_MANGA, LIMITE_PEGAR_RESET,
     MANGA_EXPIRATION_TIME, PENDENTES_CLEANUP_TIME, 
-    PENDENTES_CHECK_INTERVAL
+    PENDENTES_CHECK_INTERVAL, STATE_BACKEND,
+    SHARD_COUNT, SHARD_IDS, SHARD_PROCESS_INDEX
 )
 from utils.logger import setup_logger
+from utils.metrics import metrics
+from utils.scheduler import ExpiryScheduler
+from utils.startup import startup
 
 logger = setup_logger()
 
+CHAVE_ASSINATURA_COMANDOS = "assinatura_comandos"
+
 intents = discord.Intents.default()
 intents.message_content = True
 intents.reactions = True
 
-class DiscordBot(discord.Client):
+class DiscordBot(discord.AutoShardedClient):
     """Cliente Discord principal com comandos e gerenciamento de estado"""
     
-    def __init__(self):
-        super().__init__(intents=intents)
+    def __init__(self, forcar_sync=False, shard_count=SHARD_COUNT, shard_ids=SHARD_IDS,
+                 processo=SHARD_PROCESS_INDEX):
+        """
+        Inicializa o cliente
+
+        Args:
+            forcar_sync: Se True, sincroniza os comandos mesmo que não tenham mudado
+            shard_count: Total de shards do bot (None: um único shard)
+            shard_ids: Shards atendidos por este processo (None: todos)
+            processo: Índice do processo no supervisor; só o 0 sincroniza comandos e ingere o catálogo
+        """
+        # Sem SHARD_COUNT o cliente conecta um único shard, como um discord.Client comum
+        super().__init__(intents=intents, shard_count=shard_count or 1, shard_ids=shard_ids)
+        
+        self.forcar_sync = forcar_sync
+        self.processo = processo
+        self.primario = processo == 0
+        self.estado_shards = {}
         
         self.db = MangaDatabase()
         self.jikan = JikanAPI()
+        self.manga_pool = MangaPrefetchPool(self.jikan)
         
-        self.mangas_pendentes = {} 
-        self.rl_comandos_por_usuario = {}
-        self.pegar_comandos_por_usuario = {}
+        self.estado = criar_state_store(STATE_BACKEND, self.db, {
+            "rl": (LIMITE_MANGA_POR_HORA, LIMITE_MANGA_RESET),
+            "pegar": (LIMITE_PEGAR_MANGA, LIMITE_PEGAR_RESET),
+        })
+        self.expiracoes = ExpiryScheduler(nome="expiracao")
+        self.usuarios = UserResolver(self)
+        self.rankings = LeaderboardCache()
+        self.db.adicionar_observador_ranking(self.rankings.invalidar)
         self.tree = app_commands.CommandTree(self)
         
         self.commands = Commands(self)
@@ -41,220 +75,244 @@ class DiscordBot(discord.Client):
     
     async def setup_hook(self):
         """Configuração inicial ao iniciar o bot"""
-        await self.db.init_db()
+        inicio = time.perf_counter()
+        logger.info("Iniciando configuração do bot...")
         
-        self.bg_task = self.loop.create_task(self.limpar_mangas_pendentes())
-        self.rl_cleanup_task = self.loop.create_task(self.limpar_registros_comando_rl())
-        self.pegar_cleanup_task = self.loop.create_task(self.limpar_registros_pegar_manga())
-        await self.commands.setup_commands()
-        await self.tree.sync()
-    
-    def verificar_limite_rl(self, user_id):
-        """Verifica se o usuário atingiu o limite de mangás por hora"""
-        user_id_str = str(user_id)
-        agora = datetime.now()
+        with startup.fase("db_init"):
+            await self.db.connect()
+            await self.db.init_db()
+        if self.jikan.disk_cache:
+            await self.jikan.disk_cache.compactar()
+        if self.jikan.catalogo:
+            await self.jikan.catalogo.start(ingerir=self.primario)
         
-        registros = self.rl_comandos_por_usuario.get(user_id_str, [])
+        self.manga_pool.start()
+        self.expiracoes.start()
+        self.expiracoes.agendar("limpeza_pendentes", PENDENTES_CHECK_INTERVAL, self.limpar_mangas_pendentes)
+        assinatura = await self.commands.setup_commands()
+        if self.primario:
+            await self.sincronizar_comandos(assinatura)
         
-        hora_atras = agora - timedelta(seconds=LIMITE_MANGA_RESET)
-        registros_recentes = [ts for ts in registros if ts > hora_atras]
+        logger.info(f"Configuração do bot concluída em {(time.perf_counter() - inicio) * 1000:.0f} ms")
+    
+    async def sincronizar_comandos(self, assinatura):
+        """
+        Sincroniza a árvore de comandos com o Discord apenas se a assinatura mudou
+
+        Args:
+            assinatura: Hash das definições atuais dos comandos
+        """
+        assinatura_salva = await self.db.obter_metadado(CHAVE_ASSINATURA_COMANDOS)
         
-        self.rl_comandos_por_usuario[user_id_str] = registros_recentes
+        if not self.forcar_sync and assinatura_salva == assinatura:
+            logger.info("Comandos inalterados desde o último sync; sincronização ignorada")
+            return
         
-        if len(registros_recentes) >= LIMITE_MANGA_POR_HORA:
-            return False, 0, registros_recentes
+        motivo = "forçado por --sync" if self.forcar_sync else "definições alteradas"
+        inicio = time.perf_counter()
+        with startup.fase("tree_sync"):
+            await self.tree.sync()
+        await self.db.salvar_metadado(CHAVE_ASSINATURA_COMANDOS, assinatura)
+        logger.info(f"Comandos sincronizados ({motivo}) em {(time.perf_counter() - inicio) * 1000:.0f} ms")
+    
+    def agendar_expiracao(self, message, embed):
+        """
+        Agenda a expiração de um mangá do /rl
+
+        Args:
+            message: Mensagem enviada com o mangá
+            embed: Embed enviado, guardado para editar a mensagem sem buscá-la de novo
+        """
+        self.expiracoes.agendar(
+            message.id, MANGA_EXPIRATION_TIME,
+            self.expirar_manga, message.id, message.channel.id, embed.to_dict()
+        )
+    
+    async def expirar_manga(self, message_id, channel_id, embed_dict):
+        """Marca um mangá como expirado e acinzenta o embed, se ninguém o pegou"""
+        try:
+            if not await self.estado.marcar_expirado(message_id):
+                return
+            
+            embed = discord.Embed.from_dict(embed_dict)
+            embed.color = discord.Color.light_grey()
+            embed.set_footer(text="Tempo esgotado")
+            
+            mensagem = self.get_partial_messageable(channel_id).get_partial_message(message_id)
+            await mensagem.edit(embed=embed)
+        except Exception as e:
+            logger.error(f"Erro ao expirar mangá: {e}")
+    
+    async def limpar_mangas_pendentes(self):
+        """Remove mangás pendentes antigos e limites expirados, e reagenda a próxima limpeza"""
+        try:
+            removidos = await self.estado.limpar(PENDENTES_CLEANUP_TIME)
+            
+            if removidos:
+                logger.info(f"Removidos {removidos} mangás pendentes antigos")
+            intervalo = PENDENTES_CHECK_INTERVAL
+        except Exception as e:
+            logger.error(f"Erro na limpeza de mangás pendentes: {e}")
+            intervalo = 300
         
-        mangas_restantes = LIMITE_MANGA_POR_HORA - len(registros_recentes)
-        return True, mangas_restantes, registros_recentes
+        self.expiracoes.agendar("limpeza_pendentes", intervalo, self.limpar_mangas_pendentes)
     
-    def verificar_limite_pegar(self, user_id):
-        """Verifica se o usuário pode pegar um mangá (limite de 1 a cada 5 horas)"""
-        user_id_str = str(user_id)
-        agora = datetime.now()
+    async def on_raw_reaction_add(self, payload):
+        """
+        Handler para reações adicionadas nas mensagens
+
+        A decisão de quem pega o mangá usa só o estado pendente e o embed guardado
+        no /rl: nenhuma chamada REST acontece antes dela, e quem perde a disputa
+        é descartado sem chamada alguma.
+        """
+        # Só mensagens do próprio bot podem ter mangá pendente: as demais nem chegam ao banco
+        if payload.user_id == self.user.id or payload.message_author_id != self.user.id:
+            return
         
-        registros = self.pegar_comandos_por_usuario.get(user_id_str, [])
+        inicio = time.perf_counter()
+        manga_data = await self.estado.obter_pendente(payload.message_id)
+        if manga_data is None:
+            return
         
-        cinco_horas_atras = agora - timedelta(seconds=LIMITE_PEGAR_RESET)
-        registros_recentes = [ts for ts in registros if ts > cinco_horas_atras]
+        mensagem = self.get_partial_messageable(payload.channel_id).get_partial_message(payload.message_id)
+        reator = payload.member or discord.Object(id=payload.user_id)
+        mencao = f"<@{payload.user_id}>"
         
-        self.pegar_comandos_por_usuario[user_id_str] = registros_recentes
+        if manga_data.get("expirado", False):
+            self._registrar_decisao(inicio, "expirado")
+            try:
+                await mensagem.remove_reaction(payload.emoji, reator)
+            except:
+                pass
+            return
         
-        if len(registros_recentes) >= LIMITE_PEGAR_MANGA:
-            return False, registros_recentes
+        # Consome a vaga antes de reivindicar: dois cliques simultâneos do mesmo
+        # usuário (mesmo em processos diferentes) não passam ambos do limite
+        pode_pegar, _, tempo_restante = await self.estado.consumir_limite("pegar", payload.user_id)
         
-        return True, registros_recentes
-    
-    async def limpar_registros_comando_rl(self):
-        """Limpa registros antigos do comando RL"""
-        while not self.is_closed():
-            try:
-                agora = datetime.now()
-                hora_atras = agora - timedelta(seconds=LIMITE_MANGA_RESET)
-                
-                for user_id in list(self.rl_comandos_por_usuario.keys()):
-                    registros = self.rl_comandos_por_usuario[user_id]
-                    registros_recentes = [ts for ts in registros if ts > hora_atras]
-                    
-                    if not registros_recentes:
-                        del self.rl_comandos_por_usuario[user_id]
-                    else:
-                        self.rl_comandos_por_usuario[user_id] = registros_recentes
-                
-                await asyncio.sleep(300)
-            except Exception as e:
-                logger.error(f"Erro na limpeza de registros de comando RL: {e}")
-                await asyncio.sleep(300)
-    
-    async def limpar_registros_pegar_manga(self):
-        """Limpa registros antigos de pegar mangás"""
-        while not self.is_closed():
+        if not pode_pegar:
+            self._registrar_decisao(inicio, "limite")
             try:
-                agora = datetime.now()
-                cinco_horas_atras = agora - timedelta(seconds=LIMITE_PEGAR_RESET)
+                await mensagem.remove_reaction(payload.emoji, reator)
                 
-                for user_id in list(self.pegar_comandos_por_usuario.keys()):
-                    registros = self.pegar_comandos_por_usuario[user_id]
-                    registros_recentes = [ts for ts in registros if ts > cinco_horas_atras]
-                    
-                    if not registros_recentes:
-                        del self.pegar_comandos_por_usuario[user_id]
-                    else:
-                        self.pegar_comandos_por_usuario[user_id] = registros_recentes
+                horas = int(tempo_restante // 3600)
+                minutos = int((tempo_restante % 3600) // 60)
                 
-                await asyncio.sleep(300)
-            except Exception as e:
-                logger.error(f"Erro na limpeza de registros de pegar mangás: {e}")
-                await asyncio.sleep(300)
-    
-    async def expirar_manga(self, message_id, channel_id):
-        """Marca um mangá como expirado após o tempo definido"""
-        await asyncio.sleep(MANGA_EXPIRATION_TIME)
+                await mensagem.channel.send(
+                    f"{mencao}, você já pegou um mangá nas últimas 5 horas! "
+                    f"Tente novamente em {horas} horas e {minutos} minutos.",
+                    delete_after=10
+                )
+            except:
+                pass
+            return
         
-        if message_id in self.mangas_pendentes:
-            try:
-                channel = self.get_channel(channel_id)
-                if not channel:
-                    return
-                    
-                message = await channel.fetch_message(message_id)
-                if not message or not message.embeds:
-                    return
-                    
-                embed = message.embeds[0]
-                if embed.color and embed.color.value == discord.Color.green().value:
-                    embed.color = discord.Color.light_grey()
-                    embed.set_footer(text="Tempo esgotado")
-                    await message.edit(embed=embed)
-                    
-                self.mangas_pendentes[message_id]["expirado"] = True
-            except Exception as e:
-                logger.error(f"Erro ao expirar mangá: {e}")
-    
-    async def limpar_mangas_pendentes(self):
-        """Tarefa em background para limpar mangás pendentes antigos"""
-        while not self.is_closed():
-            try:
-                agora = datetime.now()
-                manga_ids_para_remover = []
-                
-                for message_id, manga_data in self.mangas_pendentes.items():
-                    data_manga = datetime.fromisoformat(manga_data["timestamp"])
-                    if (agora - data_manga).total_seconds() > PENDENTES_CLEANUP_TIME:
-                        manga_ids_para_remover.append(message_id)
-                
-                for message_id in manga_ids_para_remover:
-                    del self.mangas_pendentes[message_id]
-                
-                if len(self.mangas_pendentes) > 1000:
-                    logger.warning(f"Limite de mangas pendentes atingido ({len(self.mangas_pendentes)}). Removendo os mais antigos.")
-                    
-                    sorted_mangas = sorted(
-                        self.mangas_pendentes.items(),
-                        key=lambda x: datetime.fromisoformat(x[1]["timestamp"])
-                    )
-                    
-                    for message_id, _ in sorted_mangas[:200]:
-                        del self.mangas_pendentes[message_id]
-                    
-                    logger.info(f"Remoção concluída. Tamanho atual: {len(self.mangas_pendentes)}")
-                
-                if manga_ids_para_remover:
-                    logger.info(f"Removidos {len(manga_ids_para_remover)} mangás pendentes antigos")
-                
-                await asyncio.sleep(PENDENTES_CHECK_INTERVAL)
-            except Exception as e:
-                logger.error(f"Erro na limpeza de mangás pendentes: {e}")
-                await asyncio.sleep(300)
-    
-    async def on_raw_reaction_add(self, payload):
-        """Handler para reações adicionadas nas mensagens"""
-        if payload.user_id == self.user.id:
+        # Reivindicação atômica: só um usuário leva o mangá; os demais devolvem a vaga consumida
+        manga_data = await self.estado.reivindicar_pendente(payload.message_id)
+        if manga_data is None:
+            self._registrar_decisao(inicio, "perdeu")
+            await self.estado.estornar_limite("pegar", payload.user_id)
             return
-                
-        if payload.message_id in self.mangas_pendentes:
-            manga_data = self.mangas_pendentes[payload.message_id]
-            channel = self.get_channel(payload.channel_id)
-            message = await channel.fetch_message(payload.message_id)
-            user = self.get_user(payload.user_id) or await self.fetch_user(payload.user_id)
+        self._registrar_decisao(inicio, "pegou")
             
-            if message.embeds and message.embeds[0].color:
-                is_expired = (message.embeds[0].color.value == discord.Color.light_grey().value or
-                            message.embeds[0].color.value == discord.Color.red().value or
-                            manga_data.get("expirado", False))
-                
-                if is_expired:
-                    try:
-                        await message.remove_reaction(payload.emoji, user)
-                    except:
-                        pass
-                    return
-                    
-            pode_pegar, registros_pegar = self.verificar_limite_pegar(payload.user_id)
+        try:
+            await self.db.registrar_manga(
+                payload.user_id, manga_data["manga_id"], payload.guild_id, manga_data.get("pecinhas")
+            )
+        except Exception as e:
+            logger.error(f"Erro ao registrar mangá pego: {e}")
+            # Devolve o mangá e a vaga para que outra reação possa tentar de novo
+            await self.estado.adicionar_pendente(payload.message_id, manga_data)
+            await self.estado.estornar_limite("pegar", payload.user_id)
+            return
+        
+        self.expiracoes.cancelar(payload.message_id)
+        
+        try:
+            if payload.member:
+                nome = payload.member.display_name
+            else:
+                user = self.get_user(payload.user_id) or await self.fetch_user(payload.user_id)
+                nome = user.display_name
             
-            if not pode_pegar:
-                try:
-                    await message.remove_reaction(payload.emoji, user)
-                    
-                    agora = datetime.now()
-                    ultimo_registro = max(registros_pegar)
-                    tempo_restante = ultimo_registro + timedelta(seconds=LIMITE_PEGAR_RESET) - agora
-                    horas = int(tempo_restante.total_seconds() // 3600)
-                    minutos = int((tempo_restante.total_seconds() % 3600) // 60)
-                    
-                    await channel.send(
-                        f"{user.mention}, você já pegou um mangá nas últimas 5 horas! "
-                        f"Tente novamente em {horas} horas e {minutos} minutos.",
-                        delete_after=10
-                    )
-                except:
-                    pass
-                return
-                
-            try:
-                await self.db.registrar_manga(payload.user_id, manga_data["manga_id"])
-                
-                user_id_str = str(payload.user_id)
-                if user_id_str not in self.pegar_comandos_por_usuario:
-                    self.pegar_comandos_por_usuario[user_id_str] = []
-                self.pegar_comandos_por_usuario[user_id_str].append(datetime.now())
-                
-                embed = message.embeds[0]
-                embed.color = discord.Color.red()
-                embed.set_footer(text=f"Mangá pego por {user.display_name} com {payload.emoji}")
-                
-                await message.edit(embed=embed)
-                
-                del self.mangas_pendentes[payload.message_id]
-                
-                await channel.send(f"🎉 {user.mention} pegou o mangá **{manga_data['title']}** com {payload.emoji}!")
-            except Exception as e:
-                logger.error(f"Erro ao processar reação: {e}")
+            if "embed" in manga_data:
+                embed = discord.Embed.from_dict(manga_data["embed"])
+            else:
+                # Pendente criado antes de o embed ser guardado no estado
+                embed = (await mensagem.fetch()).embeds[0]
+            embed.color = discord.Color.red()
+            embed.set_footer(text=f"Mangá pego por {nome} com {payload.emoji}")
+            
+            await mensagem.edit(embed=embed)
+            
+            await mensagem.channel.send(f"🎉 {mencao} pegou o mangá **{manga_data['title']}** com {payload.emoji}!")
+        except Exception as e:
+            logger.error(f"Erro ao processar reação: {e}")
+    
+    def _registrar_decisao(self, inicio, resultado):
+        """Registra a latência da decisão de uma reação e o seu resultado"""
+        metrics.log_histogram("claim_decision_ms", (time.perf_counter() - inicio) * 1000)
+        metrics.log_counter(f"claim_{resultado}")
+    
+    def _atualizar_shard(self, shard_id, estado):
+        """Registra a última transição de conexão de um shard"""
+        info = self.estado_shards.setdefault(shard_id, {"state": None, "since": None, "reconnects": 0})
+        if estado == "connected" and info["state"] is not None:
+            info["reconnects"] += 1
+        info["state"] = estado
+        info["since"] = datetime.now().isoformat()
+    
+    async def on_shard_connect(self, shard_id):
+        """Evento disparado quando um shard conecta ao gateway"""
+        self._atualizar_shard(shard_id, "connected")
+    
+    async def on_shard_resumed(self, shard_id):
+        """Evento disparado quando um shard retoma a sessão"""
+        self._atualizar_shard(shard_id, "connected")
+    
+    async def on_shard_disconnect(self, shard_id):
+        """Evento disparado quando um shard perde a conexão"""
+        logger.warning(f"Shard {shard_id} desconectado")
+        self._atualizar_shard(shard_id, "disconnected")
+    
+    async def on_shard_ready(self, shard_id):
+        """Evento disparado quando um shard termina de carregar seus servidores"""
+        logger.info(f"Shard {shard_id} pronto")
+        self._atualizar_shard(shard_id, "ready")
+    
+    def get_shard_stats(self):
+        """Retorna saúde, latência e quantidade de servidores de cada shard deste processo"""
+        guilds_por_shard = Counter(guild.shard_id for guild in self.guilds)
+        shards = []
+        for shard_id, shard in sorted(self.shards.items()):
+            info = self.estado_shards.get(shard_id, {})
+            shards.append({
+                "id": shard_id,
+                "state": "closed" if shard.is_closed() else info.get("state", "starting"),
+                "latency_ms": round(shard.latency * 1000) if math.isfinite(shard.latency) else None,
+                "guilds": guilds_por_shard.get(shard_id, 0),
+                "reconnects": info.get("reconnects", 0),
+                "since": info.get("since"),
+            })
+        return {
+            "process": self.processo,
+            "shard_count": self.shard_count,
+            "shards": shards,
+        }
     
     async def on_ready(self):
         """Evento disparado quando o bot está pronto"""
         logger.info(f'Bot conectado como {self.user}')
+        
+        if "ready" not in startup.fases:
+            startup.marco("ready")
+            fases = ", ".join(f"{nome}={ms:.0f}ms" for nome, ms in startup.get_stats().items())
+            logger.info(f"Tempos de inicialização: {fases}")
     
     async def close(self):
         """Sobrescrevendo método close para limpar recursos"""
+        await self.manga_pool.close()
+        await self.expiracoes.close()
         await self.jikan.close()
         await super().close()
+        await self.db.close()
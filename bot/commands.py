@@ -3,18 +3,34 @@ Comandos do bot Discord
 """
 import discord
 import asyncio
+import hashlib
+import json
 import random
-from datetime import datetime, timedelta
+from discord import app_commands
+from datetime import datetime
 from utils.constants import (
-    LIMITE_MANGA_POR_HORA, LIMITE_MANGA_RESET,
+    LIMITE_MANGA_POR_HORA,
     LIMITE_PEGAR_MANGA, LIMITE_PEGAR_RESET,
     MANGA_EXPIRATION_TIME
 )
 from utils.logger import setup_logger
 from utils.metrics import metrics
+from utils.startup import startup
 
 logger = setup_logger()
 
+PERIODOS_RANKING = [
+    app_commands.Choice(name="Geral", value="total"),
+    app_commands.Choice(name="Semanal", value="semana"),
+    app_commands.Choice(name="Mensal", value="mes"),
+]
+
+DESCRICAO_PERIODO = {
+    "total": "",
+    "semana": " nesta semana",
+    "mes": " neste mês",
+}
+
 class Commands:
     """Classe para gerenciar comandos do bot"""
     
@@ -28,7 +44,12 @@ class Commands:
         self.client = client
     
     async def setup_commands(self):
-        """Configura todos os comandos slash"""
+        """
+        Configura todos os comandos slash
+
+        Returns:
+            str: Assinatura dos comandos registrados (ver assinatura_comandos)
+        """
         
         @self.client.tree.command(name="rl", description="Receba um mangá aleatório! Reaja para pegá-lo!")
         async def manga_aleatorio(interaction: discord.Interaction):
@@ -41,9 +62,11 @@ class Commands:
             await self._cmd_meus_mangas(interaction)
                 
         @self.client.tree.command(name="ranking", description="Veja quem pegou mais mangás no servidor!")
-        async def ranking_mangas(interaction: discord.Interaction):
+        @app_commands.describe(periodo="Período do ranking (padrão: geral)")
+        @app_commands.choices(periodo=PERIODOS_RANKING)
+        async def ranking_mangas(interaction: discord.Interaction, periodo: app_commands.Choice[str] = None):
             metrics.log_command("ranking", user_id=interaction.user.id, guild_id=interaction.guild_id if interaction.guild else None)
-            await self._cmd_ranking(interaction)
+            await self._cmd_ranking(interaction, periodo.value if periodo else "total")
             
         @self.client.tree.command(name="daily", description="Receba pecinhas diárias! (cooldown de 24h)")
         async def daily(interaction: discord.Interaction):
@@ -56,9 +79,11 @@ class Commands:
             await self._cmd_saldo(interaction)
             
         @self.client.tree.command(name="rankingpecinhas", description="Veja o ranking de pecinhas do servidor!")
-        async def ranking_pecinhas(interaction: discord.Interaction):
+        @app_commands.describe(periodo="Período do ranking (padrão: geral)")
+        @app_commands.choices(periodo=PERIODOS_RANKING)
+        async def ranking_pecinhas(interaction: discord.Interaction, periodo: app_commands.Choice[str] = None):
             metrics.log_command("rankingpecinhas", user_id=interaction.user.id, guild_id=interaction.guild_id if interaction.guild else None)
-            await self._cmd_ranking_pecinhas(interaction)
+            await self._cmd_ranking_pecinhas(interaction, periodo.value if periodo else "total")
                 
         @self.client.tree.command(name="ajuda", description="Exibe a ajuda detalhada sobre o bot e seus comandos")
         async def ajuda(interaction: discord.Interaction):
@@ -74,6 +99,33 @@ class Commands:
         async def status(interaction: discord.Interaction):
             metrics.log_command("status", user_id=interaction.user.id, guild_id=interaction.guild_id if interaction.guild else None)
             await self._cmd_status(interaction)
+        
+        return self.assinatura_comandos()
+    
+    def assinatura_comandos(self):
+        """
+        Calcula um hash estável das definições dos comandos registrados na árvore
+
+        Nome, descrição, parâmetros e opções de cada comando entram no hash, na
+        mesma forma em que são enviados ao Discord pelo sync.
+
+        Returns:
+            str: Hash SHA-256 em hexadecimal
+        """
+        definicoes = sorted(
+            (self._serializar_comando(comando) for comando in self.client.tree.get_commands()),
+            key=lambda definicao: definicao["name"]
+        )
+        conteudo = json.dumps(definicoes, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+    
+    def _serializar_comando(self, comando):
+        """Converte um comando no payload JSON enviado ao Discord"""
+        try:
+            return comando.to_dict(self.client.tree)
+        except TypeError:
+            # discord.py < 2.4: to_dict() não recebe a árvore
+            return comando.to_dict()
     
     async def _cmd_manga_aleatorio(self, interaction: discord.Interaction):
         """Implementação do comando /rl"""
@@ -93,16 +145,17 @@ class Commands:
             return
             
         await interaction.response.defer()
+        user_id = interaction.user.id
+        # Consome a vaga antes de sortear, para que comandos simultâneos não passem do limite;
+        # ela é estornada se nenhum mangá chegar a ser enviado
+        consumido = False
+        enviado = False
         try:
-            user_id = interaction.user.id
-            pode_pegar, mangas_restantes, registros = self.client.verificar_limite_rl(user_id)
+            pode_pegar, mangas_restantes, tempo_restante = await self.client.estado.consumir_limite("rl", user_id)
             
             if not pode_pegar:
-                agora = datetime.now()
-                primeiro_registro = min(registros)
-                tempo_restante = primeiro_registro + timedelta(seconds=LIMITE_MANGA_RESET) - agora
-                minutos = int(tempo_restante.total_seconds() // 60)
-                segundos = int(tempo_restante.total_seconds() % 60)
+                minutos = int(tempo_restante // 60)
+                segundos = int(tempo_restante % 60)
                 
                 embed = discord.Embed(
                     title="Limite de Mangás Atingido",
@@ -111,24 +164,30 @@ class Commands:
                 )
                 await interaction.followup.send(embed=embed, ephemeral=True)
                 return
+            consumido = True
+            
+            entrada = self.client.manga_pool.pop()
+            
+            if entrada is None:
+                max_retries = 3
+                for attempt in range(max_retries):
+                    try:
+                        manga = await self.client.jikan.obter_manga_aleatorio()
+                        break
+                    except Exception as e:
+                        if attempt == max_retries - 1:
+                            logger.error(f"Falha ao obter mangá após {max_retries} tentativas: {e}")
+                            await interaction.followup.send(
+                                "Desculpe, não foi possível obter um mangá aleatório neste momento. Tente novamente mais tarde.",
+                                ephemeral=True
+                            )
+                            return
+                        await asyncio.sleep(1)
+                
+                from bot.manga_pool import preparar_manga
+                entrada = preparar_manga(manga)
             
-            max_retries = 3
-            for attempt in range(max_retries):
-                try:
-                    manga = await self.client.jikan.obter_manga_aleatorio()
-                    break
-                except Exception as e:
-                    if attempt == max_retries - 1:
-                        logger.error(f"Falha ao obter mangá após {max_retries} tentativas: {e}")
-                        await interaction.followup.send(
-                            "Desculpe, não foi possível obter um mangá aleatório neste momento. Tente novamente mais tarde.",
-                            ephemeral=True
-                        )
-                        return
-                    await asyncio.sleep(1)
-            
-            manga_id, titulo = manga.get("mal_id"), manga.get("title")
-            if not manga_id or not titulo:
+            if entrada is None:
                 await interaction.followup.send(
                     "Recebi dados inválidos da API de mangás. Por favor, tente novamente.",
                     ephemeral=True
@@ -136,101 +195,94 @@ class Commands:
                 metrics.log_error("invalid_manga_data")
                 return
             
-            titulo = discord.utils.escape_markdown(titulo)
-            titulo = titulo[:256]
-            
-            imagens = manga.get("images", {}).get("jpg", {})
-            imagem = imagens.get("large_image_url") or imagens.get("image_url")
-            
-            sinopse = manga.get("synopsis") or "Sem sinopse disponível."
-            sinopse = discord.utils.escape_markdown(sinopse)
-            sinopse = sinopse[:4000]
-            
-            url_manga = manga.get("url") or ""
-            if url_manga and not url_manga.startswith("https://myanimelist.net/"):
-                url_manga = f"https://myanimelist.net/manga/{manga_id}"
-            from utils.constants import calcular_criptogenes
-            popularidade = manga.get("popularity", 0)
-            score = manga.get("score", 0)
-            members = manga.get("members", 0)
-            favorites = manga.get("favorites", 0)
-            status = manga.get("status", "")
-            criptogenes = calcular_criptogenes(
-                popularidade=popularidade,
-                score=score, 
-                members=members,
-                favorites=favorites,                status=status
-            )
+            manga_id, titulo = entrada["manga_id"], entrada["title"]
             
             embed = discord.Embed(
                 title=titulo, 
-                description=f"{sinopse}\n\n<a:gold_stud:1380069369580748840> **Pecinhas:** {criptogenes}",
+                description=f"{entrada['synopsis']}\n\n<a:gold_stud:1380069369580748840> **Pecinhas:** {entrada['pecinhas']}",
                 color=discord.Color.green()
             )
-            if url_manga:
-                embed.url = url_manga
-            if imagem:
-                embed.set_image(url=imagem)
+            if entrada["url"]:
+                embed.url = entrada["url"]
+            if entrada["image"]:
+                embed.set_image(url=entrada["image"])
             
             footer_text = "Reaja com qualquer emoji para pegar este mangá!"
-            if mangas_restantes <= 2:
-                footer_text = f"ATENÇÃO! Este é um dos seus últimos {mangas_restantes} mangás disponíveis na próxima hora! " + footer_text
+            # mangas_restantes já desconta este mangá
+            if mangas_restantes + 1 <= 2:
+                footer_text = f"ATENÇÃO! Este é um dos seus últimos {mangas_restantes + 1} mangás disponíveis na próxima hora! " + footer_text
             
             embed.set_footer(text=footer_text)
             
             message = await interaction.followup.send(embed=embed)
+            enviado = True
             
-            self.client.mangas_pendentes[message.id] = {
+            await self.client.estado.adicionar_pendente(message.id, {
                 "manga_id": manga_id,
                 "title": titulo,
-                "timestamp": datetime.now().isoformat(),
-                "expirado": False
-            }
-            
-            user_id_str = str(user_id)
-            if user_id_str not in self.client.rl_comandos_por_usuario:
-                self.client.rl_comandos_por_usuario[user_id_str] = []
-            self.client.rl_comandos_por_usuario[user_id_str].append(datetime.now())
+                "pecinhas": entrada["pecinhas"],
+                "embed": embed.to_dict(),
+                "timestamp": datetime.now().isoformat()
+            })
             
             emojis_sugestao = ["👍", "❤️", "😂", "🔥", "🥰", "👀", "🎮", "📚", "🎯", "✨"]
             emoji_sugerido = random.choice(emojis_sugestao)
             await message.add_reaction(emoji_sugerido)
             
-            self.client.loop.create_task(self.client.expirar_manga(message.id, interaction.channel_id))
+            self.client.agendar_expiracao(message, embed)
             
         except Exception as e:
             logger.error(f"Erro ao buscar mangá aleatório: {e}")
             await interaction.followup.send(f"Erro ao buscar mangá: {e}")
+        finally:
+            if consumido and not enviado:
+                try:
+                    await self.client.estado.estornar_limite("rl", user_id)
+                except Exception as e:
+                    logger.error(f"Erro ao estornar limite do /rl: {e}")
             
     async def _cmd_meus_mangas(self, interaction: discord.Interaction):
         """Implementação do comando /meusmangas"""
         await interaction.response.defer()
         try:
             usuario_id = str(interaction.user.id)
-            manga_ids = await self.client.db.obter_mangas_usuario(usuario_id)
+            mangas = await self.client.db.obter_mangas_usuario(usuario_id)
             
-            if not manga_ids:
+            if not mangas:
                 await interaction.followup.send("Você ainda não recebeu nenhum mangá! Use /rl para pegar um aleatório.")
                 return
             
-            mangas = []
-            for manga_id in manga_ids:
-                info = await self.client.jikan.fetch_manga_info(manga_id, return_full_data=True)
-                mangas.append(info)
+            colecao = await self.client.db.obter_valor_colecao(usuario_id)
             
             from views.pagination import MangaPaginationView
-            view = MangaPaginationView(mangas, interaction.user.display_name)
+            view = MangaPaginationView(
+                mangas, interaction.user.display_name, self.client.jikan,
+                colecao=colecao
+            )
             embed = await view.generate_embed()            
             await interaction.followup.send(embed=embed, view=view)
         except Exception as e:
             logger.error(f"Erro ao buscar mangás do usuário: {e}")
             await interaction.followup.send(f"Erro ao buscar seus mangás: {e}")
     
-    async def _cmd_ranking(self, interaction: discord.Interaction):
+    async def _cmd_ranking(self, interaction: discord.Interaction, periodo="total"):
         """Implementação do comando /ranking"""
         await interaction.response.defer()
         try:
-            resultados = await self.client.db.obter_ranking()
+            escopo = str(interaction.guild_id) if interaction.guild_id else None
+            periodo = periodo if escopo else "total"
+            em_cache = self.client.rankings.get("mangas", escopo, periodo)
+            if em_cache:
+                await interaction.followup.send(embed=discord.Embed.from_dict(em_cache["embed"]))
+                return
+            geracao = self.client.rankings.geracao("mangas", escopo)
+            
+            if interaction.guild_id:
+                resultados = await self.client.db.obter_ranking_guild(interaction.guild_id, periodo)
+                descricao = f"Os usuários deste servidor que mais pegaram mangás diferentes{DESCRICAO_PERIODO[periodo]}!"
+            else:
+                resultados = await self.client.db.obter_ranking()
+                descricao = "Os usuários que mais pegaram mangás diferentes!"
             
             if not resultados:
                 await interaction.followup.send("Ainda não há usuários no ranking de mangás!")
@@ -238,312 +290,44 @@ class Commands:
             
             embed = discord.Embed(
                 title="🏆 Ranking de Colecionadores de Mangá",
-                description="Os usuários que mais pegaram mangás diferentes!",
-                color=discord.Color.gold()
-            )
-            
-            medalhas = ["🥇", "🥈", "🥉"]
-            for i, (usuario_id, total) in enumerate(resultados):
-                try:
-                    usuario = await self.client.fetch_user(int(usuario_id))
-                    nome = usuario.display_name
-                except:
-                    nome = f"Usuário ID {usuario_id}"
-                
-                emoji = medalhas[i] if i < 3 else "🏅"
-                
-                embed.add_field(
-                    name=f"{emoji} {i+1}º Lugar",
-                    value=f"**{nome}** - {total} mangás",
-                    inline=False
-                )
-                await interaction.followup.send(embed=embed)
-        except Exception as e:
-            logger.error(f"Erro ao buscar ranking: {e}")
-            await interaction.followup.send(f"Erro ao buscar o ranking: {e}")
-    
-    async def _cmd_saldo(self, interaction: discord.Interaction):
-        """Implementação do comando /saldo"""
-        await interaction.response.defer()
-        try:
-            user_id = interaction.user.id
-            dados_usuario = await self.client.db.obter_saldo_usuario(user_id)
-            
-            saldo = dados_usuario['saldo']
-            total_ganho = dados_usuario['total_ganho']
-            ultimo_daily = dados_usuario['ultimo_daily']
-            
-            embed = discord.Embed(
-                title=f"💳 Saldo de {interaction.user.display_name}",
+                description=descricao,
                 color=discord.Color.gold()
             )
             
-            embed.add_field(
-                name="<a:gold_stud:1380069369580748840> Pecinhas Atuais",
-                value=f"**{saldo:,.2f}**",
-                inline=True
-            )
-            
-            embed.add_field(
-                name="📈 Total Ganho",
-                value=f"**{total_ganho:,.2f}**",
-                inline=True
-            )
-            
-            if ultimo_daily:
-                from datetime import datetime, timedelta
-                agora = datetime.now()
-                pode_daily = ultimo_daily + timedelta(hours=24) <= agora
-                
-                if pode_daily:
-                    daily_status = "✅ **Disponível!**"
-                else:
-                    tempo_restante = ultimo_daily + timedelta(hours=24) - agora
-                    horas = int(tempo_restante.total_seconds() // 3600)
-                    minutos = int((tempo_restante.total_seconds() % 3600) // 60)
-                    daily_status = f"⏰ **{horas}h {minutos}m**"
-            else:
-                daily_status = "✅ **Disponível!**"
-            
-            embed.add_field(
-                name="🎁 Daily",
-                value=daily_status,
-                inline=True
-            )
-            
-            embed.set_thumbnail(url=interaction.user.display_avatar.url)
-            await interaction.followup.send(embed=embed)
-            
-        except Exception as e:
-            logger.error(f"Erro no comando saldo: {e}")
-            await interaction.followup.send("Erro ao obter saldo. Tente novamente.", ephemeral=True)
-    
-    async def _cmd_ranking_pecinhas(self, interaction: discord.Interaction):
-        """Implementação do comando /rankingpecinhas"""
-        await interaction.response.defer()
-        try:
-            resultados = await self.client.db.obter_ranking_economia()
-            
-            if not resultados:
-                await interaction.followup.send("Ainda não há usuários no ranking de pecinhas!")
-                return
-            
-            embed = discord.Embed(
-                title="🏆 Ranking de Pecinhas",
-                description="Os usuários com mais pecinhas acumuladas!",
-                color=discord.Color.gold()
+            nomes = await self.client.usuarios.resolver_nomes(
+                [usuario_id for usuario_id, _ in resultados], interaction.guild
             )
             
             medalhas = ["🥇", "🥈", "🥉"]
-            for i, (usuario_id, saldo, total_ganho) in enumerate(resultados):
-                try:
-                    usuario = await self.client.fetch_user(int(usuario_id))
-                    nome = usuario.display_name
-                except:
-                    nome = f"Usuário ID {usuario_id}"
+            for i, (usuario_id, total) in enumerate(resultados):
+                nome = nomes[int(usuario_id)]
                 
                 emoji = medalhas[i] if i < 3 else "🏅"
                 
                 embed.add_field(
                     name=f"{emoji} {i+1}º Lugar",
-                    value=f"**{nome}**\n"
-                           f"💰 Saldo: {saldo:,.0f} <a:gold_stud:1380069369580748840>\n"
-                           f"📈 Total ganho: {total_ganho:,.0f} <a:gold_stud:1380069369580748840>",
+                    value=f"**{nome}** - {total} mangás",
                     inline=False
                 )
             
+            self.client.rankings.set("mangas", escopo, periodo, resultados, embed.to_dict(), geracao)
             await interaction.followup.send(embed=embed)
         except Exception as e:
-            logger.error(f"Erro ao buscar ranking de pecinhas: {e}")
+            logger.error(f"Erro ao buscar ranking: {e}")
             await interaction.followup.send(f"Erro ao buscar o ranking: {e}")
     
-    async def _cmd_ajuda(self, interaction: discord.Interaction):
-        """Implementação do comando /ajuda"""
-        embed = discord.Embed(
-            title="📚 Ajuda do Bot de Mangás",
-            description="Este bot permite descobrir e coletar mangás aleatórios! Abaixo estão os comandos disponíveis e como usá-los:",
-            color=discord.Color.blue()
-        )
-        
-        embed.add_field(
-            name="📖 `/rl`", 
-            value="Gera um mangá aleatório para você ou outros usuários.\n"
-                f"**Limite de rolagem:** {LIMITE_MANGA_POR_HORA} mangás por hora.\n"
-                f"**Limite para pegar:** {LIMITE_PEGAR_MANGA} mangá a cada {LIMITE_PEGAR_RESET//3600} horas.\n"
-                f"**Tempo de expiração:** {MANGA_EXPIRATION_TIME} segundos para reagir e coletar.", 
-            inline=False
-        )
-        
-        embed.add_field(
-            name="📑 `/meusmangas`", 
-            value="Exibe uma lista paginada de todos os mangás que você já coletou, com links para suas páginas no MyAnimeList.",
-            inline=False        )
-        
-        embed.add_field(
-            name="🏆 `/ranking`", 
-            value="Mostra o ranking dos usuários que mais coletaram mangás únicos no servidor.",
-            inline=False
-        )
-        
-        embed.add_field(
-            name="📊 `/estatisticas`",
-            value="Exibe estatísticas sobre o uso do bot, como tempo online, mangás distribuídos, etc.",
-            inline=False
-        )
-        
-        embed.add_field(
-            name="🤖 `/status`",
-            value="Mostra o status atual do bot, sistema keep-alive e informações técnicas.",
-            inline=False
-        )
-        
-        embed.add_field(
-            name="💰 `/daily`",
-            value="Receba pecinhas diárias! Entre 50-300 pecinhas com cooldown de 24 horas.\n"
-                "Valores concentrados em torno de 100 e 200 pecinhas.",
-            inline=False
-        )
-        
-        embed.add_field(
-            name="💳 `/saldo`",
-            value="Visualize seu saldo atual de pecinhas, total ganho e status do daily.",
-            inline=False
-        )
-        
-        embed.add_field(
-            name="🏆 `/rankingpecinhas`",
-            value="Veja o ranking dos usuários com mais pecinhas acumuladas no servidor.",
-            inline=False
-        )
-        
-        embed.add_field(
-            name="<a:gold_stud:1380069369580748840> Sistema de Pecinhas Lendário:",
-            value="Cada mangá possui um valor baseado em múltiplos fatores:\n"
-                "- **Score**: Pontuação do manga (0-10)\n"
-                "- **Popularidade**: Ranking no MyAnimeList (quanto menor, melhor)\n" 
-                "- **Membros**: Quantos usuários adicionaram o manga\n"
-                "- **Favoritos**: Quantos usuários favoritaram\n"
-                "- **Status**: Se está sendo publicado, completo, etc.\n\n"
-                "💎 **Raridade Extrema**: Apenas mangás LEGENDÁRIOS se aproximam de 1000 Pecinhas\n"
-                "🏆 **Top 10**: ~800-950 Pecinhas\n"
-                "⭐ **Top 100**: ~400-700 Pecinhas\n"
-                "🎯 **Populares**: ~200-500 Pecinhas\n"
-                "📚 **Comuns**: ~50-200 Pecinhas",
-            inline=False
-        )
-        
-        embed.add_field(
-            name="💡 Dicas:",
-            value="- Você pode clicar nos títulos dos mangás para ver sua página no MyAnimeList.\n"
-                "- Você pode rolar mangás até atingir o limite por hora.\n"
-                "- Para pegar mangás há um limite separado (1 a cada 5 horas).\n"
-                "- Você pode pegar mangás que outros usuários rolaram, mesmo se atingiu seu limite de rolagem.\n"
-                "- As reações precisam ser feitas rapidamente antes do mangá expirar.\n"
-                "- Tente coletar mangás com alto valor de Pecinhas!",
-            inline=False
-        )
-        
-        embed.set_footer(text="Bot criado com a API Jikan (MyAnimeList) | Dados de mangás fornecidos pelo MyAnimeList.net")
-        
-        await interaction.response.send_message(embed=embed, ephemeral=True)
-    
-    async def _cmd_estatisticas(self, interaction: discord.Interaction):
-        """Implementação do comando /estatisticas"""
-        stats = metrics.get_stats_summary()
-        
-        embed = discord.Embed(
-            title="📊 Estatísticas do Bot",
-            description="Informações sobre o desempenho e uso do bot:",
-            color=discord.Color.gold()
-        )
-        
-        embed.add_field(name="⏱️ Tempo online", value=stats["uptime"], inline=True)
-        embed.add_field(name="🔢 Total de comandos", value=str(stats["total_commands"]), inline=True)
-        embed.add_field(name="🖥️ Servidores ativos", value=str(stats["active_guilds"]), inline=True)
-        
-        top_cmds = stats["top_commands"]
-        if top_cmds:
-            cmd_text = "\n".join([f"{cmd}: {count}" for cmd, count in top_cmds])
-            embed.add_field(name="📈 Comandos mais usados", value=cmd_text, inline=False)
-        
-        embed.add_field(name="⚡ Tempo médio de resposta API", value=stats["avg_api_response_time"], inline=True)
-        embed.add_field(name="💾 Taxa de acerto do cache", value=stats["cache_hit_rate"], inline=True)
-        
-        await interaction.response.send_message(embed=embed, ephemeral=True)
-    
-    async def _cmd_status(self, interaction: discord.Interaction):
-        """Implementação do comando /status"""
-        import os
-        from datetime import datetime
-        
-        embed = discord.Embed(
-            title="🤖 Status do Bot",
-            description="Informações sobre o status atual do bot e sistema keep-alive:",
-            color=discord.Color.green()
-        )
-        
-        latency = round(self.client.latency * 1000)
-        guild_count = len(self.client.guilds)
-        user_count = len(self.client.users)
-        
-        embed.add_field(name="🏓 Latência", value=f"{latency}ms", inline=True)
-        embed.add_field(name="🏠 Servidores", value=str(guild_count), inline=True)
-        embed.add_field(name="👥 Usuários", value=str(user_count), inline=True)
-        
-        render_url = os.environ.get('RENDER_EXTERNAL_URL', 'N/A')
-        port = os.environ.get('PORT', '8000')
-        
-        embed.add_field(name="🌐 URL do Render", value=render_url if render_url != 'N/A' else "Local", inline=False)
-        embed.add_field(name="🔌 Porta do Servidor", value=port, inline=True)
-        
-        if hasattr(self.client, '_keep_alive_server'):
-            server = self.client._keep_alive_server
-            if server:
-                embed.add_field(
-                    name="🔄 Keep-Alive", 
-                    value=f"✅ Ativo (Pings: {server.ping_count})", 
-                    inline=True
-                )
-            else:
-                embed.add_field(name="🔄 Keep-Alive", value="❌ Inativo", inline=True)
-        else:
-            embed.add_field(name="🔄 Keep-Alive", value="⚠️ Status desconhecido", inline=True)
-        
-        bg_tasks_status = []
-        if hasattr(self.client, 'bg_task') and self.client.bg_task:
-            bg_tasks_status.append("✅ Limpeza de mangás")
-        if hasattr(self.client, 'rl_cleanup_task') and self.client.rl_cleanup_task:
-            bg_tasks_status.append("✅ Limpeza de rate limit")
-        if hasattr(self.client, 'pegar_cleanup_task') and self.client.pegar_cleanup_task:
-            bg_tasks_status.append("✅ Limpeza de pegar mangás")
-        
-        if bg_tasks_status:
-            embed.add_field(
-                name="⚙️ Tasks em Background", 
-                value="\n".join(bg_tasks_status), 
-                inline=False
-            )
-        
-        pending_count = len(getattr(self.client, 'mangas_pendentes', {}))
-        embed.add_field(name="📚 Mangás Pendentes", value=str(pending_count), inline=True)
-        
-        if render_url != 'N/A':
-            links = f"[Health Check]({render_url}/health) • [Stats JSON]({render_url}/stats)"
-            embed.add_field(name="🔗 Links", value=links, inline=False)
-        
-        embed.set_footer(text=f"Sistema iniciado: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
-        
-        await interaction.response.send_message(embed=embed, ephemeral=True)
-        
     async def _cmd_daily(self, interaction: discord.Interaction):
         """Implementação do comando /daily"""
         await interaction.response.defer()
         try:
             user_id = interaction.user.id
             
-            pode_usar, tempo_restante = await self.client.db.verificar_pode_daily(user_id)
+            from utils.constants import gerar_valor_daily
+            valor = gerar_valor_daily()
+            
+            novo_saldo, tempo_restante = await self.client.db.registrar_daily(user_id, valor, interaction.guild_id)
             
-            if not pode_usar:
+            if novo_saldo is None:
                 horas = int(tempo_restante.total_seconds() // 3600)
                 minutos = int((tempo_restante.total_seconds() % 3600) // 60)
                 
@@ -555,11 +339,6 @@ class Commands:
                 await interaction.followup.send(embed=embed, ephemeral=True)
                 return
             
-            from utils.constants import gerar_valor_daily
-            valor = gerar_valor_daily()
-            
-            novo_saldo = await self.client.db.registrar_daily(user_id, valor)
-            
             if valor >= 250:
                 emoji = "💎"
                 raridade = "**LENDÁRIO**"
@@ -647,11 +426,22 @@ class Commands:
             logger.error(f"Erro no comando saldo: {e}")
             await interaction.followup.send("Erro ao obter saldo. Tente novamente.", ephemeral=True)
     
-    async def _cmd_ranking_pecinhas(self, interaction: discord.Interaction):
+    async def _cmd_ranking_pecinhas(self, interaction: discord.Interaction, periodo="total"):
         """Implementação do comando /rankingpecinhas"""
         await interaction.response.defer()
         try:
-            resultados = await self.client.db.obter_ranking_economia()
+            escopo = str(interaction.guild_id) if interaction.guild_id else None
+            periodo = periodo if escopo else "total"
+            em_cache = self.client.rankings.get("pecinhas", escopo, periodo)
+            if em_cache:
+                await interaction.followup.send(embed=discord.Embed.from_dict(em_cache["embed"]))
+                return
+            geracao = self.client.rankings.geracao("pecinhas", escopo)
+            
+            if interaction.guild_id:
+                resultados = await self.client.db.obter_ranking_economia_guild(interaction.guild_id, periodo)
+            else:
+                resultados = await self.client.db.obter_ranking_economia()
             
             if not resultados:
                 await interaction.followup.send("Ainda não há usuários no ranking de pecinhas!")
@@ -659,28 +449,37 @@ class Commands:
             
             embed = discord.Embed(
                 title="🏆 Ranking de Pecinhas",
-                description="Os usuários com mais pecinhas acumuladas!",
+                description=(
+                    f"Os usuários que mais ganharam pecinhas neste servidor{DESCRICAO_PERIODO[periodo]}!"
+                    if interaction.guild_id else "Os usuários com mais pecinhas acumuladas!"
+                ),
                 color=discord.Color.gold()
             )
             
+            nomes = await self.client.usuarios.resolver_nomes(
+                [linha[0] for linha in resultados], interaction.guild
+            )
+            
             medalhas = ["🥇", "🥈", "🥉"]
-            for i, (usuario_id, saldo, total_ganho) in enumerate(resultados):
-                try:
-                    usuario = await self.client.fetch_user(int(usuario_id))
-                    nome = usuario.display_name
-                except:
-                    nome = f"Usuário ID {usuario_id}"
+            for i, linha in enumerate(resultados):
+                nome = nomes[int(linha[0])]
                 
                 emoji = medalhas[i] if i < 3 else "🏅"
                 
+                if interaction.guild_id:
+                    valor = f"**{nome}**\n📈 Ganho no servidor: {linha[1]:,.0f} <a:gold_stud:1380069369580748840>"
+                else:
+                    valor = (f"**{nome}**\n"
+                             f"💰 Saldo: {linha[1]:,.0f} <a:gold_stud:1380069369580748840>\n"
+                             f"📈 Total ganho: {linha[2]:,.0f} <a:gold_stud:1380069369580748840>")
+                
                 embed.add_field(
                     name=f"{emoji} {i+1}º Lugar",
-                    value=f"**{nome}**\n"
-                           f"💰 Saldo: {saldo:,.0f} <a:gold_stud:1380069369580748840>\n"
-                           f"📈 Total ganho: {total_ganho:,.0f} <a:gold_stud:1380069369580748840>",
+                    value=valor,
                     inline=False
                 )
             
+            self.client.rankings.set("pecinhas", escopo, periodo, resultados, embed.to_dict(), geracao)
             await interaction.followup.send(embed=embed)
         except Exception as e:
             logger.error(f"Erro ao buscar ranking de pecinhas: {e}")
@@ -798,6 +597,21 @@ class Commands:
         embed.add_field(name="⚡ Tempo médio de resposta API", value=stats["avg_api_response_time"], inline=True)
         embed.add_field(name="💾 Taxa de acerto do cache", value=stats["cache_hit_rate"], inline=True)
         
+        ranking_stats = self.client.rankings.get_stats()
+        embed.add_field(
+            name="🏆 Cache de rankings",
+            value=f"{ranking_stats['hit_rate'] * 100:.1f}% de acerto "
+                  f"({ranking_stats['hits']}/{ranking_stats['hits'] + ranking_stats['misses']}), "
+                  f"{ranking_stats['invalidations']} invalidações",
+            inline=True
+        )
+        usuarios_stats = self.client.usuarios.get_stats()
+        embed.add_field(
+            name="👤 Cache de nomes",
+            value=f"{usuarios_stats['hit_rate'] * 100:.1f}% de acerto, {usuarios_stats['gateway_hits']} do gateway",
+            inline=True
+        )
+        
         await interaction.response.send_message(embed=embed, ephemeral=True)
     
     async def _cmd_status(self, interaction: discord.Interaction):
@@ -819,6 +633,16 @@ class Commands:
         embed.add_field(name="🏠 Servidores", value=str(guild_count), inline=True)
         embed.add_field(name="👥 Usuários", value=str(user_count), inline=True)
         
+        shard_stats = self.client.get_shard_stats()
+        if shard_stats["shard_count"] > 1:
+            embed.add_field(
+                name="🧩 Shards",
+                value=f"Processo {shard_stats['process']}: " + ", ".join(
+                    f"#{shard['id']} {shard['latency_ms']}ms" for shard in shard_stats["shards"]
+                ) + f" (total {shard_stats['shard_count']})",
+                inline=False
+            )
+        
         render_url = os.environ.get('RENDER_EXTERNAL_URL', 'N/A')
         port = os.environ.get('PORT', '8000')
         
@@ -839,12 +663,13 @@ class Commands:
             embed.add_field(name="🔄 Keep-Alive", value="⚠️ Status desconhecido", inline=True)
         
         bg_tasks_status = []
-        if hasattr(self.client, 'bg_task') and self.client.bg_task:
-            bg_tasks_status.append("✅ Limpeza de mangás")
-        if hasattr(self.client, 'rl_cleanup_task') and self.client.rl_cleanup_task:
-            bg_tasks_status.append("✅ Limpeza de rate limit")
-        if hasattr(self.client, 'pegar_cleanup_task') and self.client.pegar_cleanup_task:
-            bg_tasks_status.append("✅ Limpeza de pegar mangás")
+        expiracao_stats = self.client.expiracoes.get_stats()
+        if expiracao_stats["running"]:
+            bg_tasks_status.append(
+                f"✅ Expiração/limpeza: {expiracao_stats['scheduled']} agendadas, "
+                f"atraso médio {expiracao_stats['lag_avg_ms']}ms"
+            )
+        bg_tasks_status.append(f"🧵 Tasks no event loop: {expiracao_stats['event_loop_tasks']}")
         
         if bg_tasks_status:
             embed.add_field(
@@ -853,9 +678,45 @@ class Commands:
                 inline=False
             )
         
-        pending_count = len(getattr(self.client, 'mangas_pendentes', {}))
-        embed.add_field(name="📚 Mangás Pendentes", value=str(pending_count), inline=True)
-        
+        estado_stats = await self.client.estado.get_stats()
+        embed.add_field(
+            name="📚 Mangás Pendentes",
+            value=f"{estado_stats['pending']} ({estado_stats['backend']}, {estado_stats['pending_bytes'] / 1024:.1f} KiB)",
+            inline=True
+        )
+        embed.add_field(
+            name="⏳ Limites Ativos",
+            value=f"/rl: {estado_stats['limits']['rl']} usuários\nPegar: {estado_stats['limits']['pegar']} usuários",
+            inline=True
+        )
+
+        rl_pool_stats = self.client.manga_pool.get_stats()
+        embed.add_field(
+            name="🎲 Buffer do /rl",
+            value=f"{rl_pool_stats['depth']}/{rl_pool_stats['capacity']} prontos "
+                  f"({rl_pool_stats['refills_per_minute']}/min, vazio {rl_pool_stats['empty']}x)",
+            inline=True
+        )
+
+        pool_stats = self.client.db.get_pool_stats()
+        if pool_stats["active"]:
+            embed.add_field(
+                name="🗄️ Pool do Banco",
+                value=f"Em uso: {pool_stats['in_use']}/{pool_stats['max_size']} (aguardando: {pool_stats['waiting']})\n"
+                      f"Espera média: {pool_stats['avg_acquire_wait_ms']}ms (máx: {pool_stats['max_acquire_wait_ms']}ms)",
+                inline=False
+            )
+        else:
+            embed.add_field(name="🗄️ Pool do Banco", value="❌ Inativo", inline=False)
+
+        fases = startup.get_stats()
+        if fases:
+            embed.add_field(
+                name="⏱️ Inicialização",
+                value="\n".join(f"{nome}: {ms:.0f}ms" for nome, ms in fases.items()),
+                inline=True
+            )
+
         if render_url != 'N/A':
             links = f"[Health Check]({render_url}/health) • [Stats JSON]({render_url}/stats)"
             embed.add_field(name="🔗 Links", value=links, inline=False)
@@ -0,0 +1,101 @@
+"""
+Cache dos rankings já renderizados, invalidado quando as pontuações mudam
+"""
+import time
+from utils.constants import RANKING_CACHE_TTL
+from utils.metrics import metrics
+
+class LeaderboardCache:
+    """
+    Guarda as linhas e o embed de cada ranking por (tipo, escopo, período)
+
+    O escopo é o guild_id ou None para o ranking global. Escritas no banco
+    invalidam o (tipo, escopo) afetado; o TTL limita a defasagem de mudanças que
+    não passam por este processo (ex.: outros processos com shards).
+    """
+
+    def __init__(self, ttl=RANKING_CACHE_TTL, nome="ranking_cache"):
+        """
+        Inicializa o cache
+
+        Args:
+            ttl: Defasagem máxima (s) de uma entrada
+            nome: Prefixo dos contadores registrados em utils.metrics
+        """
+        self.ttl = ttl
+        self.nome = nome
+
+        self._entradas = {}
+        # Incrementada a cada invalidação, para descartar renderizações que a atravessaram
+        self._geracoes = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidacoes = 0
+
+    def get(self, tipo, escopo, periodo):
+        """
+        Busca um ranking renderizado
+
+        Returns:
+            dict ou None: {'linhas': ..., 'embed': dict do embed} se ainda válido
+        """
+        chave = (tipo, escopo, periodo)
+        entrada = self._entradas.get(chave)
+        if entrada is not None and time.monotonic() - entrada["armazenado_em"] > self.ttl:
+            del self._entradas[chave]
+            entrada = None
+
+        if entrada is None:
+            self.misses += 1
+            metrics.log_counter(f"{self.nome}_miss")
+            return None
+
+        self.hits += 1
+        metrics.log_counter(f"{self.nome}_hit")
+        return entrada
+
+    def geracao(self, tipo, escopo):
+        """Retorna a geração atual de (tipo, escopo); capture antes de consultar o banco"""
+        return self._geracoes.get((tipo, escopo), 0)
+
+    def set(self, tipo, escopo, periodo, linhas, embed, geracao):
+        """
+        Armazena um ranking renderizado, se nada mudou desde a consulta
+
+        Args:
+            linhas: Resultado da consulta do ranking
+            embed: Embed renderizado, como dict
+            geracao: Valor de geracao() obtido antes da consulta
+        """
+        if geracao != self.geracao(tipo, escopo):
+            return
+        self._entradas[(tipo, escopo, periodo)] = {
+            "linhas": linhas,
+            "embed": embed,
+            "armazenado_em": time.monotonic(),
+        }
+
+    def invalidar(self, tipo, escopos):
+        """
+        Remove os rankings de `tipo` nos escopos informados, em todos os períodos
+
+        Assinatura compatível com MangaDatabase.adicionar_observador_ranking.
+        """
+        for escopo in escopos:
+            self._geracoes[(tipo, escopo)] = self.geracao(tipo, escopo) + 1
+        removidas = [chave for chave in self._entradas if chave[0] == tipo and chave[1] in escopos]
+        for chave in removidas:
+            del self._entradas[chave]
+        self.invalidacoes += len(removidas)
+
+    def get_stats(self):
+        """Retorna estatísticas do cache"""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entradas),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidacoes,
+            "hit_rate": self.hits / total if total else 0,
+        }
@@ -0,0 +1,147 @@
+"""
+Buffer de mangás aleatórios pré-carregados para o comando /rl
+"""
+import asyncio
+import discord
+import time
+from collections import deque
+from utils.constants import RL_POOL_SIZE, RL_POOL_REFILL_INTERVAL
+from utils.logger import setup_logger
+from utils.metrics import metrics
+
+logger = setup_logger()
+
+def preparar_manga(manga):
+    """
+    Converte um MangaRecord no payload pronto para o embed do /rl
+
+    Args:
+        manga: MangaRecord retornado pela API
+
+    Returns:
+        dict ou None: Payload com título, sinopse, url, imagem e pecinhas; None se os dados forem inválidos
+    """
+    if not manga:
+        return None
+
+    titulo = discord.utils.escape_markdown(manga.title)[:256]
+
+    sinopse = manga.synopsis or "Sem sinopse disponível."
+    sinopse = discord.utils.escape_markdown(sinopse)[:4000]
+
+    url_manga = manga.url
+    if url_manga and not url_manga.startswith("https://myanimelist.net/"):
+        url_manga = f"https://myanimelist.net/manga/{manga.mal_id}"
+
+    return {
+        "manga_id": manga.mal_id,
+        "title": titulo,
+        "synopsis": sinopse,
+        "url": url_manga,
+        "image": manga.image_url,
+        "pecinhas": manga.criptogenes(),
+    }
+
+class MangaPrefetchPool:
+    """Mantém um buffer limitado de mangás SFW prontos, reabastecido em background"""
+
+    def __init__(self, jikan, tamanho=RL_POOL_SIZE, intervalo=RL_POOL_REFILL_INTERVAL):
+        """
+        Inicializa o buffer
+
+        Args:
+            jikan: Instância de JikanAPI usada para buscar os mangás
+            tamanho: Quantidade máxima de mangás mantidos prontos
+            intervalo: Pausa (s) entre reabastecimentos, para respeitar o limite da API
+        """
+        self.jikan = jikan
+        self.tamanho = tamanho
+        self.intervalo = intervalo
+
+        self.fila = deque()
+        self._ids = set()
+        self._precisa_refill = asyncio.Event()
+        self.task = None
+
+        self.refills = 0
+        self.hits = 0
+        self.vazio = 0
+        self._refill_times = deque(maxlen=100)
+
+    def start(self):
+        """Inicia o produtor em background"""
+        if self.task is None or self.task.done():
+            self._precisa_refill.set()
+            self.task = asyncio.create_task(self._produtor())
+
+    async def close(self):
+        """Para o produtor"""
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    def pop(self):
+        """
+        Retira um mangá pronto do buffer
+
+        Returns:
+            dict ou None: Payload de preparar_manga, ou None se o buffer estiver vazio
+        """
+        self._precisa_refill.set()
+
+        if not self.fila:
+            self.vazio += 1
+            metrics.log_counter("rl_pool_empty")
+            return None
+
+        entrada = self.fila.popleft()
+        self._ids.discard(entrada["manga_id"])
+        self.hits += 1
+        metrics.log_counter("rl_pool_hit")
+        metrics.set_gauge("rl_pool_depth", len(self.fila))
+        return entrada
+
+    def get_stats(self):
+        """Retorna estatísticas do buffer"""
+        agora = time.monotonic()
+        refills_ultimo_minuto = sum(1 for t in self._refill_times if agora - t <= 60)
+
+        return {
+            "depth": len(self.fila),
+            "capacity": self.tamanho,
+            "hits": self.hits,
+            "empty": self.vazio,
+            "refills": self.refills,
+            "refills_per_minute": refills_ultimo_minuto,
+        }
+
+    async def _produtor(self):
+        """Reabastece o buffer até a capacidade, dormindo quando está cheio"""
+        while True:
+            if len(self.fila) >= self.tamanho:
+                self._precisa_refill.clear()
+                await self._precisa_refill.wait()
+                continue
+
+            try:
+                manga = await self.jikan.obter_manga_aleatorio()
+                entrada = preparar_manga(manga)
+
+                if entrada and entrada["manga_id"] not in self._ids:
+                    self.fila.append(entrada)
+                    self._ids.add(entrada["manga_id"])
+                    self.refills += 1
+                    self._refill_times.append(time.monotonic())
+                    metrics.log_counter("rl_pool_refill")
+                    metrics.set_gauge("rl_pool_depth", len(self.fila))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                metrics.log_error("rl_pool_refill_error")
+                logger.warning(f"Erro ao reabastecer buffer de mangás: {e}")
+
+            await asyncio.sleep(self.intervalo)
@@ -0,0 +1,138 @@
+"""
+Resolução de nomes de exibição de usuários com cache, para os rankings
+"""
+import asyncio
+import discord
+from utils.cache import LRUCache
+from utils.constants import (
+    USUARIOS_CACHE_TTL, USUARIOS_CACHE_MAX_BYTES, USUARIOS_CONCORRENCIA, USUARIOS_PRAZO
+)
+from utils.logger import setup_logger
+from utils.metrics import metrics
+
+logger = setup_logger()
+
+def nome_placeholder(usuario_id):
+    """Nome exibido quando o usuário não pôde ser resolvido"""
+    return f"Usuário ID {usuario_id}"
+
+class UserResolver:
+    """
+    Resolve IDs em nomes de exibição: caches do gateway, depois cache TTL, depois REST
+
+    As buscas REST rodam em paralelo com concorrência limitada. Quem não responder
+    até o prazo recebe um placeholder; a busca continua e abastece o cache.
+    """
+
+    def __init__(self, client, ttl=USUARIOS_CACHE_TTL, max_bytes=USUARIOS_CACHE_MAX_BYTES,
+                 concorrencia=USUARIOS_CONCORRENCIA, prazo=USUARIOS_PRAZO):
+        """
+        Inicializa o resolvedor
+
+        Args:
+            client: Cliente Discord
+            ttl: Tempo (s) em que um nome resolvido é reutilizado
+            max_bytes: Orçamento de memória do cache
+            concorrencia: Máximo de chamadas fetch_user simultâneas
+            prazo: Tempo máximo (s) de espera pelas chamadas REST
+        """
+        self.client = client
+        self.prazo = prazo
+        self.cache = LRUCache(max_bytes, ttl, nome="usuarios")
+        self._semaforo = asyncio.Semaphore(concorrencia)
+        self._em_voo = {}
+
+        self.gateway_hits = 0
+        self.fetches = 0
+        self.timeouts = 0
+
+    async def resolver_nomes(self, usuario_ids, guild=None):
+        """
+        Resolve vários usuários de uma vez
+
+        Args:
+            usuario_ids: IDs dos usuários (int ou str)
+            guild: Servidor onde o nome será exibido; usa o apelido do membro quando em cache
+
+        Returns:
+            dict: ID (int) -> nome de exibição
+        """
+        nomes = {}
+        faltando = []
+
+        for usuario_id in map(int, usuario_ids):
+            nome = self._nome_em_cache_gateway(usuario_id, guild)
+            if nome is not None:
+                self.gateway_hits += 1
+            else:
+                nome, _ = self.cache.get(usuario_id)
+            if nome is None:
+                faltando.append(usuario_id)
+            else:
+                nomes[usuario_id] = nome
+
+        if faltando:
+            tasks = {usuario_id: self._buscar(usuario_id) for usuario_id in faltando}
+            _, pendentes = await asyncio.wait(tasks.values(), timeout=self.prazo)
+            if pendentes:
+                self.timeouts += len(pendentes)
+                metrics.log_counter("usuarios_timeout", len(pendentes))
+
+            for usuario_id, task in tasks.items():
+                if task.done() and not task.cancelled() and task.exception() is None:
+                    nomes[usuario_id] = task.result()
+                else:
+                    nomes[usuario_id] = nome_placeholder(usuario_id)
+
+        return nomes
+
+    def _nome_em_cache_gateway(self, usuario_id, guild):
+        """Procura o usuário nos caches do gateway, sem chamada REST"""
+        if guild is not None:
+            membro = guild.get_member(usuario_id)
+            if membro is not None:
+                return membro.display_name
+        usuario = self.client.get_user(usuario_id)
+        return usuario.display_name if usuario is not None else None
+
+    def _buscar(self, usuario_id):
+        """Retorna a task de busca REST do usuário, reaproveitando uma já em andamento"""
+        task = self._em_voo.get(usuario_id)
+        if task is None:
+            task = asyncio.create_task(self._fetch(usuario_id))
+            self._em_voo[usuario_id] = task
+            task.add_done_callback(lambda t: self._finalizar_busca(usuario_id, t))
+        return task
+
+    def _finalizar_busca(self, usuario_id, task):
+        """Remove a busca concluída; consome a exceção de buscas que passaram do prazo"""
+        self._em_voo.pop(usuario_id, None)
+        if not task.cancelled():
+            task.exception()
+
+    async def _fetch(self, usuario_id):
+        """Busca o usuário via REST e guarda o nome no cache"""
+        async with self._semaforo:
+            self.fetches += 1
+            try:
+                usuario = await self.client.fetch_user(usuario_id)
+                nome = usuario.display_name
+            except discord.NotFound:
+                nome = nome_placeholder(usuario_id)
+            except Exception as e:
+                logger.warning(f"Falha ao buscar usuário {usuario_id}: {e}")
+                metrics.log_error("fetch_user")
+                raise
+
+        self.cache.set(usuario_id, nome)
+        return nome
+
+    def get_stats(self):
+        """Retorna estatísticas do resolvedor"""
+        return {
+            **self.cache.get_stats(),
+            "gateway_hits": self.gateway_hits,
+            "fetches": self.fetches,
+            "timeouts": self.timeouts,
+            "in_flight": len(self._em_voo),
+        }
@@ -1,231 +1,527 @@
 """
 Gerenciador de banco de dados para o bot de mangás
 """
+import asyncio
 import asyncpg
+import time
+from collections import deque
+from contextlib import asynccontextmanager
 from datetime import datetime
+from decimal import Decimal
 import datetime as dt
-from utils.constants import DATABASE_URL
+from utils.constants import (
+    DATABASE_URL, DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE,
+    DB_STATEMENT_CACHE_SIZE, DB_ACQUIRE_TIMEOUT, DB_COMMAND_TIMEOUT,
+    DAILY_COOLDOWN_HOURS
+)
+from database.migrator import aplicar_migracoes
+from database.write_behind import WriteBehindQueue
+from utils.logger import setup_logger
+from utils.metrics import metrics
+
+logger = setup_logger()
+
+PERIODOS_RANKING = ("total", "semana", "mes")
+INICIO_PERIODO_TOTAL = dt.date(1970, 1, 1)
+
+def inicio_periodo(periodo, momento=None):
+    """
+    Retorna o primeiro dia do período de ranking que contém `momento`
+
+    Args:
+        periodo: 'total', 'semana' (começa na segunda-feira) ou 'mes'
+        momento: datetime de referência (padrão: agora)
+
+    Returns:
+        date: Data de início do período
+    """
+    momento = momento or datetime.now()
+    if periodo == "semana":
+        return momento.date() - dt.timedelta(days=momento.weekday())
+    if periodo == "mes":
+        return momento.date().replace(day=1)
+    if periodo == "total":
+        return INICIO_PERIODO_TOTAL
+    raise ValueError(f"Período de ranking inválido: {periodo}")
 
 class MangaDatabase:
     """Gerenciador de operações do banco de dados para o bot"""
-    
-    @staticmethod
-    async def init_db():
-        """Inicializa o banco de dados se não existir"""
-        conn = await asyncpg.connect(DATABASE_URL)
+
+    def __init__(self, dsn=DATABASE_URL, min_size=DB_POOL_MIN_SIZE, max_size=DB_POOL_MAX_SIZE,
+                 statement_cache_size=DB_STATEMENT_CACHE_SIZE, acquire_timeout=DB_ACQUIRE_TIMEOUT,
+                 command_timeout=DB_COMMAND_TIMEOUT):
+        """
+        Inicializa o gerenciador sem abrir conexões
+
+        Args:
+            dsn: URL de conexão do PostgreSQL
+            min_size: Número mínimo de conexões mantidas no pool
+            max_size: Número máximo de conexões do pool
+            statement_cache_size: Tamanho do cache de prepared statements por conexão
+            acquire_timeout: Tempo máximo (s) de espera por uma conexão livre
+            command_timeout: Tempo máximo (s) de execução de um comando
+        """
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.statement_cache_size = statement_cache_size
+        self.acquire_timeout = acquire_timeout
+        self.command_timeout = command_timeout
+
+        self.pool = None
+        self.write_behind = WriteBehindQueue(self)
+        self.write_behind.adicionar_pos_flush("manga_logs", self._atualizar_colecao)
+        self.write_behind.adicionar_pos_flush("transacao_economia", self._atualizar_contadores_pecinhas)
+        self.write_behind.adicionar_apos_commit(
+            "manga_logs", lambda registros: self._notificar_ranking("mangas", registros)
+        )
+        self.write_behind.adicionar_apos_commit(
+            "transacao_economia", lambda registros: self._notificar_ranking("pecinhas", registros)
+        )
+        self._observadores_ranking = []
+        self.acquire_wait_times = deque(maxlen=100)
+        self.acquire_count = 0
+        self.acquire_timeouts = 0
+        self.waiting = 0
+
+    async def connect(self):
+        """Cria o pool de conexões se ainda não existir"""
+        if self.pool is None:
+            self.pool = await asyncpg.create_pool(
+                self.dsn,
+                min_size=self.min_size,
+                max_size=self.max_size,
+                statement_cache_size=self.statement_cache_size,
+                command_timeout=self.command_timeout
+            )
+            logger.info(f"Pool do banco de dados criado (min={self.min_size}, max={self.max_size})")
+        self.write_behind.start()
+
+    async def close(self):
+        """Grava os registros pendentes do write-behind e fecha o pool de conexões"""
+        await self.write_behind.close()
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+            logger.info("Pool do banco de dados fechado")
+
+    @asynccontextmanager
+    async def _acquire(self):
+        """Obtém uma conexão do pool registrando o tempo de espera"""
+        if self.pool is None:
+            await self.connect()
+
+        start_time = time.perf_counter()
+        self.waiting += 1
         try:
-            await conn.execute('''
-                CREATE TABLE IF NOT EXISTS manga_logs (
-                    id SERIAL PRIMARY KEY,
-                    usuario_id TEXT NOT NULL,
-                    manga_id INTEGER NOT NULL,
-                    timestamp TIMESTAMP NOT NULL
-                )
-            ''')
-            
-            await conn.execute('''
-                CREATE TABLE IF NOT EXISTS usuario_economia (
-                    usuario_id TEXT PRIMARY KEY,
-                    saldo DECIMAL(10,2) DEFAULT 0.00,
-                    total_ganho DECIMAL(10,2) DEFAULT 0.00,
-                    ultimo_daily TIMESTAMP DEFAULT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            await conn.execute('''
-                CREATE TABLE IF NOT EXISTS transacao_economia (
-                    id SERIAL PRIMARY KEY,
-                    usuario_id TEXT NOT NULL,
-                    tipo TEXT NOT NULL,
-                    valor DECIMAL(10,2) NOT NULL,
-                    descricao TEXT,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
+            conn = await self.pool.acquire(timeout=self.acquire_timeout)
+        except asyncio.TimeoutError:
+            self.acquire_timeouts += 1
+            metrics.log_error("db_acquire_timeout")
+            raise
         finally:
-            await conn.close()
-    
-    @staticmethod
-    async def registrar_manga(usuario_id, manga_id):
-        """Registra um mangá pego por um usuário"""
-        conn = await asyncpg.connect(DATABASE_URL)
+            self.waiting -= 1
+
+        self.acquire_count += 1
+        self.acquire_wait_times.append(time.perf_counter() - start_time)
         try:
-            await conn.execute(
-                "INSERT INTO manga_logs (usuario_id, manga_id, timestamp) VALUES ($1, $2, $3)",
-                str(usuario_id), manga_id, datetime.now()
-            )
+            yield conn
         finally:
-            await conn.close()
-    
-    @staticmethod
-    async def obter_mangas_usuario(usuario_id):
-        """Retorna lista de IDs de mangás pegos pelo usuário"""
-        conn = await asyncpg.connect(DATABASE_URL)
-        try:
+            await self.pool.release(conn)
+
+    def get_pool_stats(self):
+        """Retorna estatísticas de saturação do pool de conexões"""
+        if self.pool is None:
+            return {"active": False}
+
+        size = self.pool.get_size()
+        idle = self.pool.get_idle_size()
+        waits = self.acquire_wait_times
+
+        return {
+            "active": True,
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "size": size,
+            "in_use": size - idle,
+            "idle": idle,
+            "waiting": self.waiting,
+            "acquires": self.acquire_count,
+            "acquire_timeouts": self.acquire_timeouts,
+            "avg_acquire_wait_ms": round(sum(waits) / len(waits) * 1000, 2) if waits else 0,
+            "max_acquire_wait_ms": round(max(waits) * 1000, 2) if waits else 0,
+        }
+
+    def adicionar_observador_ranking(self, callback):
+        """
+        Registra uma função chamada quando pontuações de ranking mudam no banco
+
+        Args:
+            callback: Função callback(tipo, escopos), onde tipo é 'mangas' ou 'pecinhas'
+                      e escopos é um conjunto de guild_ids (None representa o ranking global)
+        """
+        self._observadores_ranking.append(callback)
+
+    def _notificar_ranking(self, tipo, registros=None):
+        """
+        Avisa os observadores sobre os rankings afetados
+
+        Sem registros, só o ranking global mudou (saldo de usuario_economia). Com
+        registros do write-behind, mudam os servidores de cada registro; para
+        mangás, o ranking global também, pois user_collection foi atualizada.
+        """
+        if registros is None:
+            escopos = {None}
+        else:
+            # guild_id é a 4ª coluna de manga_logs e a 6ª de transacao_economia
+            indice = 3 if tipo == "mangas" else 5
+            escopos = {registro[indice] for registro in registros if registro[indice]}
+            if tipo == "mangas":
+                escopos.add(None)
+
+        for callback in self._observadores_ranking:
+            callback(tipo, escopos)
+
+    async def init_db(self):
+        """Inicializa o banco de dados aplicando as migrações pendentes"""
+        async with self._acquire() as conn:
+            await aplicar_migracoes(conn)
+
+    async def obter_metadado(self, chave):
+        """Retorna o valor de um metadado do bot, ou None se não existir"""
+        async with self._acquire() as conn:
+            return await conn.fetchval("SELECT valor FROM bot_metadados WHERE chave = $1", chave)
+
+    async def salvar_metadado(self, chave, valor):
+        """Grava (ou substitui) um metadado do bot"""
+        async with self._acquire() as conn:
+            await conn.execute("""
+                INSERT INTO bot_metadados (chave, valor)
+                VALUES ($1, $2)
+                ON CONFLICT (chave) DO UPDATE
+                SET valor = EXCLUDED.valor, atualizado_em = CURRENT_TIMESTAMP
+            """, chave, valor)
+
+    async def registrar_manga(self, usuario_id, manga_id, guild_id=None, pecinhas=None):
+        """
+        Registra um mangá pego por um usuário (gravado em lote pelo write-behind)
+
+        Args:
+            usuario_id: ID do usuário que pegou o mangá
+            manga_id: ID do mangá no MyAnimeList
+            guild_id: Servidor em que o mangá foi pego
+            pecinhas: Valor do mangá no momento em que foi pego
+        """
+        await self.write_behind.put(
+            "manga_logs",
+            (str(usuario_id), manga_id, datetime.now(), str(guild_id) if guild_id else None,
+             Decimal(str(pecinhas)) if pecinhas is not None else None)
+        )
+
+    async def _atualizar_colecao(self, conn, registros):
+        """
+        Atualiza user_collection com os mangás de um lote do write-behind
+
+        Quando o mangá é novo na coleção, incrementa a contagem do usuário em
+        usuario_colecao_contagem. Também incrementa os contadores do servidor em que o mangá foi pego, em
+        cada período de ranking em que ele é novo para o usuário naquele servidor
+        (deduplicado por guild_colecao).
+        """
+        # Semanas e meses anteriores ao lote não recebem mais registros
+        primeiro = min(registro[2] for registro in registros)
+        await conn.execute("""
+            DELETE FROM guild_colecao
+            WHERE (periodo = 'semana' AND inicio < $1) OR (periodo = 'mes' AND inicio < $2)
+        """, inicio_periodo("semana", primeiro), inicio_periodo("mes", primeiro))
+
+        await conn.executemany("""
+            WITH colecao AS (
+                INSERT INTO user_collection (usuario_id, manga_id, first_claimed, last_claimed, times_claimed, pecinhas)
+                VALUES ($1, $2, $3, $3, 1, $8)
+                ON CONFLICT (usuario_id, manga_id) DO UPDATE
+                SET first_claimed = LEAST(user_collection.first_claimed, EXCLUDED.first_claimed),
+                    last_claimed = GREATEST(user_collection.last_claimed, EXCLUDED.last_claimed),
+                    times_claimed = user_collection.times_claimed + 1,
+                    pecinhas = COALESCE(EXCLUDED.pecinhas, user_collection.pecinhas)
+                RETURNING (xmax = 0) AS novo
+            ), contagem AS (
+                INSERT INTO usuario_colecao_contagem AS c (usuario_id, mangas)
+                SELECT $1, 1 FROM colecao WHERE colecao.novo
+                ON CONFLICT (usuario_id) DO UPDATE
+                SET mangas = c.mangas + 1
+            ), servidor AS (
+                INSERT INTO guild_colecao (guild_id, periodo, inicio, usuario_id, manga_id)
+                SELECT $4, p.periodo, p.inicio, $1, $2
+                FROM (VALUES ('total', $5::date), ('semana', $6::date), ('mes', $7::date)) AS p(periodo, inicio)
+                WHERE $4::text IS NOT NULL
+                ON CONFLICT DO NOTHING
+                RETURNING periodo, inicio
+            )
+            INSERT INTO guild_contadores (guild_id, periodo, inicio, usuario_id, mangas)
+            SELECT $4, servidor.periodo, servidor.inicio, $1, 1
+            FROM servidor
+            ON CONFLICT (guild_id, periodo, inicio, usuario_id) DO UPDATE
+            SET mangas = guild_contadores.mangas + 1
+        """, [
+            (usuario_id, manga_id, timestamp, guild_id, INICIO_PERIODO_TOTAL,
+             inicio_periodo("semana", timestamp), inicio_periodo("mes", timestamp), pecinhas)
+            for usuario_id, manga_id, timestamp, guild_id, pecinhas in registros
+        ])
+
+    async def _atualizar_contadores_pecinhas(self, conn, registros):
+        """Soma as pecinhas de um lote de transações aos contadores de cada servidor"""
+        linhas = [
+            (guild_id, periodo, inicio_periodo(periodo, timestamp), usuario_id, valor)
+            for usuario_id, tipo, valor, descricao, timestamp, guild_id in registros
+            if guild_id
+            for periodo in PERIODOS_RANKING
+        ]
+        if not linhas:
+            return
+
+        await conn.executemany("""
+            INSERT INTO guild_contadores (guild_id, periodo, inicio, usuario_id, pecinhas)
+            VALUES ($1, $2, $3, $4, $5)
+            ON CONFLICT (guild_id, periodo, inicio, usuario_id) DO UPDATE
+            SET pecinhas = guild_contadores.pecinhas + EXCLUDED.pecinhas
+        """, linhas)
+
+    async def obter_mangas_usuario(self, usuario_id):
+        """
+        Retorna os mangás pegos pelo usuário, do mais recente ao mais antigo
+
+        Returns:
+            list: Tuplas (manga_id, pecinhas registradas ou None se pego antes da migração 0005)
+        """
+        async with self._acquire() as conn:
             rows = await conn.fetch(
-                "SELECT manga_id FROM manga_logs WHERE usuario_id = $1 GROUP BY manga_id ORDER BY MAX(timestamp) DESC", 
+                "SELECT manga_id, pecinhas FROM user_collection WHERE usuario_id = $1 ORDER BY last_claimed DESC",
                 str(usuario_id)
             )
-            return [row['manga_id'] for row in rows]
-        finally:
-            await conn.close()
-    
-    @staticmethod
-    async def obter_ranking():
+            return [
+                (row['manga_id'], float(row['pecinhas']) if row['pecinhas'] is not None else None)
+                for row in rows
+            ]
+
+    async def obter_valor_colecao(self, usuario_id):
+        """
+        Retorna o tamanho e o valor total da coleção de um usuário
+
+        Returns:
+            dict: {'mangas': quantidade, 'registrados': mangas com valor registrado,
+                   'valor_total': soma das pecinhas registradas}
+        """
+        async with self._acquire() as conn:
+            row = await conn.fetchrow("""
+                SELECT COUNT(*) AS mangas, COUNT(pecinhas) AS registrados,
+                       COALESCE(SUM(pecinhas), 0) AS valor_total
+                FROM user_collection
+                WHERE usuario_id = $1
+            """, str(usuario_id))
+        return {
+            'mangas': row['mangas'],
+            'registrados': row['registrados'],
+            'valor_total': float(row['valor_total']),
+        }
+
+    async def obter_ranking_valor_colecao(self, limite=10):
+        """
+        Retorna o ranking de usuários pelo valor total da coleção
+
+        Returns:
+            list: Tuplas (usuario_id, valor_total, mangas)
+        """
+        async with self._acquire() as conn:
+            rows = await conn.fetch("""
+                SELECT usuario_id, SUM(pecinhas) AS valor_total, COUNT(*) AS mangas
+                FROM user_collection
+                WHERE pecinhas IS NOT NULL
+                GROUP BY usuario_id
+                ORDER BY valor_total DESC
+                LIMIT $1
+            """, limite)
+            return [(row['usuario_id'], float(row['valor_total']), row['mangas']) for row in rows]
+
+    async def obter_mangas_mais_valiosos(self, usuario_id=None, limite=10):
+        """
+        Retorna os mangás de maior valor, de um usuário ou de todas as coleções
+
+        Returns:
+            list: Tuplas (usuario_id, manga_id, pecinhas)
+        """
+        # Consultas separadas para que cada uma tenha seu próprio plano: a geral percorre
+        # idx_user_collection_pecinhas, a de um usuário lê só as linhas dele por usuario_id
+        async with self._acquire() as conn:
+            if usuario_id is None:
+                rows = await conn.fetch("""
+                    SELECT usuario_id, manga_id, pecinhas
+                    FROM user_collection
+                    WHERE pecinhas IS NOT NULL
+                    ORDER BY pecinhas DESC
+                    LIMIT $1
+                """, limite)
+            else:
+                rows = await conn.fetch("""
+                    SELECT usuario_id, manga_id, pecinhas
+                    FROM user_collection
+                    WHERE usuario_id = $1 AND pecinhas IS NOT NULL
+                    ORDER BY pecinhas DESC
+                    LIMIT $2
+                """, str(usuario_id), limite)
+            return [(row['usuario_id'], row['manga_id'], float(row['pecinhas'])) for row in rows]
+
+    async def obter_ranking(self):
         """Retorna o ranking de usuários por quantidade de mangás únicos"""
-        conn = await asyncpg.connect(DATABASE_URL)
-        try:
+        async with self._acquire() as conn:
             rows = await conn.fetch("""
-                SELECT usuario_id, COUNT(DISTINCT manga_id) as total 
-                FROM manga_logs 
-                GROUP BY usuario_id 
-                ORDER BY total DESC 
+                SELECT usuario_id, mangas AS total
+                FROM usuario_colecao_contagem
+                WHERE mangas > 0
+                ORDER BY mangas DESC
                 LIMIT 10
             """)
             return [(row['usuario_id'], row['total']) for row in rows]
-        finally:
-            await conn.close()
-    
-    @staticmethod
-    async def contagem_manga_periodo(usuario_id, periodo_segundos):
+
+    async def obter_ranking_guild(self, guild_id, periodo="total"):
+        """
+        Retorna o ranking de um servidor por mangás diferentes pegos nele no período
+
+        Returns:
+            list: Tuplas (usuario_id, total) com até 10 usuários
+        """
+        async with self._acquire() as conn:
+            rows = await conn.fetch("""
+                SELECT usuario_id, mangas AS total
+                FROM guild_contadores
+                WHERE guild_id = $1 AND periodo = $2 AND inicio = $3 AND mangas > 0
+                ORDER BY mangas DESC
+                LIMIT 10
+            """, str(guild_id), periodo, inicio_periodo(periodo))
+            return [(row['usuario_id'], row['total']) for row in rows]
+
+    async def contagem_manga_periodo(self, usuario_id, periodo_segundos):
         """Conta quantos mangás um usuário obteve em um período específico"""
         timestamp_limite = datetime.now() - dt.timedelta(seconds=periodo_segundos)
-        
-        conn = await asyncpg.connect(DATABASE_URL)
-        try:
+
+        async with self._acquire() as conn:
             result = await conn.fetchval(
                 "SELECT COUNT(*) FROM manga_logs WHERE usuario_id = $1 AND timestamp > $2",
                 str(usuario_id), timestamp_limite
             )
             return result if result else 0
-        finally:
-            await conn.close()
-        
-    @staticmethod
-    async def obter_saldo_usuario(usuario_id):
+
+    async def obter_saldo_usuario(self, usuario_id):
         """Obtém o saldo de pecinhas de um usuário"""
-        conn = await asyncpg.connect(DATABASE_URL)
-        try:
+        async with self._acquire() as conn:
             row = await conn.fetchrow(
                 "SELECT saldo, total_ganho, ultimo_daily FROM usuario_economia WHERE usuario_id = $1",
                 str(usuario_id)
             )
-            if row:
-                return {
-                    'saldo': float(row['saldo']),
-                    'total_ganho': float(row['total_ganho']),
-                    'ultimo_daily': row['ultimo_daily']
-                }
-            else:
-                await conn.execute(
-                    "INSERT INTO usuario_economia (usuario_id) VALUES ($1) ON CONFLICT (usuario_id) DO NOTHING",
-                    str(usuario_id)
-                )
-                return {'saldo': 0.0, 'total_ganho': 0.0, 'ultimo_daily': None}
-        finally:
-            await conn.close()
-    
-    @staticmethod
-    async def adicionar_pecinhas(usuario_id, valor, descricao=""):
-        """Adiciona pecinhas ao saldo de um usuário"""
-        conn = await asyncpg.connect(DATABASE_URL)
-        try:
-            await conn.execute(
-                "INSERT INTO usuario_economia (usuario_id) VALUES ($1) ON CONFLICT (usuario_id) DO NOTHING",
-                str(usuario_id)
-            )
-            
-            await conn.execute("""
-                UPDATE usuario_economia 
-                SET saldo = saldo + $2, 
-                    total_ganho = total_ganho + $2,
-                    updated_at = CURRENT_TIMESTAMP
-                WHERE usuario_id = $1
-            """, str(usuario_id), valor)
-            
-            await conn.execute("""
-                INSERT INTO transacao_economia (usuario_id, tipo, valor, descricao)
-                VALUES ($1, 'ganho', $2, $3)
-            """, str(usuario_id), valor, descricao)
-            
-            novo_saldo = await conn.fetchval(
-                "SELECT saldo FROM usuario_economia WHERE usuario_id = $1",
-                str(usuario_id)
-            )
-            return float(novo_saldo)
-        finally:
-            await conn.close()
-    
-    @staticmethod
-    async def verificar_pode_daily(usuario_id):
-        """Verifica se o usuário pode usar o comando daily (cooldown de 24h)"""
-        conn = await asyncpg.connect(DATABASE_URL)
-        try:
-            row = await conn.fetchrow(
-                "SELECT ultimo_daily FROM usuario_economia WHERE usuario_id = $1",
-                str(usuario_id)
-            )
-            
-            if not row or not row['ultimo_daily']:
-                return True, None
-            
-            ultimo_daily = row['ultimo_daily']
-            agora = datetime.now()
-            tempo_restante = ultimo_daily + dt.timedelta(hours=24) - agora
-            
-            if tempo_restante.total_seconds() <= 0:
-                return True, None
-            else:
-                return False, tempo_restante
-        finally:
-            await conn.close()
-    
-    @staticmethod
-    async def registrar_daily(usuario_id, valor):
-        """Registra o daily de um usuário e adiciona as pecinhas"""
-        conn = await asyncpg.connect(DATABASE_URL)
-        try:
-            await conn.execute(
-                "INSERT INTO usuario_economia (usuario_id) VALUES ($1) ON CONFLICT (usuario_id) DO NOTHING",
-                str(usuario_id)
-            )
-            
-            await conn.execute("""
-                UPDATE usuario_economia 
-                SET ultimo_daily = CURRENT_TIMESTAMP,
-                    saldo = saldo + $2,
-                    total_ganho = total_ganho + $2,
+        if row:
+            return {
+                'saldo': float(row['saldo']),
+                'total_ganho': float(row['total_ganho']),
+                'ultimo_daily': row['ultimo_daily']
+            }
+        return {'saldo': 0.0, 'total_ganho': 0.0, 'ultimo_daily': None}
+
+    async def adicionar_pecinhas(self, usuario_id, valor, descricao="", guild_id=None):
+        """
+        Adiciona pecinhas ao saldo de um usuário em um único comando
+
+        O saldo é atualizado de forma síncrona; o registro em transacao_economia
+        é gravado em lote pelo write-behind.
+
+        Returns:
+            float: Novo saldo do usuário
+        """
+        async with self._acquire() as conn:
+            novo_saldo = await conn.fetchval("""
+                INSERT INTO usuario_economia (usuario_id, saldo, total_ganho)
+                VALUES ($1, $2, $2)
+                ON CONFLICT (usuario_id) DO UPDATE
+                SET saldo = usuario_economia.saldo + EXCLUDED.saldo,
+                    total_ganho = usuario_economia.total_ganho + EXCLUDED.total_ganho,
                     updated_at = CURRENT_TIMESTAMP
-                WHERE usuario_id = $1
-            """, str(usuario_id), valor)
-            
-            await conn.execute("""
-                INSERT INTO transacao_economia (usuario_id, tipo, valor, descricao)
-                VALUES ($1, 'daily', $2, 'Daily reward')
+                RETURNING saldo
             """, str(usuario_id), valor)
-            
-            novo_saldo = await conn.fetchval(
-                "SELECT saldo FROM usuario_economia WHERE usuario_id = $1",
-                str(usuario_id)
-            )
-            return float(novo_saldo)
-        finally:
-            await conn.close()
-    
-    @staticmethod
-    async def obter_ranking_economia():
+
+        self._notificar_ranking("pecinhas")
+        await self._registrar_transacao(usuario_id, 'ganho', valor, descricao, guild_id)
+        return float(novo_saldo)
+
+    async def registrar_daily(self, usuario_id, valor, guild_id=None):
+        """
+        Resgata o daily de um usuário de forma atômica
+
+        O cooldown é verificado pelo próprio UPSERT, então cliques simultâneos
+        nunca resgatam duas vezes.
+
+        Returns:
+            tuple: (novo_saldo, None) se resgatado ou (None, tempo_restante) em cooldown
+        """
+        async with self._acquire() as conn:
+            row = await conn.fetchrow("""
+                WITH resgate AS (
+                    INSERT INTO usuario_economia (usuario_id, saldo, total_ganho, ultimo_daily)
+                    VALUES ($1, $2, $2, CURRENT_TIMESTAMP)
+                    ON CONFLICT (usuario_id) DO UPDATE
+                    SET saldo = usuario_economia.saldo + EXCLUDED.saldo,
+                        total_ganho = usuario_economia.total_ganho + EXCLUDED.total_ganho,
+                        ultimo_daily = EXCLUDED.ultimo_daily,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE usuario_economia.ultimo_daily IS NULL
+                       OR usuario_economia.ultimo_daily <= CURRENT_TIMESTAMP - make_interval(hours => $3)
+                    RETURNING saldo
+                )
+                SELECT
+                    (SELECT saldo FROM resgate) AS novo_saldo,
+                    (SELECT ultimo_daily + make_interval(hours => $3) - CURRENT_TIMESTAMP
+                     FROM usuario_economia WHERE usuario_id = $1) AS tempo_restante
+            """, str(usuario_id), valor, DAILY_COOLDOWN_HOURS)
+
+        if row['novo_saldo'] is not None:
+            self._notificar_ranking("pecinhas")
+            await self._registrar_transacao(usuario_id, 'daily', valor, 'Daily reward', guild_id)
+            return float(row['novo_saldo']), None
+
+        # Um resgate concorrente pode ter criado a linha depois do snapshot desta consulta
+        tempo_restante = row['tempo_restante'] or dt.timedelta(hours=DAILY_COOLDOWN_HOURS)
+        return None, tempo_restante
+
+    async def _registrar_transacao(self, usuario_id, tipo, valor, descricao, guild_id=None):
+        """Enfileira um registro de transacao_economia no write-behind"""
+        await self.write_behind.put(
+            "transacao_economia",
+            (str(usuario_id), tipo, Decimal(str(valor)), descricao, datetime.now(),
+             str(guild_id) if guild_id else None)
+        )
+
+    async def obter_ranking_economia(self):
         """Retorna o ranking de usuários por quantidade de pecinhas"""
-        conn = await asyncpg.connect(DATABASE_URL)
-        try:
+        async with self._acquire() as conn:
             rows = await conn.fetch("""
                 SELECT usuario_id, saldo, total_ganho
-                FROM usuario_economia 
+                FROM usuario_economia
                 WHERE saldo > 0
-                ORDER BY saldo DESC 
+                ORDER BY saldo DESC
                 LIMIT 10
             """)
             return [(row['usuario_id'], float(row['saldo']), float(row['total_ganho'])) for row in rows]
-        finally:
-            await conn.close()
+
+    async def obter_ranking_economia_guild(self, guild_id, periodo="total"):
+        """
+        Retorna o ranking de um servidor por pecinhas ganhas no período
+
+        Returns:
+            list: Tuplas (usuario_id, pecinhas) com até 10 usuários
+        """
+        async with self._acquire() as conn:
+            rows = await conn.fetch("""
+                SELECT usuario_id, pecinhas
+                FROM guild_contadores
+                WHERE guild_id = $1 AND periodo = $2 AND inicio = $3 AND pecinhas > 0
+                ORDER BY pecinhas DESC
+                LIMIT 10
+            """, str(guild_id), periodo, inicio_periodo(periodo))
+            return [(row['usuario_id'], float(row['pecinhas'])) for row in rows]
@@ -0,0 +1,25 @@
+-- Tabelas originais do bot; IF NOT EXISTS mantém bancos já existentes intactos
+CREATE TABLE IF NOT EXISTS manga_logs (
+    id SERIAL PRIMARY KEY,
+    usuario_id TEXT NOT NULL,
+    manga_id INTEGER NOT NULL,
+    timestamp TIMESTAMP NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS usuario_economia (
+    usuario_id TEXT PRIMARY KEY,
+    saldo DECIMAL(10,2) DEFAULT 0.00,
+    total_ganho DECIMAL(10,2) DEFAULT 0.00,
+    ultimo_daily TIMESTAMP DEFAULT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS transacao_economia (
+    id SERIAL PRIMARY KEY,
+    usuario_id TEXT NOT NULL,
+    tipo TEXT NOT NULL,
+    valor DECIMAL(10,2) NOT NULL,
+    descricao TEXT,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
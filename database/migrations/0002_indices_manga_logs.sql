@@ -0,0 +1,12 @@
+-- contagem_manga_periodo: WHERE usuario_id = $1 AND timestamp > $2
+CREATE INDEX IF NOT EXISTS idx_manga_logs_usuario_timestamp
+    ON manga_logs (usuario_id, timestamp);
+
+-- obter_mangas_usuario e obter_ranking: agrupam por (usuario_id, manga_id);
+-- o INCLUDE permite index-only scan também para o MAX(timestamp)
+CREATE INDEX IF NOT EXISTS idx_manga_logs_usuario_manga
+    ON manga_logs (usuario_id, manga_id) INCLUDE (timestamp);
+
+-- obter_ranking_economia: top 10 por saldo positivo
+CREATE INDEX IF NOT EXISTS idx_usuario_economia_saldo
+    ON usuario_economia (saldo DESC) WHERE saldo > 0;
@@ -0,0 +1,20 @@
+-- Coleção deduplicada por usuário, mantida a cada mangá pego
+CREATE TABLE IF NOT EXISTS user_collection (
+    usuario_id TEXT NOT NULL,
+    manga_id INTEGER NOT NULL,
+    first_claimed TIMESTAMP NOT NULL,
+    last_claimed TIMESTAMP NOT NULL,
+    times_claimed INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (usuario_id, manga_id)
+);
+
+-- obter_mangas_usuario: coleção ordenada pelo mangá pego mais recentemente
+CREATE INDEX IF NOT EXISTS idx_user_collection_usuario_recentes
+    ON user_collection (usuario_id, last_claimed DESC) INCLUDE (manga_id);
+
+-- Backfill único a partir do histórico existente
+INSERT INTO user_collection (usuario_id, manga_id, first_claimed, last_claimed, times_claimed)
+SELECT usuario_id, manga_id, MIN(timestamp), MAX(timestamp), COUNT(*)
+FROM manga_logs
+GROUP BY usuario_id, manga_id
+ON CONFLICT (usuario_id, manga_id) DO NOTHING;
@@ -0,0 +1,21 @@
+-- Servidor de origem de cada mangá pego e de cada transação
+ALTER TABLE manga_logs ADD COLUMN IF NOT EXISTS guild_id TEXT;
+ALTER TABLE transacao_economia ADD COLUMN IF NOT EXISTS guild_id TEXT;
+
+-- Contadores incrementais por servidor e período ('total', 'semana', 'mes').
+-- inicio é o primeiro dia do período (1970-01-01 para 'total').
+CREATE TABLE IF NOT EXISTS guild_contadores (
+    guild_id TEXT NOT NULL,
+    periodo TEXT NOT NULL,
+    inicio DATE NOT NULL,
+    usuario_id TEXT NOT NULL,
+    mangas INTEGER NOT NULL DEFAULT 0,
+    pecinhas DECIMAL(12,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (guild_id, periodo, inicio, usuario_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_guild_contadores_mangas
+    ON guild_contadores (guild_id, periodo, inicio, mangas DESC) INCLUDE (usuario_id);
+
+CREATE INDEX IF NOT EXISTS idx_guild_contadores_pecinhas
+    ON guild_contadores (guild_id, periodo, inicio, pecinhas DESC) INCLUDE (usuario_id);
@@ -0,0 +1,9 @@
+-- Valor em pecinhas de cada mangá no momento em que foi pego.
+-- Registros anteriores a esta migração ficam com NULL (o valor não era guardado).
+ALTER TABLE manga_logs ADD COLUMN IF NOT EXISTS pecinhas DECIMAL(10,2);
+ALTER TABLE user_collection ADD COLUMN IF NOT EXISTS pecinhas DECIMAL(10,2);
+
+-- obter_mangas_mais_valiosos
+CREATE INDEX IF NOT EXISTS idx_user_collection_pecinhas
+    ON user_collection (pecinhas DESC) INCLUDE (usuario_id, manga_id)
+    WHERE pecinhas IS NOT NULL;
@@ -0,0 +1,6 @@
+-- Metadados chave-valor do próprio bot (ex.: assinatura dos comandos sincronizados)
+CREATE TABLE IF NOT EXISTS bot_metadados (
+    chave TEXT PRIMARY KEY,
+    valor TEXT NOT NULL,
+    atualizado_em TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
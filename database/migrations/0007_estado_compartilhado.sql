@@ -0,0 +1,23 @@
+-- Estado compartilhado entre processos do bot (STATE_BACKEND=postgres)
+
+-- Mangás do /rl aguardando reação
+CREATE TABLE IF NOT EXISTS mangas_pendentes (
+    message_id BIGINT PRIMARY KEY,
+    dados JSONB NOT NULL,
+    expirado BOOLEAN NOT NULL DEFAULT FALSE,
+    criado_em TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_mangas_pendentes_criado_em ON mangas_pendentes (criado_em);
+
+-- Janelas deslizantes dos limites por usuário: eventos recentes em ordem crescente.
+-- expira_em é quando o último evento sai da janela e a linha pode ser apagada.
+CREATE TABLE IF NOT EXISTS limite_uso (
+    escopo TEXT NOT NULL,
+    chave TEXT NOT NULL,
+    eventos TIMESTAMPTZ[] NOT NULL DEFAULT '{}',
+    expira_em TIMESTAMPTZ NOT NULL,
+    PRIMARY KEY (escopo, chave)
+);
+
+CREATE INDEX IF NOT EXISTS idx_limite_uso_expira_em ON limite_uso (expira_em);
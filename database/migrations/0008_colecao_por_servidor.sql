@@ -0,0 +1,42 @@
+-- Mangás diferentes que cada usuário pegou em cada servidor e período.
+-- Deduplica os incrementos de guild_contadores.mangas: um mangá conta uma vez por
+-- (servidor, usuário, período), mesmo que o usuário já o tivesse pego em outro servidor.
+CREATE TABLE IF NOT EXISTS guild_colecao (
+    guild_id TEXT NOT NULL,
+    periodo TEXT NOT NULL,
+    inicio DATE NOT NULL,
+    usuario_id TEXT NOT NULL,
+    manga_id INTEGER NOT NULL,
+    PRIMARY KEY (guild_id, periodo, inicio, usuario_id, manga_id)
+);
+
+-- Limpeza das semanas e meses encerrados, que não deduplicam mais nada
+CREATE INDEX IF NOT EXISTS idx_guild_colecao_periodos_encerrados
+    ON guild_colecao (periodo, inicio) WHERE periodo <> 'total';
+
+-- Backfill: total e períodos correntes (semana começa na segunda-feira, como inicio_periodo)
+INSERT INTO guild_colecao (guild_id, periodo, inicio, usuario_id, manga_id)
+SELECT DISTINCT guild_id, p.periodo, p.inicio, usuario_id, manga_id
+FROM manga_logs,
+     (VALUES ('total', DATE '1970-01-01'),
+             ('semana', date_trunc('week', LOCALTIMESTAMP)::date),
+             ('mes', date_trunc('month', LOCALTIMESTAMP)::date)) AS p(periodo, inicio)
+WHERE guild_id IS NOT NULL AND timestamp >= p.inicio
+ON CONFLICT DO NOTHING;
+
+-- Recalcula os contadores de mangás de todos os períodos com a nova regra. Toda linha
+-- com mangas > 0 veio de um log com guild_id, então todas são sobrescritas.
+INSERT INTO guild_contadores (guild_id, periodo, inicio, usuario_id, mangas)
+SELECT guild_id, 'total', DATE '1970-01-01', usuario_id, COUNT(DISTINCT manga_id)
+FROM manga_logs WHERE guild_id IS NOT NULL
+GROUP BY guild_id, usuario_id
+UNION ALL
+SELECT guild_id, 'semana', date_trunc('week', timestamp)::date, usuario_id, COUNT(DISTINCT manga_id)
+FROM manga_logs WHERE guild_id IS NOT NULL
+GROUP BY guild_id, date_trunc('week', timestamp)::date, usuario_id
+UNION ALL
+SELECT guild_id, 'mes', date_trunc('month', timestamp)::date, usuario_id, COUNT(DISTINCT manga_id)
+FROM manga_logs WHERE guild_id IS NOT NULL
+GROUP BY guild_id, date_trunc('month', timestamp)::date, usuario_id
+ON CONFLICT (guild_id, periodo, inicio, usuario_id) DO UPDATE
+SET mangas = EXCLUDED.mangas;
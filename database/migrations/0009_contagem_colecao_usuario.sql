@@ -0,0 +1,21 @@
+-- Tamanho da coleção de cada usuário (mangás diferentes), mantido pelo write-behind
+-- quando um mangá entra em user_collection; obter_ranking lê o topo pelo índice
+CREATE TABLE IF NOT EXISTS usuario_colecao_contagem (
+    usuario_id TEXT PRIMARY KEY,
+    mangas INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_usuario_colecao_contagem_mangas
+    ON usuario_colecao_contagem (mangas DESC) INCLUDE (usuario_id);
+
+-- Backfill a partir das coleções existentes
+INSERT INTO usuario_colecao_contagem (usuario_id, mangas)
+SELECT usuario_id, COUNT(*)
+FROM user_collection
+GROUP BY usuario_id
+ON CONFLICT (usuario_id) DO UPDATE
+SET mangas = EXCLUDED.mangas;
+
+-- Nenhuma consulta agrupa mais manga_logs por (usuario_id, manga_id): coleção e
+-- ranking vêm de user_collection e desta tabela
+DROP INDEX IF EXISTS idx_manga_logs_usuario_manga;
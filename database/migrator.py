@@ -0,0 +1,79 @@
+"""
+Executor de migrações versionadas do banco de dados
+"""
+from pathlib import Path
+from utils.logger import setup_logger
+
+logger = setup_logger()
+
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+MIGRATION_LOCK_ID = 728_190_001
+
+def carregar_migracoes(diretorio=MIGRATIONS_DIR):
+    """
+    Lê os arquivos de migração no formato NNNN_descricao.sql
+
+    Args:
+        diretorio: Pasta com os arquivos .sql
+
+    Returns:
+        list: Tuplas (versao, nome, sql) ordenadas pela versão
+    """
+    migracoes = []
+    versoes = set()
+
+    for arquivo in diretorio.glob("*.sql"):
+        prefixo = arquivo.name.split("_", 1)[0]
+        if not prefixo.isdigit():
+            raise ValueError(f"Nome de migração inválido: {arquivo.name}")
+
+        versao = int(prefixo)
+        if versao in versoes:
+            raise ValueError(f"Versão de migração duplicada: {versao}")
+        versoes.add(versao)
+
+        migracoes.append((versao, arquivo.stem, arquivo.read_text(encoding="utf-8")))
+
+    return sorted(migracoes)
+
+async def aplicar_migracoes(conn, diretorio=MIGRATIONS_DIR):
+    """
+    Aplica, em ordem, as migrações ainda não registradas em schema_version
+
+    Cada migração roda em sua própria transação. Um advisory lock impede que
+    dois processos migrem o mesmo banco ao mesmo tempo.
+
+    Args:
+        conn: Conexão asyncpg
+        diretorio: Pasta com os arquivos .sql
+
+    Returns:
+        int: Quantidade de migrações aplicadas
+    """
+    await conn.execute("SELECT pg_advisory_lock($1)", MIGRATION_LOCK_ID)
+    try:
+        await conn.execute('''
+            CREATE TABLE IF NOT EXISTS schema_version (
+                versao INTEGER PRIMARY KEY,
+                nome TEXT NOT NULL,
+                aplicada_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        aplicadas = {row['versao'] for row in await conn.fetch("SELECT versao FROM schema_version")}
+        pendentes = [m for m in carregar_migracoes(diretorio) if m[0] not in aplicadas]
+
+        for versao, nome, sql in pendentes:
+            logger.info(f"Aplicando migração {nome}")
+            async with conn.transaction():
+                await conn.execute(sql)
+                await conn.execute(
+                    "INSERT INTO schema_version (versao, nome) VALUES ($1, $2)",
+                    versao, nome
+                )
+
+        if pendentes:
+            logger.info(f"{len(pendentes)} migração(ões) aplicada(s)")
+        return len(pendentes)
+    finally:
+        await conn.execute("SELECT pg_advisory_unlock($1)", MIGRATION_LOCK_ID)
@@ -0,0 +1,352 @@
+"""
+Armazenamento do estado de curta duração do bot: mangás pendentes e limites por usuário
+
+O backend em memória serve um único processo; o backend PostgreSQL permite que
+vários processos (shards ou deploy blue/green) compartilhem o mesmo estado.
+"""
+import json
+import sys
+import time
+from collections import OrderedDict
+from utils.logger import setup_logger
+from utils.rate_limiter import SlidingWindowLimiter
+
+logger = setup_logger()
+
+class StateStore:
+    """
+    Interface comum dos backends de estado
+
+    `limites` mapeia cada escopo (ex.: "rl", "pegar") para (limite, janela em segundos).
+    Todos os métodos são corrotinas para que os backends sejam intercambiáveis.
+    """
+
+    backend = None
+
+    def __init__(self, limites):
+        self.limites = limites
+
+    async def verificar_limite(self, escopo, chave):
+        """
+        Verifica, sem registrar, se a chave ainda tem vaga no limite do escopo
+
+        Returns:
+            tuple: (permitido, restantes, espera em segundos até a próxima vaga)
+        """
+        raise NotImplementedError
+
+    async def consumir_limite(self, escopo, chave):
+        """Verifica e registra atomicamente um evento; mesmo retorno de verificar_limite"""
+        raise NotImplementedError
+
+    async def registrar_limite(self, escopo, chave):
+        """Registra um evento sem verificar o limite"""
+        raise NotImplementedError
+
+    async def estornar_limite(self, escopo, chave):
+        """Desfaz o evento mais recente da chave"""
+        raise NotImplementedError
+
+    async def adicionar_pendente(self, message_id, dados):
+        """Registra um mangá do /rl aguardando reação"""
+        raise NotImplementedError
+
+    async def obter_pendente(self, message_id):
+        """Retorna os dados do mangá pendente (com a chave 'expirado') ou None"""
+        raise NotImplementedError
+
+    async def marcar_expirado(self, message_id):
+        """Marca o mangá como expirado; retorna False se ele não estava mais pendente"""
+        raise NotImplementedError
+
+    async def reivindicar_pendente(self, message_id):
+        """
+        Remove atomicamente um mangá pendente não expirado
+
+        Returns:
+            dict ou None: Dados do mangá para o único chamador que o reivindicou
+        """
+        raise NotImplementedError
+
+    async def contar_pendentes(self):
+        """Retorna a quantidade de mangás pendentes"""
+        raise NotImplementedError
+
+    async def limpar(self, idade_maxima, max_pendentes=1000):
+        """
+        Remove pendentes mais antigos que `idade_maxima` segundos e limites expirados
+
+        Se ainda restarem mais de `max_pendentes`, remove os 200 mais antigos.
+
+        Returns:
+            int: Quantidade de mangás pendentes removidos
+        """
+        raise NotImplementedError
+
+    async def get_stats(self):
+        """Retorna estatísticas do estado"""
+        raise NotImplementedError
+
+class InMemoryStateStore(StateStore):
+    """Estado em dicionários do próprio processo"""
+
+    backend = "memoria"
+
+    def __init__(self, limites):
+        super().__init__(limites)
+        self._limitadores = {
+            escopo: SlidingWindowLimiter(limite, janela, nome=escopo)
+            for escopo, (limite, janela) in limites.items()
+        }
+        # message_id -> (criado_em monotônico, dados), em ordem de criação
+        self._pendentes = OrderedDict()
+
+    async def verificar_limite(self, escopo, chave):
+        return self._limitadores[escopo].verificar(str(chave))
+
+    async def consumir_limite(self, escopo, chave):
+        return self._limitadores[escopo].consumir(str(chave))
+
+    async def registrar_limite(self, escopo, chave):
+        self._limitadores[escopo].registrar(str(chave))
+
+    async def estornar_limite(self, escopo, chave):
+        self._limitadores[escopo].estornar(str(chave))
+
+    async def adicionar_pendente(self, message_id, dados):
+        self._pendentes[message_id] = (time.monotonic(), {**dados, "expirado": False})
+
+    async def obter_pendente(self, message_id):
+        entrada = self._pendentes.get(message_id)
+        return dict(entrada[1]) if entrada else None
+
+    async def marcar_expirado(self, message_id):
+        entrada = self._pendentes.get(message_id)
+        if entrada is None:
+            return False
+        entrada[1]["expirado"] = True
+        return True
+
+    async def reivindicar_pendente(self, message_id):
+        entrada = self._pendentes.get(message_id)
+        if entrada is None or entrada[1]["expirado"]:
+            return None
+        del self._pendentes[message_id]
+        return entrada[1]
+
+    async def contar_pendentes(self):
+        return len(self._pendentes)
+
+    async def limpar(self, idade_maxima, max_pendentes=1000):
+        limite = time.monotonic() - idade_maxima
+        removidos = 0
+
+        # Ordem de criação: basta olhar o início até o primeiro recente
+        while self._pendentes:
+            message_id, (criado_em, _) = next(iter(self._pendentes.items()))
+            if criado_em > limite:
+                break
+            del self._pendentes[message_id]
+            removidos += 1
+
+        if len(self._pendentes) > max_pendentes:
+            logger.warning(f"Limite de mangas pendentes atingido ({len(self._pendentes)}). Removendo os mais antigos.")
+            for _ in range(min(200, len(self._pendentes))):
+                self._pendentes.popitem(last=False)
+                removidos += 1
+
+        return removidos
+
+    async def get_stats(self):
+        return {
+            "backend": self.backend,
+            "pending": len(self._pendentes),
+            "pending_bytes": self._tamanho_pendentes(),
+            "limits": {escopo: len(limitador) for escopo, limitador in self._limitadores.items()},
+        }
+
+    def _tamanho_pendentes(self):
+        """Estimativa rasa (bytes) da memória ocupada pelos mangás pendentes"""
+        total = sys.getsizeof(self._pendentes)
+        for entrada in self._pendentes.values():
+            dados = entrada[1]
+            total += sys.getsizeof(entrada) + sys.getsizeof(dados)
+            total += sum(sys.getsizeof(valor) for valor in dados.values())
+        return total
+
+class PostgresStateStore(StateStore):
+    """Estado nas tabelas mangas_pendentes e limite_uso, com operações atômicas no banco"""
+
+    backend = "postgres"
+
+    def __init__(self, db, limites):
+        """
+        Args:
+            db: Instância conectada de MangaDatabase
+            limites: Mapa escopo -> (limite, janela em segundos)
+        """
+        super().__init__(limites)
+        self.db = db
+
+    async def verificar_limite(self, escopo, chave):
+        limite, janela = self.limites[escopo]
+        async with self.db._acquire() as conn:
+            row = await conn.fetchrow("""
+                SELECT ARRAY(
+                           SELECT e FROM unnest(eventos) AS e
+                           WHERE e > now() - make_interval(secs => $3)
+                           ORDER BY e
+                       ) AS eventos,
+                       now() AS agora
+                FROM limite_uso
+                WHERE escopo = $1 AND chave = $2
+            """, escopo, str(chave), float(janela))
+
+        if row is None:
+            return True, limite, 0.0
+
+        restantes = limite - len(row['eventos'])
+        if restantes > 0:
+            return True, restantes, 0.0
+        return False, 0, (row['eventos'][0] - row['agora']).total_seconds() + janela
+
+    async def consumir_limite(self, escopo, chave):
+        limite, janela = self.limites[escopo]
+        usados = await self._adicionar_evento(escopo, chave, janela, limite)
+        if usados is None:
+            # Recusado: só falta calcular a espera, que não pode virar uma permissão
+            _, _, espera = await self.verificar_limite(escopo, chave)
+            return False, 0, max(espera, 0.0)
+        return True, limite - usados, 0.0
+
+    async def registrar_limite(self, escopo, chave):
+        _, janela = self.limites[escopo]
+        await self._adicionar_evento(escopo, chave, janela, None)
+
+    async def _adicionar_evento(self, escopo, chave, janela, limite):
+        """
+        Poda a janela e acrescenta um evento em um único UPSERT
+
+        O ON CONFLICT trava a linha, então processos concorrentes avaliam o
+        limite um de cada vez. Com `limite` None o evento é sempre registrado.
+
+        Returns:
+            int ou None: Eventos na janela após o registro; None se o limite foi atingido
+        """
+        async with self.db._acquire() as conn:
+            return await conn.fetchval("""
+                INSERT INTO limite_uso AS l (escopo, chave, eventos, expira_em)
+                VALUES ($1, $2, ARRAY[now()], now() + make_interval(secs => $3))
+                ON CONFLICT (escopo, chave) DO UPDATE
+                SET eventos = ARRAY(
+                        SELECT e FROM unnest(l.eventos) AS e
+                        WHERE e > now() - make_interval(secs => $3)
+                        ORDER BY e
+                    ) || now(),
+                    expira_em = EXCLUDED.expira_em
+                WHERE $4::int IS NULL OR cardinality(ARRAY(
+                    SELECT e FROM unnest(l.eventos) AS e
+                    WHERE e > now() - make_interval(secs => $3)
+                )) < $4
+                RETURNING cardinality(l.eventos)
+            """, escopo, str(chave), float(janela), limite)
+
+    async def estornar_limite(self, escopo, chave):
+        async with self.db._acquire() as conn:
+            await conn.execute("""
+                UPDATE limite_uso
+                SET eventos = eventos[1:cardinality(eventos) - 1]
+                WHERE escopo = $1 AND chave = $2
+            """, escopo, str(chave))
+
+    async def adicionar_pendente(self, message_id, dados):
+        async with self.db._acquire() as conn:
+            await conn.execute("""
+                INSERT INTO mangas_pendentes (message_id, dados)
+                VALUES ($1, $2::jsonb)
+                ON CONFLICT (message_id) DO UPDATE
+                SET dados = EXCLUDED.dados, expirado = FALSE
+            """, message_id, json.dumps(dados))
+
+    async def obter_pendente(self, message_id):
+        async with self.db._acquire() as conn:
+            row = await conn.fetchrow(
+                "SELECT dados, expirado FROM mangas_pendentes WHERE message_id = $1", message_id
+            )
+        if row is None:
+            return None
+        return {**json.loads(row['dados']), "expirado": row['expirado']}
+
+    async def marcar_expirado(self, message_id):
+        async with self.db._acquire() as conn:
+            return await conn.fetchval(
+                "UPDATE mangas_pendentes SET expirado = TRUE WHERE message_id = $1 RETURNING TRUE",
+                message_id
+            ) is not None
+
+    async def reivindicar_pendente(self, message_id):
+        async with self.db._acquire() as conn:
+            dados = await conn.fetchval(
+                "DELETE FROM mangas_pendentes WHERE message_id = $1 AND NOT expirado RETURNING dados",
+                message_id
+            )
+        return {**json.loads(dados), "expirado": False} if dados is not None else None
+
+    async def contar_pendentes(self):
+        async with self.db._acquire() as conn:
+            return await conn.fetchval("SELECT COUNT(*) FROM mangas_pendentes")
+
+    async def limpar(self, idade_maxima, max_pendentes=1000):
+        async with self.db._acquire() as conn:
+            async with conn.transaction():
+                await conn.execute("DELETE FROM limite_uso WHERE expira_em < now()")
+                removidos = await conn.fetchval("""
+                    WITH removidos AS (
+                        DELETE FROM mangas_pendentes
+                        WHERE criado_em < now() - make_interval(secs => $1)
+                        RETURNING 1
+                    )
+                    SELECT COUNT(*) FROM removidos
+                """, float(idade_maxima))
+
+                restantes = await conn.fetchval("SELECT COUNT(*) FROM mangas_pendentes")
+                if restantes > max_pendentes:
+                    logger.warning(f"Limite de mangas pendentes atingido ({restantes}). Removendo os mais antigos.")
+                    removidos += await conn.fetchval("""
+                        WITH removidos AS (
+                            DELETE FROM mangas_pendentes
+                            WHERE message_id IN (
+                                SELECT message_id FROM mangas_pendentes ORDER BY criado_em LIMIT 200
+                            )
+                            RETURNING 1
+                        )
+                        SELECT COUNT(*) FROM removidos
+                    """)
+
+        return removidos
+
+    async def get_stats(self):
+        async with self.db._acquire() as conn:
+            pendentes = await conn.fetchval("SELECT COUNT(*) FROM mangas_pendentes")
+            tamanho = await conn.fetchval("SELECT pg_total_relation_size('mangas_pendentes')")
+            rows = await conn.fetch(
+                "SELECT escopo, COUNT(*) AS total FROM limite_uso WHERE expira_em >= now() GROUP BY escopo"
+            )
+        limites = {escopo: 0 for escopo in self.limites}
+        limites.update({row['escopo']: row['total'] for row in rows})
+        return {"backend": self.backend, "pending": pendentes, "pending_bytes": tamanho, "limits": limites}
+
+def criar_state_store(backend, db, limites):
+    """
+    Cria o backend de estado configurado
+
+    Args:
+        backend: 'memoria' ou 'postgres'
+        db: Instância de MangaDatabase (usada pelo backend PostgreSQL)
+        limites: Mapa escopo -> (limite, janela em segundos)
+    """
+    if backend == "postgres":
+        return PostgresStateStore(db, limites)
+    if backend == "memoria":
+        return InMemoryStateStore(limites)
+    raise ValueError(f"Backend de estado desconhecido: {backend}")
@@ -0,0 +1,256 @@
+"""
+Pipeline write-behind que agrupa inserts de log em flushes em lote
+"""
+import asyncio
+import asyncpg
+import time
+from collections import defaultdict
+from utils.constants import (
+    WRITE_BEHIND_MAX_SIZE, WRITE_BEHIND_BATCH_SIZE,
+    WRITE_BEHIND_FLUSH_INTERVAL, WRITE_BEHIND_MAX_RETRIES, WRITE_BEHIND_MAX_BACKOFF
+)
+from utils.logger import setup_logger
+from utils.metrics import metrics
+
+logger = setup_logger()
+
+COLUNAS_POR_TABELA = {
+    "manga_logs": ("usuario_id", "manga_id", "timestamp", "guild_id", "pecinhas"),
+    "transacao_economia": ("usuario_id", "tipo", "valor", "descricao", "timestamp", "guild_id"),
+}
+
+# Falhas que passam sozinhas (conexão, timeout, sobrecarga ou conflito no servidor);
+# as demais são erros de dados ou de SQL, que se repetiriam a cada nova tentativa
+ERROS_TRANSITORIOS = (
+    OSError,
+    asyncio.TimeoutError,
+    asyncpg.PostgresConnectionError,
+    asyncpg.InterfaceError,
+    asyncpg.TransactionRollbackError,
+    asyncpg.OperatorInterventionError,
+    asyncpg.InsufficientResourcesError,
+)
+
+class WriteBehindQueue:
+    """
+    Fila limitada de inserts append-only gravados via COPY em lotes
+
+    Um lote que falha por erro transitório fica à frente dos demais e é regravado
+    com backoff até o banco voltar; enquanto isso a fila enche e put() aguarda
+    (backpressure). Erros de dados ou de SQL dividem o lote ao meio até isolar o
+    registro ruim, que é descartado (dead letter) sem travar os seguintes.
+    Registros também se perdem se o banco continuar fora durante o encerramento.
+    """
+
+    def __init__(self, db, max_size=WRITE_BEHIND_MAX_SIZE, batch_size=WRITE_BEHIND_BATCH_SIZE,
+                 flush_interval=WRITE_BEHIND_FLUSH_INTERVAL, max_retries=WRITE_BEHIND_MAX_RETRIES,
+                 max_backoff=WRITE_BEHIND_MAX_BACKOFF):
+        """
+        Inicializa a fila
+
+        Args:
+            db: Instância de MangaDatabase usada para obter conexões
+            max_size: Máximo de registros em memória; put() aguarda quando cheia
+            batch_size: Quantidade de registros que dispara um flush imediato
+            flush_interval: Tempo máximo (s) que um registro espera na fila
+            max_retries: Tentativas de um registro com erro de dados antes do descarte,
+                e de um lote qualquer durante o encerramento
+            max_backoff: Espera máxima (s) entre tentativas de gravação
+        """
+        self.db = db
+        self.queue = asyncio.Queue(maxsize=max_size)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.max_backoff = max_backoff
+
+        self.task = None
+        self._fechando = False
+        self._pos_flush = defaultdict(list)
+        self._apos_commit = defaultdict(list)
+
+        self.flush_count = 0
+        self.flushed_rows = 0
+        self.dropped_rows = 0
+        self.dead_letter_rows = 0
+        self.failed_attempts = 0
+        self.last_flush_ms = 0
+
+    def start(self):
+        """Inicia a tarefa de flush em background"""
+        if self.task is None or self.task.done():
+            self._fechando = False
+            self.task = asyncio.create_task(self._worker())
+
+    def adicionar_pos_flush(self, tabela, callback):
+        """
+        Registra uma corrotina executada na mesma transação, logo após o COPY de uma tabela
+
+        Args:
+            tabela: Nome da tabela em COLUNAS_POR_TABELA
+            callback: Corrotina callback(conn, registros)
+        """
+        self._pos_flush[tabela].append(callback)
+
+    def adicionar_apos_commit(self, tabela, callback):
+        """
+        Registra uma função chamada depois que um lote com registros da tabela é confirmado
+
+        Args:
+            tabela: Nome da tabela em COLUNAS_POR_TABELA
+            callback: Função callback(registros), síncrona
+        """
+        self._apos_commit[tabela].append(callback)
+
+    async def put(self, tabela, registro):
+        """
+        Enfileira um registro para gravação
+
+        Aguarda (backpressure) enquanto a fila estiver cheia.
+
+        Args:
+            tabela: Nome da tabela em COLUNAS_POR_TABELA
+            registro: Tupla com os valores na ordem das colunas da tabela
+        """
+        if tabela not in COLUNAS_POR_TABELA:
+            raise ValueError(f"Tabela não suportada pelo write-behind: {tabela}")
+        await self.queue.put((tabela, registro))
+
+    async def close(self):
+        """Para a tarefa de flush garantindo a gravação de tudo que está na fila"""
+        self._fechando = True
+        if self.task is not None:
+            await self.task
+            self.task = None
+
+        while not self.queue.empty():
+            if not await self._flush(self._drenar()):
+                break
+
+        if not self.queue.empty():
+            perdidos = self.queue.qsize()
+            self._drenar(perdidos)
+            self.dropped_rows += perdidos
+            logger.error(f"Write-behind encerrado com o banco indisponível: {perdidos} registros na fila perdidos")
+
+        logger.info(f"Write-behind encerrado ({self.flushed_rows} registros gravados)")
+
+    def get_stats(self):
+        """Retorna estatísticas da fila"""
+        return {
+            "queued": self.queue.qsize(),
+            "max_size": self.queue.maxsize,
+            "flushes": self.flush_count,
+            "flushed_rows": self.flushed_rows,
+            "dropped_rows": self.dropped_rows,
+            "dead_letter_rows": self.dead_letter_rows,
+            "failed_attempts": self.failed_attempts,
+            "last_flush_ms": self.last_flush_ms,
+        }
+
+    async def _worker(self):
+        """Agrupa registros até atingir o tamanho do lote ou o intervalo de flush"""
+        loop = asyncio.get_running_loop()
+
+        while not self._fechando or not self.queue.empty():
+            lote = []
+            limite = loop.time() + self.flush_interval
+
+            while len(lote) < self.batch_size and not self._fechando:
+                restante = limite - loop.time()
+                if restante <= 0:
+                    break
+                try:
+                    lote.append(await asyncio.wait_for(self.queue.get(), restante))
+                except asyncio.TimeoutError:
+                    break
+
+            lote.extend(self._drenar(self.batch_size - len(lote)))
+            if lote and not await self._flush(lote):
+                # Só desiste durante o encerramento; close() contabiliza o que sobrou
+                return
+
+    def _drenar(self, limite=None):
+        """Retira da fila, sem esperar, até `limite` registros"""
+        limite = self.batch_size if limite is None else limite
+        lote = []
+        while len(lote) < limite and not self.queue.empty():
+            lote.append(self.queue.get_nowait())
+        return lote
+
+    async def _flush(self, lote):
+        """
+        Grava um lote, repetindo até conseguir
+
+        Erros transitórios repetem o lote inteiro com backoff exponencial limitado.
+        Erros de dados ou de SQL dividem o lote ao meio e gravam cada metade em
+        ordem; um registro isolado que falha `max_retries` vezes é descartado.
+        Durante o encerramento, qualquer lote desiste após `max_retries` tentativas.
+
+        Returns:
+            bool: False se o lote foi descartado no encerramento
+        """
+        tentativa = 0
+        while True:
+            tentativa += 1
+            try:
+                await self._gravar(lote)
+                return True
+            except ERROS_TRANSITORIOS as e:
+                self._registrar_falha(lote, tentativa, e)
+            except Exception as e:
+                self._registrar_falha(lote, tentativa, e)
+                if len(lote) > 1:
+                    return await self._flush_dividido(lote)
+                if tentativa >= self.max_retries:
+                    self.dropped_rows += 1
+                    self.dead_letter_rows += 1
+                    metrics.log_counter("write_behind_dead_letter")
+                    logger.error(f"Registro write-behind descartado após {tentativa} tentativas: {lote[0]!r} ({e})")
+                    return True
+
+            if self._fechando and tentativa >= self.max_retries:
+                self.dropped_rows += len(lote)
+                logger.error(f"Lote write-behind descartado no encerramento após {tentativa} tentativas ({len(lote)} registros)")
+                return False
+            await asyncio.sleep(min(self.max_backoff, 2 ** (tentativa - 1)))
+
+    async def _flush_dividido(self, lote):
+        """Grava as duas metades do lote em ordem, para isolar registros com erro de dados"""
+        meio = len(lote) // 2
+        if not await self._flush(lote[:meio]):
+            self.dropped_rows += len(lote) - meio
+            return False
+        return await self._flush(lote[meio:])
+
+    def _registrar_falha(self, lote, tentativa, erro):
+        self.failed_attempts += 1
+        metrics.log_error("write_behind_flush")
+        logger.error(f"Erro no flush write-behind (tentativa {tentativa}, {len(lote)} registros): {erro}")
+
+    async def _gravar(self, lote):
+        """Grava um lote via COPY, com os callbacks pós-flush, em uma única transação"""
+        por_tabela = defaultdict(list)
+        for tabela, registro in lote:
+            por_tabela[tabela].append(registro)
+
+        start_time = time.perf_counter()
+        async with self.db._acquire() as conn:
+            async with conn.transaction():
+                for tabela, registros in por_tabela.items():
+                    await conn.copy_records_to_table(
+                        tabela, records=registros, columns=COLUNAS_POR_TABELA[tabela]
+                    )
+                    for callback in self._pos_flush[tabela]:
+                        await callback(conn, registros)
+
+        self.flush_count += 1
+        self.flushed_rows += len(lote)
+        self.last_flush_ms = round((time.perf_counter() - start_time) * 1000, 2)
+
+        for tabela, registros in por_tabela.items():
+            for callback in self._apos_commit[tabela]:
+                try:
+                    callback(registros)
+                except Exception as e:
+                    logger.error(f"Erro em callback pós-commit de {tabela}: {e}")
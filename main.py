@@ -2,32 +2,56 @@
 Ponto de entrada principal para o bot Discord Manga
 Inclui sistema de keep-alive para manter o bot online no Render
 """
+from utils.startup import startup
+
+import argparse
 import asyncio
+import multiprocessing
 import os
+import signal
+import time
 from bot.client import DiscordBot
-from utils.constants import TOKEN
+from utils.constants import (
+    TOKEN, SHARD_COUNT, SHARD_PROCESSES, STATE_BACKEND,
+    JIKAN_RATE_LIMIT_PER_SECOND, JIKAN_RATE_LIMIT_PER_MINUTE
+)
 from utils.logger import setup_logger
 from utils.keep_alive import KeepAliveServer, AutoPing
 
 logger = setup_logger()
+startup.marco("imports")
 
-async def main():
-    """Função principal assíncrona para iniciar o bot e servidor web"""
+async def main(forcar_sync=False):
+    """
+    Função principal assíncrona para iniciar o bot e servidor web
+    
+    Args:
+        forcar_sync: Se True, sincroniza os comandos slash mesmo sem alterações
+    """
     bot = None
     keep_alive_server = None
     auto_ping = None
     
     try:        # Cria as instâncias
-        bot = DiscordBot()
+        bot = DiscordBot(forcar_sync=forcar_sync)
         keep_alive_server = KeepAliveServer(bot)
         auto_ping = AutoPing()
         
         # Define a referência do servidor no bot
         bot._keep_alive_server = keep_alive_server
         
+        # Docker/Render e o supervisor encerram com SIGTERM: fecha o bot para gravar a fila write-behind
+        try:
+            asyncio.get_running_loop().add_signal_handler(
+                signal.SIGTERM, lambda: asyncio.ensure_future(bot.close())
+            )
+        except NotImplementedError:
+            pass
+        
         # Inicia o servidor web primeiro
         logger.info("🌐 Iniciando servidor keep-alive...")
-        server_started = await keep_alive_server.start_server()
+        with startup.fase("keep_alive_bind"):
+            server_started = await keep_alive_server.start_server()
         
         if not server_started:
             logger.error("❌ Falha ao iniciar servidor keep-alive")
@@ -61,10 +85,161 @@ async def main():
         
         logger.info("✅ Limpeza concluída")
 
+def dividir_shards(shard_count, processos):
+    """
+    Divide os shards em faixas contíguas, uma por processo
+
+    Args:
+        shard_count: Total de shards do bot
+        processos: Quantidade de processos
+
+    Returns:
+        list: Lista de listas de IDs de shard
+    """
+    processos = min(processos, shard_count)
+    base, resto = divmod(shard_count, processos)
+    faixas = []
+    inicio = 0
+    for indice in range(processos):
+        tamanho = base + (1 if indice < resto else 0)
+        faixas.append(list(range(inicio, inicio + tamanho)))
+        inicio += tamanho
+    return faixas
+
+def dividir_cota_jikan(processos):
+    """
+    Divide a cota da API Jikan igualmente entre os processos, em requisições inteiras
+
+    Returns:
+        tuple: (por segundo, por minuto) de cada processo
+
+    Raises:
+        ValueError: Se algum processo ficar com menos de 1 requisição por janela
+    """
+    por_segundo = JIKAN_RATE_LIMIT_PER_SECOND // processos
+    por_minuto = JIKAN_RATE_LIMIT_PER_MINUTE // processos
+    if por_segundo < 1 or por_minuto < 1:
+        raise ValueError(
+            f"{processos} processos não cabem na cota da API Jikan "
+            f"({JIKAN_RATE_LIMIT_PER_SECOND}/s, {JIKAN_RATE_LIMIT_PER_MINUTE}/min): "
+            f"reduza SHARD_PROCESSES para no máximo {min(JIKAN_RATE_LIMIT_PER_SECOND, JIKAN_RATE_LIMIT_PER_MINUTE)}"
+        )
+    return por_segundo, por_minuto
+
+def _interromper(signum, frame):
+    """Trata SIGTERM no supervisor como Ctrl+C, para encerrar os processos filhos"""
+    raise KeyboardInterrupt
+
+def _executar_processo(forcar_sync):
+    """Ponto de entrada de cada processo filho do supervisor"""
+    try:
+        asyncio.run(main(forcar_sync=forcar_sync))
+    except KeyboardInterrupt:
+        pass
+
+def supervisionar(forcar_sync=False, intervalo=5.0, espera_maxima=60.0, tempo_estavel=300.0):
+    """
+    Inicia um processo por faixa de shards e reinicia os que caírem
+
+    Cada processo recebe sua faixa em SHARD_IDS, seu índice em SHARD_PROCESS_INDEX,
+    a porta PORT + índice para o keep-alive e uma fração da cota da API Jikan.
+    Só o processo 0 sincroniza comandos e ingere o catálogo.
+
+    Args:
+        forcar_sync: Repassado ao processo 0
+        intervalo: Segundos entre verificações dos processos, que também definem quando os reinícios acontecem
+        espera_maxima: Espera máxima (s) antes de reiniciar um processo que caiu repetidamente
+        tempo_estavel: Tempo (s) no ar após o qual as falhas anteriores de um processo são esquecidas
+    """
+    faixas = dividir_shards(SHARD_COUNT, SHARD_PROCESSES)
+    try:
+        cota_segundo, cota_minuto = dividir_cota_jikan(len(faixas))
+    except ValueError as e:
+        logger.error(f"❌ {e}")
+        return
+    
+    if STATE_BACKEND != "postgres":
+        logger.warning("⚠️ STATE_BACKEND não é 'postgres': limites por usuário não serão compartilhados entre processos")
+    
+    contexto = multiprocessing.get_context("spawn")
+    porta_base = int(os.environ.get('PORT', 8000))
+    processos = {}
+    iniciado_em = {}
+    falhas = {}
+    # Processos caídos aguardando o backoff; reiniciados numa volta posterior do laço
+    reiniciar_em = {}
+    
+    def iniciar(indice):
+        os.environ.update({
+            "SHARD_IDS": ",".join(str(i) for i in faixas[indice]),
+            "SHARD_PROCESS_INDEX": str(indice),
+            "PORT": str(porta_base + indice),
+            "JIKAN_RATE_LIMIT_PER_SECOND": str(cota_segundo),
+            "JIKAN_RATE_LIMIT_PER_MINUTE": str(cota_minuto),
+        })
+        processo = contexto.Process(
+            target=_executar_processo, args=(forcar_sync and indice == 0,), name=f"shards-{indice}"
+        )
+        processo.start()
+        processos[indice] = processo
+        iniciado_em[indice] = time.monotonic()
+        logger.info(f"🧩 Processo {indice} iniciado (pid {processo.pid}) com shards {faixas[indice]}")
+    
+    signal.signal(signal.SIGTERM, _interromper)
+    try:
+        for indice in range(len(faixas)):
+            iniciar(indice)
+        
+        while processos:
+            time.sleep(intervalo)
+            for indice, processo in list(processos.items()):
+                if processo.is_alive():
+                    continue
+                
+                if indice in reiniciar_em:
+                    if time.monotonic() >= reiniciar_em[indice]:
+                        del reiniciar_em[indice]
+                        iniciar(indice)
+                    continue
+                
+                if processo.exitcode == 0:
+                    logger.info(f"Processo {indice} encerrado normalmente")
+                    del processos[indice]
+                    continue
+                
+                # Um processo que ficou no ar por um bom tempo recomeça o backoff do zero
+                if time.monotonic() - iniciado_em[indice] >= tempo_estavel:
+                    falhas[indice] = 0
+                falhas[indice] = falhas.get(indice, 0) + 1
+                espera = min(espera_maxima, 2 ** falhas[indice])
+                # Sem dormir aqui: os demais processos e os sinais continuam sendo atendidos
+                reiniciar_em[indice] = time.monotonic() + espera
+                logger.error(f"❌ Processo {indice} caiu (código {processo.exitcode}); reiniciando em {espera}s")
+    except KeyboardInterrupt:
+        logger.info("🛑 Encerrando processos de shards...")
+        for processo in processos.values():
+            processo.terminate()
+        for processo in processos.values():
+            processo.join(timeout=30)
+
 def sync_main():
     """Função síncrona para compatibilidade"""
+    parser = argparse.ArgumentParser(description="Bot de mangás para Discord")
+    parser.add_argument(
+        "--sync", action="store_true",
+        help="força a sincronização dos comandos slash com o Discord"
+    )
+    args = parser.parse_args()
+    
+    if SHARD_PROCESSES > 1:
+        if not SHARD_COUNT:
+            logger.error("❌ SHARD_PROCESSES > 1 exige SHARD_COUNT definido")
+            return
+        supervisionar(forcar_sync=args.sync)
+        return
+    
     try:
-        asyncio.run(main())
+        asyncio.run(main(forcar_sync=args.sync))
     except KeyboardInterrupt:
         logger.info("🛑 Aplicação encerrada pelo usuário")
     except Exception as e:
@@ -0,0 +1,12 @@
+"""
+Executa os testes unitários da pasta tests/
+"""
+import sys
+import unittest
+from pathlib import Path
+
+if __name__ == "__main__":
+    raiz = Path(__file__).resolve().parent
+    suite = unittest.defaultTestLoader.discover(str(raiz / "tests"), top_level_dir=str(raiz))
+    resultado = unittest.TextTestRunner(verbosity=2).run(suite)
+    sys.exit(0 if resultado.wasSuccessful() else 1)
@@ -0,0 +1,10 @@
+"""
+Testes do bot
+
+utils.constants encerra o processo sem DISCORD_TOKEN e DATABASE_URL; os testes
+não se conectam a nada, então valores fictícios bastam.
+"""
+import os
+
+os.environ.setdefault("DISCORD_TOKEN", "teste")
+os.environ.setdefault("DATABASE_URL", "postgresql://teste@localhost/teste")
@@ -0,0 +1,67 @@
+"""
+Testes da recarga do catálogo local em processos que não fazem a ingestão
+"""
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+
+from api.catalogo import MangaCatalog
+from api.models import MangaRecord
+
+def manga(mal_id, explicito=False):
+    return MangaRecord(
+        mal_id=mal_id, title=f"Mangá {mal_id}",
+        explicit_genres=("Hentai",) if explicito else (),
+    )
+
+class RecargaCatalogoTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.pasta = tempfile.TemporaryDirectory()
+        caminho = Path(self.pasta.name) / "catalogo.sqlite3"
+
+        # O "primário" só grava no arquivo; o leitor é o processo com ingerir=False
+        self.primario = MangaCatalog(None, caminho)
+        await asyncio.to_thread(self.primario._gravar, [manga(1), manga(2)])
+        self.leitor = MangaCatalog(None, caminho, intervalo_recarga=0.01)
+        await self.leitor.start(ingerir=False)
+
+    async def asyncTearDown(self):
+        await self.leitor.close()
+        await self.primario.close()
+        self.pasta.cleanup()
+
+    async def esperar_recarga(self, recargas):
+        for _ in range(200):
+            if self.leitor.recargas >= recargas:
+                return
+            await asyncio.sleep(0.01)
+        self.fail("o catálogo não foi recarregado")
+
+    async def test_leitor_acompanha_o_arquivo(self):
+        self.assertEqual(sorted(self.leitor._sfw_ids), [1, 2])
+
+        await asyncio.to_thread(self.primario._gravar, [manga(3), manga(2, explicito=True)])
+        await self.esperar_recarga(1)
+
+        self.assertEqual(sorted(self.leitor._sfw_ids), [1, 3])
+        self.assertEqual(
+            {mal_id: self.leitor._sfw_ids[posicao] for mal_id, posicao in self.leitor._posicao.items()},
+            {1: 1, 3: 3},
+        )
+
+    async def test_sem_alteracao_nao_recarrega(self):
+        await asyncio.sleep(0.1)
+        self.assertEqual(self.leitor.recargas, 0)
+
+    async def test_close_cancela_a_recarga(self):
+        tarefa = self.leitor.task
+        self.assertFalse(tarefa.done())
+        self.assertFalse(self.leitor.get_stats()["ingesting"])
+        await self.leitor.close()
+        self.assertTrue(tarefa.cancelled())
+        self.assertIsNone(self.leitor.task)
+
+if __name__ == "__main__":
+    unittest.main()
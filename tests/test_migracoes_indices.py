@@ -0,0 +1,114 @@
+"""
+Confere, via EXPLAIN, que as consultas quentes usam os índices criados pelas migrações
+
+Exige um PostgreSQL local em TEST_DATABASE_URL; as migrações são aplicadas em
+um schema temporário, removido ao final.
+"""
+import importlib.util
+import json
+import os
+import unittest
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+ASYNCPG_INSTALADO = importlib.util.find_spec("asyncpg") is not None
+
+# Consulta (com os parâmetros já aplicados) -> índice que ela deve usar
+CONSULTAS = {
+    "contagem_manga_periodo": (
+        "SELECT COUNT(*) FROM manga_logs WHERE usuario_id = '1' AND timestamp > LOCALTIMESTAMP - interval '1 hour'",
+        "idx_manga_logs_usuario_timestamp",
+    ),
+    "obter_mangas_usuario": (
+        "SELECT manga_id, pecinhas FROM user_collection WHERE usuario_id = '1' ORDER BY last_claimed DESC",
+        "idx_user_collection_usuario_recentes",
+    ),
+    "obter_ranking": (
+        "SELECT usuario_id, mangas FROM usuario_colecao_contagem WHERE mangas > 0 ORDER BY mangas DESC LIMIT 10",
+        "idx_usuario_colecao_contagem_mangas",
+    ),
+    "obter_ranking_guild": (
+        "SELECT usuario_id, mangas FROM guild_contadores "
+        "WHERE guild_id = '1' AND periodo = 'total' AND inicio = DATE '1970-01-01' AND mangas > 0 "
+        "ORDER BY mangas DESC LIMIT 10",
+        "idx_guild_contadores_mangas",
+    ),
+    "obter_ranking_economia_guild": (
+        "SELECT usuario_id, pecinhas FROM guild_contadores "
+        "WHERE guild_id = '1' AND periodo = 'semana' AND inicio = CURRENT_DATE AND pecinhas > 0 "
+        "ORDER BY pecinhas DESC LIMIT 10",
+        "idx_guild_contadores_pecinhas",
+    ),
+    "obter_ranking_economia": (
+        "SELECT usuario_id, saldo FROM usuario_economia WHERE saldo > 0 ORDER BY saldo DESC LIMIT 10",
+        "idx_usuario_economia_saldo",
+    ),
+    "obter_mangas_mais_valiosos": (
+        "SELECT usuario_id, manga_id, pecinhas FROM user_collection "
+        "WHERE pecinhas IS NOT NULL ORDER BY pecinhas DESC LIMIT 10",
+        "idx_user_collection_pecinhas",
+    ),
+    "obter_mangas_mais_valiosos_usuario": (
+        "SELECT usuario_id, manga_id, pecinhas FROM user_collection "
+        "WHERE usuario_id = '1' AND pecinhas IS NOT NULL ORDER BY pecinhas DESC LIMIT 10",
+        "idx_user_collection_usuario_recentes",
+    ),
+    "limpeza_guild_colecao": (
+        "DELETE FROM guild_colecao WHERE (periodo = 'semana' AND inicio < CURRENT_DATE) "
+        "OR (periodo = 'mes' AND inicio < CURRENT_DATE)",
+        "idx_guild_colecao_periodos_encerrados",
+    ),
+    "limpeza_pendentes": (
+        "DELETE FROM mangas_pendentes WHERE criado_em < now() - interval '1 hour'",
+        "idx_mangas_pendentes_criado_em",
+    ),
+    "limpeza_limites": (
+        "DELETE FROM limite_uso WHERE expira_em < now()",
+        "idx_limite_uso_expira_em",
+    ),
+}
+
+def indices_do_plano(plano):
+    """Nomes de todos os índices citados em um plano EXPLAIN (FORMAT JSON)"""
+    indices = set()
+    pendentes = [plano]
+    while pendentes:
+        no = pendentes.pop()
+        if "Index Name" in no:
+            indices.add(no["Index Name"])
+        pendentes.extend(no.get("Plans", []))
+    return indices
+
+@unittest.skipUnless(TEST_DATABASE_URL and ASYNCPG_INSTALADO, "defina TEST_DATABASE_URL e instale asyncpg")
+class IndicesDasMigracoesTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        import asyncpg
+        from database.migrator import aplicar_migracoes
+
+        self.schema = f"teste_indices_{os.getpid()}"
+        self.conn = await asyncpg.connect(TEST_DATABASE_URL)
+        await self.conn.execute(f"CREATE SCHEMA {self.schema}")
+        await self.conn.execute(f"SET search_path TO {self.schema}")
+        await aplicar_migracoes(self.conn)
+
+        # Tabelas pequenas: sem isto o planejador sempre prefere o seq scan
+        await self.conn.execute("SET enable_seqscan = off")
+
+    async def asyncTearDown(self):
+        await self.conn.execute(f"DROP SCHEMA {self.schema} CASCADE")
+        await self.conn.close()
+
+    async def test_consultas_usam_indices(self):
+        for nome, (consulta, indice) in CONSULTAS.items():
+            with self.subTest(consulta=nome):
+                plano = json.loads(await self.conn.fetchval(f"EXPLAIN (FORMAT JSON) {consulta}"))
+                self.assertIn(indice, indices_do_plano(plano[0]["Plan"]))
+
+    async def test_indice_removido(self):
+        existe = await self.conn.fetchval(
+            "SELECT to_regclass($1) IS NOT NULL", f"{self.schema}.idx_manga_logs_usuario_manga"
+        )
+        self.assertFalse(existe)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+"""
+Equivalência do cálculo em lote (NumPy) com a fórmula escalar original de Pecinhas
+"""
+import importlib.util
+import math
+import random
+import unittest
+
+NUMPY_INSTALADO = importlib.util.find_spec("numpy") is not None
+
+if NUMPY_INSTALADO:
+    import numpy as np
+    from utils.constants import calcular_criptogenes
+    from utils.pontuacao import (
+        arredondar_centavos, calcular_criptogenes_lote, calcular_criptogenes_registros, codificar_status
+    )
+
+STATUS = [None, "", "Publishing", "Finished", "On Hiatus", "Discontinued", "Upcoming", "ONGOING", "Completed"]
+
+def referencia_escalar(popularidade, score, members, favorites, status):
+    """Fórmula escalar anterior ao cálculo em lote, mantida aqui como referência"""
+    if not score or score <= 0:
+        valor_base = 10
+    else:
+        valor_base = (score / 10.0) * 100
+
+    mult_popularidade = 1.0
+    if popularidade and popularidade > 0:
+        if popularidade <= 10:
+            mult_popularidade = 8.5
+        elif popularidade <= 50:
+            mult_popularidade = 6.0
+        elif popularidade <= 100:
+            mult_popularidade = 4.0
+        elif popularidade <= 500:
+            mult_popularidade = 2.5
+        elif popularidade <= 1000:
+            mult_popularidade = 1.8
+        elif popularidade <= 5000:
+            mult_popularidade = 1.3
+
+    bonus_membros = 0
+    if members and members > 0:
+        bonus_membros = max(0, min(45, math.log10(max(1, members / 1000)) * 15))
+
+    bonus_favoritos = 0
+    if favorites and favorites > 0:
+        bonus_favoritos = max(0, min(50, math.log10(max(1, favorites / 100)) * 20))
+
+    mult_status = 1.0
+    if status:
+        status_lower = status.lower()
+        if 'publishing' in status_lower or 'ongoing' in status_lower:
+            mult_status = 1.1
+        elif 'finished' in status_lower or 'completed' in status_lower:
+            mult_status = 1.0
+        elif 'hiatus' in status_lower or 'discontinued' in status_lower:
+            mult_status = 0.8
+
+    valor_intermediario = (valor_base + bonus_membros + bonus_favoritos) * mult_popularidade * mult_status
+    valor_final = 1000 * (1 - math.exp(-valor_intermediario / 400))
+    return round(max(1, min(999.99, valor_final)), 2)
+
+def gerar_mangas(quantidade, semente):
+    """Entradas aleatórias cobrindo as bordas das faixas, zeros e campos ausentes"""
+    rng = random.Random(semente)
+    bordas = [0, 1, 10, 11, 50, 51, 100, 101, 500, 501, 1000, 1001, 5000, 5001]
+    mangas = []
+    for _ in range(quantidade):
+        mangas.append((
+            rng.choice([None, rng.choice(bordas), rng.randint(1, 30000)]),
+            rng.choice([None, 0, 10.0, round(rng.uniform(0, 10), 2)]),
+            rng.choice([None, 0, 999, 1000, rng.randint(1, 5_000_000)]),
+            rng.choice([None, 0, 99, 100, rng.randint(1, 500_000)]),
+            rng.choice(STATUS),
+        ))
+    return mangas
+
+@unittest.skipUnless(NUMPY_INSTALADO, "numpy não instalado")
+class CalculoEmLoteTest(unittest.TestCase):
+
+    def test_lote_igual_a_referencia_escalar(self):
+        mangas = gerar_mangas(20000, semente=15)
+        colunas = list(zip(*mangas))
+        lote = calcular_criptogenes_lote(
+            [p or 0 for p in colunas[0]],
+            [s or 0 for s in colunas[1]],
+            [m or 0 for m in colunas[2]],
+            [f or 0 for f in colunas[3]],
+            [codificar_status(s) for s in colunas[4]],
+        )
+        for manga, valor in zip(mangas, lote.tolist()):
+            with self.subTest(manga=manga):
+                self.assertEqual(valor, referencia_escalar(*manga))
+
+    def test_escalar_igual_a_referencia(self):
+        for manga in gerar_mangas(2000, semente=16):
+            with self.subTest(manga=manga):
+                self.assertEqual(calcular_criptogenes(*manga), referencia_escalar(*manga))
+
+    def test_registros_igual_a_referencia(self):
+        class Registro:
+            def __init__(self, popularity, score, members, favorites, status):
+                self.popularity, self.score, self.members = popularity, score, members
+                self.favorites, self.status = favorites, status
+
+        mangas = gerar_mangas(2000, semente=17)
+        valores = calcular_criptogenes_registros([Registro(*m) for m in mangas])
+        self.assertEqual(valores, [referencia_escalar(*m) for m in mangas])
+
+    def test_arredondamento_em_meio_centavo(self):
+        # np.round(14.475, 2) dá 14.48; round(14.475, 2) dá 14.47 (14.475 é 14.47499... em binário)
+        empates = [(n + 0.5) / 100 for n in range(100, 100000, 7)]
+        self.assertEqual(arredondar_centavos(empates).tolist(), [round(v, 2) for v in empates])
+
+        aleatorios = np.random.default_rng(15).uniform(1, 999.99, 100000)
+        self.assertEqual(arredondar_centavos(aleatorios).tolist(), [round(v, 2) for v in aleatorios.tolist()])
+
+    def test_nan_equivale_a_ausente(self):
+        lote = calcular_criptogenes_lote([np.nan], [np.nan], [np.nan], [np.nan], [0])
+        self.assertEqual(lote.tolist(), [referencia_escalar(None, None, None, None, None)])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+"""
+Testes do TokenBucketLimiter com relógio falso: nenhuma janela pode passar da cota
+"""
+import asyncio
+import bisect
+import importlib.util
+import unittest
+
+AIOHTTP_INSTALADO = importlib.util.find_spec("aiohttp") is not None
+
+if AIOHTTP_INSTALADO:
+    from api.jikan_api import TokenBucketLimiter, janelas_jikan
+
+class RelogioFalso:
+    """Relógio monotônico que só avança quando o limitador dorme"""
+
+    def __init__(self):
+        self.agora = 0.0
+
+    def __call__(self):
+        return self.agora
+
+    async def sleep(self, segundos):
+        self.agora += segundos
+        await asyncio.sleep(0)
+
+def maximo_na_janela(eventos, periodo):
+    """Maior quantidade de eventos em um intervalo [t, t + periodo), tolerando erro de float"""
+    return max(
+        bisect.bisect_left(eventos, inicio + periodo - 1e-6) - i
+        for i, inicio in enumerate(eventos)
+    )
+
+@unittest.skipUnless(AIOHTTP_INSTALADO, "aiohttp não instalado")
+class TokenBucketLimiterTest(unittest.IsolatedAsyncioTestCase):
+
+    async def _adquirir(self, janelas, quantidade, concorrentes=1):
+        relogio = RelogioFalso()
+        limitador = TokenBucketLimiter(janelas, clock=relogio, sleep=relogio.sleep)
+        eventos = []
+
+        async def consumidor(n):
+            for _ in range(n):
+                await limitador.acquire()
+                eventos.append(relogio())
+
+        por_consumidor = quantidade // concorrentes
+        await asyncio.gather(*(consumidor(por_consumidor) for _ in range(concorrentes)))
+        return sorted(eventos), limitador
+
+    def _verificar_janelas(self, janelas, eventos):
+        for requisicoes, periodo, _ in janelas:
+            with self.subTest(janela=(requisicoes, periodo)):
+                self.assertLessEqual(maximo_na_janela(eventos, periodo), requisicoes)
+
+    async def test_cota_padrao_da_jikan(self):
+        janelas = janelas_jikan(3, 60)
+        eventos, _ = await self._adquirir(janelas, 300)
+        self._verificar_janelas(janelas, eventos)
+
+    async def test_cota_dividida_entre_processos(self):
+        # Cotas inteiras que o supervisor entrega a 1, 2 e 3 processos
+        for processos in (1, 2, 3):
+            janelas = janelas_jikan(3 // processos, 60 // processos)
+            with self.subTest(processos=processos):
+                eventos, _ = await self._adquirir(janelas, 120)
+                self._verificar_janelas(janelas, eventos)
+
+    async def test_rajada_igual_a_cota(self):
+        # 1 requisição por janela foi o caso que derrubava os processos filhos
+        for janelas in ([(1, 1.0, 1)], [(1, 1.0, 1), (1, 60.0, 1)], [(5, 60.0, 5)]):
+            with self.subTest(janelas=janelas):
+                eventos, _ = await self._adquirir(janelas, 12)
+                self._verificar_janelas(janelas, eventos)
+
+    async def test_consumidores_concorrentes(self):
+        janelas = janelas_jikan(3, 60)
+        eventos, limitador = await self._adquirir(janelas, 200, concorrentes=8)
+        self.assertEqual(len(eventos), 200)
+        self.assertEqual(limitador.aguardando, 0)
+        self._verificar_janelas(janelas, eventos)
+
+    async def test_vazao_proxima_da_cota(self):
+        # Depois da rajada de 5, o balde do minuto repõe 56 tokens a cada 60s:
+        # 600 requisições levam (600 - 5) / (56 / 60) = 637,5s
+        janelas = janelas_jikan(3, 60)
+        eventos, _ = await self._adquirir(janelas, 600)
+        self.assertAlmostEqual(eventos[-1], 637.5, places=3)
+
+    def test_rajada_invalida(self):
+        for janelas in ([(3, 1.0, 0)], [(3, 1.0, 4)], [(0.5, 1.0, 1)]):
+            with self.subTest(janelas=janelas):
+                with self.assertRaises(ValueError):
+                    TokenBucketLimiter(janelas)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+"""
+Regressão do tempo de importação a frio de main e das importações adiadas
+"""
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+# Orçamento (s) da importação de main em um processo novo; ajustável para máquinas lentas
+ORCAMENTO_IMPORTACAO = float(os.environ.get("STARTUP_IMPORT_BUDGET", 2.0))
+DEPENDENCIAS = ("discord", "aiohttp", "asyncpg", "dotenv")
+
+CODIGO = """
+import json, sys, time
+inicio = time.perf_counter()
+import main
+segundos = time.perf_counter() - inicio
+# Importada sob demanda pelo /meusmangas; também não deve puxar o NumPy
+import views.pagination
+print(json.dumps({
+    "segundos": segundos,
+    "numpy": "numpy" in sys.modules,
+    "pontuacao": "utils.pontuacao" in sys.modules,
+}))
+"""
+
+@unittest.skipUnless(
+    all(importlib.util.find_spec(nome) for nome in DEPENDENCIAS),
+    f"exige {', '.join(DEPENDENCIAS)} instalados"
+)
+class ImportacaoFriaTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        ambiente = {
+            **os.environ,
+            "DISCORD_TOKEN": os.environ.get("DISCORD_TOKEN", "teste"),
+            "DATABASE_URL": os.environ.get("DATABASE_URL", "postgresql://teste@localhost/teste"),
+            "PYTHONDONTWRITEBYTECODE": "1",
+        }
+        saida = subprocess.run(
+            [sys.executable, "-c", CODIGO], cwd=RAIZ, env=ambiente,
+            capture_output=True, text=True, timeout=60, check=True
+        )
+        cls.resultado = json.loads(saida.stdout.strip().splitlines()[-1])
+
+    def test_dentro_do_orcamento(self):
+        self.assertLess(
+            self.resultado["segundos"], ORCAMENTO_IMPORTACAO,
+            f"import main levou {self.resultado['segundos']:.2f}s (orçamento {ORCAMENTO_IMPORTACAO}s)"
+        )
+
+    def test_numpy_nao_importado(self):
+        # NumPy só é necessário no cálculo em lote, carregado sob demanda
+        self.assertFalse(self.resultado["numpy"])
+        self.assertFalse(self.resultado["pontuacao"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+"""
+Confere os agregados de valor da coleção sobre linhas semeadas em user_collection
+
+Exige um PostgreSQL local em TEST_DATABASE_URL; as migrações são aplicadas em
+um schema temporário, removido ao final.
+"""
+import importlib.util
+import os
+import unittest
+from datetime import datetime, timedelta
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+ASYNCPG_INSTALADO = importlib.util.find_spec("asyncpg") is not None
+
+# (usuario_id, manga_id, pecinhas); None simula mangás pegos antes da migração 0005
+COLECOES = [
+    ("1", 10, 5.0),
+    ("1", 11, 2.5),
+    ("1", 12, None),
+    ("2", 10, 7.0),
+    ("2", 13, 1.0),
+    ("2", 14, 4.0),
+    ("3", 15, None),
+]
+
+@unittest.skipUnless(TEST_DATABASE_URL and ASYNCPG_INSTALADO, "defina TEST_DATABASE_URL e instale asyncpg")
+class ValorColecaoTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        import asyncpg
+        from database.manga_db import MangaDatabase
+        from database.migrator import aplicar_migracoes
+
+        self.schema = f"teste_valor_{os.getpid()}"
+        self.conn = await asyncpg.connect(TEST_DATABASE_URL)
+        await self.conn.execute(f"CREATE SCHEMA {self.schema}")
+        await self.conn.execute(f"SET search_path TO {self.schema}")
+        await aplicar_migracoes(self.conn)
+
+        # IDs menores foram pegos mais recentemente
+        agora = datetime.now()
+        await self.conn.executemany("""
+            INSERT INTO user_collection (usuario_id, manga_id, first_claimed, last_claimed, pecinhas)
+            VALUES ($1, $2, $3, $3, $4)
+        """, [
+            (usuario_id, manga_id, agora - timedelta(minutes=manga_id), pecinhas)
+            for usuario_id, manga_id, pecinhas in COLECOES
+        ])
+
+        # Pool próprio apontando para o schema temporário; o write-behind não é iniciado
+        self.db = MangaDatabase(TEST_DATABASE_URL)
+        self.db.pool = await asyncpg.create_pool(
+            TEST_DATABASE_URL, min_size=1, max_size=2, server_settings={"search_path": self.schema}
+        )
+
+    async def asyncTearDown(self):
+        await self.db.close()
+        await self.conn.execute(f"DROP SCHEMA {self.schema} CASCADE")
+        await self.conn.close()
+
+    async def test_ranking_valor_colecao(self):
+        ranking = await self.db.obter_ranking_valor_colecao()
+
+        # Usuário 3 só tem mangá sem valor registrado e fica de fora
+        self.assertEqual(ranking, [("2", 12.0, 3), ("1", 7.5, 2)])
+        self.assertEqual(await self.db.obter_ranking_valor_colecao(limite=1), [("2", 12.0, 3)])
+
+    async def test_mangas_mais_valiosos(self):
+        self.assertEqual(
+            await self.db.obter_mangas_mais_valiosos(limite=3),
+            [("2", 10, 7.0), ("1", 10, 5.0), ("2", 14, 4.0)],
+        )
+        self.assertEqual(
+            await self.db.obter_mangas_mais_valiosos(usuario_id=1),
+            [("1", 10, 5.0), ("1", 11, 2.5)],
+        )
+        self.assertEqual(await self.db.obter_mangas_mais_valiosos(usuario_id=3), [])
+
+    async def test_valor_colecao_usuario(self):
+        self.assertEqual(
+            await self.db.obter_valor_colecao(1),
+            {"mangas": 3, "registrados": 2, "valor_total": 7.5},
+        )
+        # Mais recente primeiro; o valor ausente chega como None para a view estimar
+        self.assertEqual(
+            await self.db.obter_mangas_usuario(1),
+            [(10, 5.0), (11, 2.5), (12, None)],
+        )
+
+if __name__ == "__main__":
+    unittest.main()
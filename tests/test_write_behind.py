@@ -0,0 +1,92 @@
+"""
+Testes da WriteBehindQueue com um banco falso: registros ruins não travam a fila
+"""
+import asyncio
+import importlib.util
+import unittest
+from contextlib import asynccontextmanager
+
+ASYNCPG_INSTALADO = importlib.util.find_spec("asyncpg") is not None
+
+if ASYNCPG_INSTALADO:
+    import asyncpg
+    from database.write_behind import WriteBehindQueue
+
+MANGA_RUIM = -1
+
+class ConexaoFalsa:
+    def __init__(self, banco):
+        self.banco = banco
+
+    @asynccontextmanager
+    async def transaction(self):
+        pendentes = []
+        self._pendentes = pendentes
+        yield
+        self.banco.gravados.extend(pendentes)
+
+    async def copy_records_to_table(self, tabela, records, columns):
+        if self.banco.quedas > 0:
+            self.banco.quedas -= 1
+            raise ConnectionResetError("conexão perdida")
+        if any(registro[1] == MANGA_RUIM for registro in records):
+            raise asyncpg.DataError("valor fora do intervalo")
+        self._pendentes.extend(records)
+
+class BancoFalso:
+    """Grava em memória só o que chega a um commit"""
+
+    def __init__(self, quedas=0):
+        self.quedas = quedas
+        self.gravados = []
+
+    @asynccontextmanager
+    async def _acquire(self):
+        yield ConexaoFalsa(self)
+
+def registro(manga_id):
+    return ("1", manga_id, None, None, None)
+
+@unittest.skipUnless(ASYNCPG_INSTALADO, "asyncpg não instalado")
+class WriteBehindQueueTest(unittest.IsolatedAsyncioTestCase):
+
+    def _fila(self, banco, **opcoes):
+        opcoes = {"max_size": 20, "batch_size": 8, "flush_interval": 0.01, "max_backoff": 0, **opcoes}
+        return WriteBehindQueue(banco, **opcoes)
+
+    async def test_registro_ruim_nao_bloqueia_os_seguintes(self):
+        banco = BancoFalso()
+        # Fila menor que o total: se o registro ruim travasse o worker, put() ficaria bloqueado
+        fila = self._fila(banco, max_size=4)
+        fila.start()
+
+        ids = list(range(1, 40))
+        ids.insert(5, MANGA_RUIM)
+        async with asyncio.timeout(5):
+            for manga_id in ids:
+                await fila.put("manga_logs", registro(manga_id))
+            await fila.close()
+
+        self.assertEqual([r[1] for r in banco.gravados], list(range(1, 40)))
+        self.assertEqual(fila.dead_letter_rows, 1)
+        self.assertEqual(fila.dropped_rows, 1)
+
+    async def test_erro_transitorio_repete_sem_descartar(self):
+        banco = BancoFalso(quedas=10)
+        fila = self._fila(banco)
+        fila.start()
+
+        async with asyncio.timeout(5):
+            for manga_id in range(1, 21):
+                await fila.put("manga_logs", registro(manga_id))
+            # Fora do encerramento o lote é repetido até o banco voltar
+            while len(banco.gravados) < 20:
+                await asyncio.sleep(0.01)
+            await fila.close()
+
+        self.assertEqual([r[1] for r in banco.gravados], list(range(1, 21)))
+        self.assertEqual(fila.dropped_rows, 0)
+        self.assertGreaterEqual(fila.failed_attempts, 10)
+
+if __name__ == "__main__":
+    unittest.main()
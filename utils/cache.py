@@ -0,0 +1,167 @@
+"""
+Cache LRU em memória com TTL, orçamento em bytes e stale-while-revalidate
+"""
+import sys
+import time
+from collections import OrderedDict
+from utils.metrics import metrics
+
+def estimar_tamanho(obj, _vistos=None):
+    """
+    Estima recursivamente o tamanho em bytes de um objeto
+
+    Args:
+        obj: Objeto a medir (dicts, listas, strings, objetos com __dict__ ou __slots__)
+
+    Returns:
+        int: Tamanho aproximado em bytes
+    """
+    if _vistos is None:
+        _vistos = set()
+    if id(obj) in _vistos:
+        return 0
+    _vistos.add(id(obj))
+
+    tamanho = sys.getsizeof(obj)
+
+    if isinstance(obj, dict):
+        tamanho += sum(estimar_tamanho(k, _vistos) + estimar_tamanho(v, _vistos) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        tamanho += sum(estimar_tamanho(item, _vistos) for item in obj)
+    elif isinstance(obj, (str, bytes, int, float, bool)) or obj is None:
+        pass
+    else:
+        if hasattr(obj, '__dict__'):
+            tamanho += estimar_tamanho(vars(obj), _vistos)
+        for slot in getattr(type(obj), '__slots__', ()):
+            if hasattr(obj, slot):
+                tamanho += estimar_tamanho(getattr(obj, slot), _vistos)
+
+    return tamanho
+
+class LRUCache:
+    """Cache LRU com operações O(1), limitado por bytes e com TTL"""
+
+    def __init__(self, max_bytes, ttl, stale_ttl=0, nome="cache"):
+        """
+        Inicializa o cache
+
+        Args:
+            max_bytes: Orçamento de memória; as entradas menos usadas são removidas ao excedê-lo
+            ttl: Tempo (s) em que uma entrada é considerada fresca
+            stale_ttl: Tempo extra (s) em que uma entrada expirada ainda é servida como "stale"
+            nome: Prefixo dos contadores registrados em utils.metrics
+        """
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.nome = nome
+
+        self._dados = OrderedDict()
+        self.bytes = 0
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._dados)
+
+    def __contains__(self, key):
+        return key in self._dados
+
+    def get(self, key):
+        """
+        Busca uma entrada
+
+        Returns:
+            tuple: (valor, stale). (None, False) se ausente ou expirada além da janela stale
+        """
+        entrada = self._dados.get(key)
+        if entrada is None:
+            self._registrar("miss")
+            return None, False
+
+        armazenado_em, tamanho, valor = entrada
+        idade = time.monotonic() - armazenado_em
+
+        if idade > self.ttl + self.stale_ttl:
+            self._remover(key)
+            self._registrar("miss")
+            return None, False
+
+        self._dados.move_to_end(key)
+
+        if idade > self.ttl:
+            self._registrar("stale")
+            return valor, True
+
+        self._registrar("hit")
+        return valor, False
+
+    def set(self, key, valor):
+        """Armazena uma entrada, removendo as menos usadas até caber no orçamento"""
+        if key in self._dados:
+            self._remover(key)
+
+        tamanho = estimar_tamanho(valor)
+        if tamanho > self.max_bytes:
+            return
+
+        self._dados[key] = (time.monotonic(), tamanho, valor)
+        self.bytes += tamanho
+
+        while self.bytes > self.max_bytes:
+            _, (_, tamanho_removido, _) = self._dados.popitem(last=False)
+            self.bytes -= tamanho_removido
+            self.evictions += 1
+            metrics.log_counter(f"{self.nome}_eviction")
+
+        self._atualizar_gauges()
+
+    def delete(self, key):
+        """Remove uma entrada se existir"""
+        if key in self._dados:
+            self._remover(key)
+            self._atualizar_gauges()
+
+    def clear(self):
+        """Remove todas as entradas"""
+        self._dados.clear()
+        self.bytes = 0
+        self._atualizar_gauges()
+
+    def get_stats(self):
+        """Retorna estatísticas do cache"""
+        total = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._dados),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits + self.stale_hits) / total if total else 0,
+        }
+
+    def _remover(self, key):
+        """Remove uma entrada atualizando o total de bytes"""
+        _, tamanho, _ = self._dados.pop(key)
+        self.bytes -= tamanho
+
+    def _registrar(self, evento):
+        """Atualiza os contadores locais e os de utils.metrics"""
+        if evento == "hit":
+            self.hits += 1
+        elif evento == "stale":
+            self.stale_hits += 1
+        else:
+            self.misses += 1
+        metrics.log_counter(f"{self.nome}_{evento}")
+
+    def _atualizar_gauges(self):
+        """Publica ocupação do cache em utils.metrics"""
+        metrics.set_gauge(f"{self.nome}_bytes", self.bytes)
+        metrics.set_gauge(f"{self.nome}_entries", len(self._dados))
@@ -2,6 +2,7 @@
 Constantes utilizadas pelo bot Discord TTS
 """
 import os
+import random
 import sys
 from dotenv import load_dotenv
 from pathlib import Path
@@ -22,6 +23,51 @@ if not DATABASE_URL:
 
 API_BASE = os.getenv('JIKAN_API_BASE', "https://api.jikan.moe/v4")
 
+JIKAN_CACHE_MAX_BYTES = int(os.getenv('JIKAN_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+JIKAN_CACHE_TTL = int(os.getenv('JIKAN_CACHE_TTL', 3600))
+JIKAN_CACHE_STALE_TTL = int(os.getenv('JIKAN_CACHE_STALE_TTL', 86400))
+
+JIKAN_RATE_LIMIT_PER_SECOND = int(os.getenv('JIKAN_RATE_LIMIT_PER_SECOND', 3))
+JIKAN_RATE_LIMIT_PER_MINUTE = int(os.getenv('JIKAN_RATE_LIMIT_PER_MINUTE', 60))
+
+CATALOGO_PATH = os.getenv('CATALOGO_PATH', str(Path('data') / 'catalogo.sqlite3'))
+CATALOGO_TTL = int(os.getenv('CATALOGO_TTL', 14 * 86400))
+CATALOGO_PAGE_INTERVAL = float(os.getenv('CATALOGO_PAGE_INTERVAL', 2.0))
+CATALOGO_REFRESH_INTERVAL = int(os.getenv('CATALOGO_REFRESH_INTERVAL', 86400))
+CATALOGO_RELOAD_INTERVAL = float(os.getenv('CATALOGO_RELOAD_INTERVAL', 60.0))
+
+COMPRIMIR_SINOPSE = os.getenv('COMPRIMIR_SINOPSE', 'true').lower() == 'true'
+
+DISK_CACHE_PATH = os.getenv('DISK_CACHE_PATH', str(Path('data') / 'jikan_cache.sqlite3'))
+DISK_CACHE_MAX_BYTES = int(os.getenv('DISK_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+DISK_CACHE_TTL = int(os.getenv('DISK_CACHE_TTL', 7 * 86400))
+
+DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', 1))
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', 10))
+DB_STATEMENT_CACHE_SIZE = int(os.getenv('DB_STATEMENT_CACHE_SIZE', 100))
+DB_ACQUIRE_TIMEOUT = float(os.getenv('DB_ACQUIRE_TIMEOUT', 10))
+DB_COMMAND_TIMEOUT = float(os.getenv('DB_COMMAND_TIMEOUT', 30))
+
+WRITE_BEHIND_MAX_SIZE = int(os.getenv('WRITE_BEHIND_MAX_SIZE', 10000))
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv('WRITE_BEHIND_BATCH_SIZE', 500))
+WRITE_BEHIND_FLUSH_INTERVAL = float(os.getenv('WRITE_BEHIND_FLUSH_INTERVAL', 1.0))
+WRITE_BEHIND_MAX_RETRIES = 3
+WRITE_BEHIND_MAX_BACKOFF = 30.0
+
+RL_POOL_SIZE = int(os.getenv('RL_POOL_SIZE', 10))
+RL_POOL_REFILL_INTERVAL = float(os.getenv('RL_POOL_REFILL_INTERVAL', 2.0))
+
+PAGINACAO_CONCORRENCIA = 4
+
+# Defasagem máxima (s) dos rankings renderizados em cache
+RANKING_CACHE_TTL = int(os.getenv('RANKING_CACHE_TTL', 60))
+
+# Resolução de nomes de usuários nos rankings
+USUARIOS_CACHE_TTL = int(os.getenv('USUARIOS_CACHE_TTL', 3600))
+USUARIOS_CACHE_MAX_BYTES = 2 * 1024 * 1024
+USUARIOS_CONCORRENCIA = 5
+USUARIOS_PRAZO = float(os.getenv('USUARIOS_PRAZO', 2.0))
+
 MANGA_EXPIRATION_TIME = 60
 PENDENTES_CLEANUP_TIME = 10800 
 PENDENTES_CHECK_INTERVAL = 1800
@@ -32,6 +78,16 @@ LIMITE_MANGA_RESET = 3600
 LIMITE_PEGAR_MANGA = 1
 LIMITE_PEGAR_RESET = 18000
 
+# Modo com shards: SHARD_COUNT vazio mantém um único shard
+SHARD_COUNT = int(os.getenv('SHARD_COUNT') or 0) or None
+SHARD_IDS = [int(i) for i in os.getenv('SHARD_IDS', '').split(',') if i.strip()] or None
+SHARD_PROCESSES = int(os.getenv('SHARD_PROCESSES', 1))
+# Índice do processo definido pelo supervisor; o processo 0 sincroniza comandos e ingere o catálogo
+SHARD_PROCESS_INDEX = int(os.getenv('SHARD_PROCESS_INDEX', 0))
+
+# Onde ficam mangás pendentes e limites: 'memoria' (um processo) ou 'postgres' (compartilhado)
+STATE_BACKEND = os.getenv('STATE_BACKEND', 'memoria')
+
 DAILY_MIN_VALUE = 50
 DAILY_MAX_VALUE = 300
 DAILY_COOLDOWN_HOURS = 24
@@ -43,13 +99,10 @@ def gerar_valor_daily():
     Returns:
         int: Valor entre 50 e 300, com maior probabilidade em torno de 100 e 200
     """
-    import random
-    import numpy as np
-    
     if random.random() < 0.5:
-        valor = np.random.normal(loc=100, scale=25)
+        valor = random.gauss(100, 25)
     else:
-        valor = np.random.normal(loc=200, scale=30)
+        valor = random.gauss(200, 30)
     
     valor = max(DAILY_MIN_VALUE, min(DAILY_MAX_VALUE, valor))
     
@@ -59,71 +112,34 @@ def calcular_criptogenes(popularidade=None, score=None, members=None, favorites=
     """
     Sistema de Pecinhas "Lendário" - Extremamente difícil chegar a 1000
     
+    Versão escalar de utils.pontuacao.calcular_criptogenes_lote.
+    
     Args:
         popularidade: Ranking de popularidade (menor = melhor)
         score: Pontuação 0-10
         members: Número de membros que adicionaram 
         favorites: Número de favoritos
         status: Status de publicação
-        manga_data: Dados completos do manga (opcional, usado se parâmetros individuais não fornecidos)
+        manga_data: Dados do manga, dict da API ou MangaRecord (opcional, usado se parâmetros individuais não fornecidos)
     Returns:
         float: Valor em Pecinhas (1-1000, praticamente impossível chegar a 1000)
     """
-    import math
+    from utils.pontuacao import calcular_criptogenes_brutos, codificar_status
     
     if manga_data:
+        if not isinstance(manga_data, dict):
+            manga_data = {
+                campo: getattr(manga_data, campo, None)
+                for campo in ('popularity', 'score', 'members', 'favorites', 'status')
+            }
         popularidade = manga_data.get('popularity') if popularidade is None else popularidade
         score = manga_data.get('score') if score is None else score
         members = manga_data.get('members') if members is None else members
         favorites = manga_data.get('favorites') if favorites is None else favorites
         status = manga_data.get('status') if status is None else status
     
-    if not score or score <= 0:
-        valor_base = 10
-    else:
-        valor_base = (score / 10.0) * 100
-    
-    mult_popularidade = 1.0
-    if popularidade and popularidade > 0:
-        if popularidade <= 10:
-            mult_popularidade = 8.5
-        elif popularidade <= 50:
-            mult_popularidade = 6.0
-        elif popularidade <= 100:
-            mult_popularidade = 4.0
-        elif popularidade <= 500:
-            mult_popularidade = 2.5
-        elif popularidade <= 1000:
-            mult_popularidade = 1.8
-        elif popularidade <= 5000:
-            mult_popularidade = 1.3
-        else:
-            mult_popularidade = 1.0
-    
-    bonus_membros = 0
-    if members and members > 0:
-        bonus_membros = min(45, math.log10(max(1, members / 1000)) * 15)
-        bonus_membros = max(0, bonus_membros)
-    
-    bonus_favoritos = 0
-    if favorites and favorites > 0:
-        bonus_favoritos = min(50, math.log10(max(1, favorites / 100)) * 20)
-        bonus_favoritos = max(0, bonus_favoritos)
-    
-    mult_status = 1.0
-    if status:
-        status_lower = status.lower()
-        if 'publishing' in status_lower or 'ongoing' in status_lower:
-            mult_status = 1.1
-        elif 'finished' in status_lower or 'completed' in status_lower:
-            mult_status = 1.0
-        elif 'hiatus' in status_lower or 'discontinued' in status_lower:
-            mult_status = 0.8
-    
-    valor_intermediario = (valor_base + bonus_membros + bonus_favoritos) * mult_popularidade * mult_status
-    
-    valor_final = 1000 * (1 - math.exp(-valor_intermediario / 400))
-    
-    valor_final = max(1, min(999.99, valor_final))
+    valor_final = calcular_criptogenes_brutos(
+        [popularidade or 0], [score or 0], [members or 0], [favorites or 0], [codificar_status(status)]
+    )[0]
     
-    return round(valor_final, 2)
+    return round(float(valor_final), 2)
@@ -0,0 +1,186 @@
+"""
+Cache persistente em disco (SQLite) que sobrevive a reinicializações
+"""
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from utils.logger import setup_logger
+from utils.metrics import metrics
+
+logger = setup_logger()
+
+class DiskCache:
+    """Cache chave-valor em SQLite com TTL por entrada, limite de tamanho e compactação"""
+
+    def __init__(self, caminho, max_bytes, ttl, compactar_a_cada=500, nome="disk_cache"):
+        """
+        Inicializa o cache sem abrir o arquivo
+
+        Args:
+            caminho: Caminho do arquivo SQLite
+            max_bytes: Tamanho máximo somado dos valores armazenados
+            ttl: Tempo de vida padrão (s) de cada entrada
+            compactar_a_cada: Quantidade de escritas entre compactações automáticas
+            nome: Prefixo dos contadores registrados em utils.metrics
+        """
+        self.caminho = Path(caminho)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.compactar_a_cada = compactar_a_cada
+        self.nome = nome
+
+        self._conn = None
+        self._lock = threading.Lock()
+        self._escritas = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes = 0
+
+    async def get(self, chave):
+        """Retorna o valor armazenado ou None se ausente ou expirado"""
+        try:
+            valor = await asyncio.to_thread(self._get, chave)
+        except Exception as e:
+            metrics.log_error(f"{self.nome}_error")
+            logger.warning(f"Erro ao ler do cache em disco: {e}")
+            return None
+
+        if valor is not None:
+            self.hits += 1
+            metrics.log_counter(f"{self.nome}_hit")
+        else:
+            self.misses += 1
+            metrics.log_counter(f"{self.nome}_miss")
+        return valor
+
+    async def set(self, chave, valor, ttl=None):
+        """Armazena um valor serializável em JSON"""
+        try:
+            await asyncio.to_thread(self._set, chave, valor, ttl or self.ttl)
+        except Exception as e:
+            metrics.log_error(f"{self.nome}_error")
+            logger.warning(f"Erro ao gravar no cache em disco: {e}")
+
+    async def compactar(self):
+        """Remove entradas expiradas e as menos acessadas até caber no limite de tamanho"""
+        try:
+            await asyncio.to_thread(self._compactar)
+        except Exception as e:
+            metrics.log_error(f"{self.nome}_error")
+            logger.warning(f"Erro ao compactar o cache em disco: {e}")
+
+    def get_stats(self):
+        """Retorna estatísticas do cache (bytes medidos na última compactação)"""
+        total = self.hits + self.misses
+        return {
+            "path": str(self.caminho),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0,
+        }
+
+    async def close(self):
+        """Fecha o arquivo do cache"""
+        await asyncio.to_thread(self._close)
+
+    def _conectar(self):
+        """Abre (e cria, se necessário) o banco SQLite; deve ser chamado com o lock"""
+        if self._conn is None:
+            self.caminho.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.caminho, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS cache (
+                    chave TEXT PRIMARY KEY,
+                    valor TEXT NOT NULL,
+                    tamanho INTEGER NOT NULL,
+                    expira_em REAL NOT NULL,
+                    acessado_em REAL NOT NULL
+                )
+            ''')
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_acessado_em ON cache (acessado_em)")
+            self._conn.commit()
+        return self._conn
+
+    def _get(self, chave):
+        with self._lock:
+            conn = self._conectar()
+            row = conn.execute(
+                "SELECT valor, expira_em FROM cache WHERE chave = ?", (chave,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            valor, expira_em = row
+            agora = time.time()
+            if expira_em <= agora:
+                conn.execute("DELETE FROM cache WHERE chave = ?", (chave,))
+                conn.commit()
+                return None
+
+            conn.execute("UPDATE cache SET acessado_em = ? WHERE chave = ?", (agora, chave))
+            conn.commit()
+
+        return json.loads(valor)
+
+    def _set(self, chave, valor, ttl):
+        dados = json.dumps(valor, ensure_ascii=False, separators=(",", ":"))
+        agora = time.time()
+
+        with self._lock:
+            conn = self._conectar()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (chave, valor, tamanho, expira_em, acessado_em) VALUES (?, ?, ?, ?, ?)",
+                (chave, dados, len(dados), agora + ttl, agora)
+            )
+            conn.commit()
+            self._escritas += 1
+            compactar = self._escritas % self.compactar_a_cada == 0
+
+        if compactar:
+            self._compactar()
+
+    def _compactar(self):
+        with self._lock:
+            conn = self._conectar()
+            expiradas = conn.execute("DELETE FROM cache WHERE expira_em <= ?", (time.time(),)).rowcount
+
+            total = conn.execute("SELECT COALESCE(SUM(tamanho), 0) FROM cache").fetchone()[0]
+            removidas = 0
+            if total > self.max_bytes:
+                excesso = total - self.max_bytes
+                for chave, tamanho in conn.execute(
+                    "SELECT chave, tamanho FROM cache ORDER BY acessado_em"
+                ).fetchall():
+                    if excesso <= 0:
+                        break
+                    conn.execute("DELETE FROM cache WHERE chave = ?", (chave,))
+                    excesso -= tamanho
+                    total -= tamanho
+                    removidas += 1
+
+            conn.commit()
+            conn.execute("PRAGMA incremental_vacuum")
+
+        self.bytes = total
+        self.evictions += expiradas + removidas
+        metrics.set_gauge(f"{self.nome}_bytes", total)
+        if expiradas or removidas:
+            metrics.log_counter(f"{self.nome}_eviction", expiradas + removidas)
+            logger.info(f"Cache em disco compactado: {expiradas} expiradas, {removidas} removidas por tamanho")
+
+    def _close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -9,6 +9,8 @@ import os
 import logging
 from datetime import datetime
 from discord.ext import tasks
+from utils.metrics import metrics
+from utils.startup import startup
 
 logger = logging.getLogger(__name__)
 
@@ -74,7 +76,43 @@ class KeepAliveServer:
             "ping_count": self.ping_count,
             "start_time": self.start_time.isoformat()
         }
-        
+
+        if hasattr(self.bot, 'db'):
+            stats["database"] = self.bot.db.get_pool_stats()
+            stats["write_behind"] = self.bot.db.write_behind.get_stats()
+
+        if hasattr(self.bot, 'jikan'):
+            stats["jikan_cache"] = self.bot.jikan.cache.get_stats()
+            if self.bot.jikan.disk_cache:
+                stats["jikan_disk_cache"] = self.bot.jikan.disk_cache.get_stats()
+            if self.bot.jikan.catalogo:
+                stats["catalogo"] = self.bot.jikan.catalogo.get_stats()
+
+        stats["startup"] = startup.get_stats()
+
+        if hasattr(self.bot, 'get_shard_stats'):
+            stats["sharding"] = self.bot.get_shard_stats()
+
+        if hasattr(self.bot, 'manga_pool'):
+            stats["rl_pool"] = self.bot.manga_pool.get_stats()
+
+        stats["claim_decision_ms"] = metrics.get_histogram("claim_decision_ms")
+
+        if hasattr(self.bot, 'rankings'):
+            stats["ranking_cache"] = self.bot.rankings.get_stats()
+
+        if hasattr(self.bot, 'usuarios'):
+            stats["user_resolver"] = self.bot.usuarios.get_stats()
+
+        if hasattr(self.bot, 'expiracoes'):
+            stats["expiry_scheduler"] = self.bot.expiracoes.get_stats()
+
+        if hasattr(self.bot, 'estado'):
+            try:
+                stats["state"] = await self.bot.estado.get_stats()
+            except Exception as e:
+                logger.error(f"❌ Erro ao obter estatísticas do estado: {e}")
+
         return web.json_response(stats)
     
     async def start_server(self):
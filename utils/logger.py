@@ -3,10 +3,15 @@ Configuração de logging para o bot Discord
 """
 import logging
 
+_logger = None
+
 def setup_logger():
-    """Configuração de logging"""
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
-    return logging.getLogger('discord-bot')
+    """Configuração de logging (executada uma única vez; chamadas seguintes reutilizam o logger)"""
+    global _logger
+    if _logger is None:
+        logging.basicConfig(
+            level=logging.INFO,
+            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+        )
+        _logger = logging.getLogger('discord-bot')
+    return _logger
@@ -1,6 +1,7 @@
 """
 Sistema de métricas para monitorar o desempenho e uso do bot
 """
+import bisect
 import json
 import time
 from datetime import datetime, timedelta
@@ -9,6 +10,9 @@ from utils.logger import setup_logger
 
 logger = setup_logger()
 
+# Limites superiores (inclusivos) das faixas dos histogramas, em ms
+HISTOGRAM_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000)
+
 class BotMetrics:
     """Classe para monitoramento e métricas do bot"""
     
@@ -28,6 +32,12 @@ class BotMetrics:
         
         self.cache_hits = 0
         self.cache_misses = 0
+        
+        self.counters = defaultdict(int)
+        
+        self.gauges = {}
+        
+        self.histograms = {}
     
     def uptime(self):
         """Retorna o tempo de atividade do bot"""
@@ -65,6 +75,55 @@ class BotMetrics:
         """Registra um miss no cache"""
         self.cache_misses += 1
     
+    def log_counter(self, name, amount=1):
+        """Incrementa um contador nomeado"""
+        self.counters[name] += amount
+    
+    def set_gauge(self, name, value):
+        """Define o valor atual de um medidor nomeado"""
+        self.gauges[name] = value
+    
+    def log_histogram(self, name, value):
+        """Registra uma amostra (ex.: latência em ms) no histograma nomeado"""
+        histograma = self.histograms.get(name)
+        if histograma is None:
+            histograma = self.histograms[name] = {
+                "buckets": [0] * (len(HISTOGRAM_BUCKETS) + 1),
+                "samples": deque(maxlen=1000),
+                "count": 0,
+                "sum": 0.0,
+            }
+        
+        histograma["buckets"][bisect.bisect_left(HISTOGRAM_BUCKETS, value)] += 1
+        histograma["samples"].append(value)
+        histograma["count"] += 1
+        histograma["sum"] += value
+    
+    def get_histogram(self, name):
+        """Retorna contagem por faixa e percentis recentes do histograma nomeado"""
+        histograma = self.histograms.get(name)
+        if histograma is None:
+            return {"count": 0}
+        
+        amostras = sorted(histograma["samples"])
+        def percentil(p):
+            return round(amostras[min(len(amostras) - 1, int(p * len(amostras)))], 3)
+        
+        limites = [f"<={limite}" for limite in HISTOGRAM_BUCKETS] + [f">{HISTOGRAM_BUCKETS[-1]}"]
+        return {
+            "count": histograma["count"],
+            "avg": round(histograma["sum"] / histograma["count"], 3),
+            "p50": percentil(0.50),
+            "p90": percentil(0.90),
+            "p99": percentil(0.99),
+            "max": round(amostras[-1], 3),
+            "buckets": dict(zip(limites, histograma["buckets"])),
+        }
+    
+    def get_counter(self, name):
+        """Retorna o valor de um contador nomeado"""
+        return self.counters.get(name, 0)
+    
     def get_cache_hit_rate(self):
         """Retorna a taxa de acerto do cache"""
         total = self.cache_hits + self.cache_misses
@@ -110,6 +169,9 @@ class BotMetrics:
                 "cache_hit_rate": self.get_cache_hit_rate(),
                 "errors": dict(self.errors),
                 "guilds": dict(self.guild_usage),
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+                "histograms": {name: self.get_histogram(name) for name in self.histograms},
                 "timestamp": datetime.now().isoformat()
             }
             
@@ -0,0 +1,126 @@
+"""
+Cálculo vetorizado (NumPy) do valor em Pecinhas de vários mangás de uma vez
+"""
+import numpy as np
+
+STATUS_DESCONHECIDO = 0
+STATUS_PUBLICANDO = 1
+STATUS_FINALIZADO = 2
+STATUS_PAUSADO = 3
+
+# Índice = código de status
+MULT_STATUS = np.array([1.0, 1.1, 1.0, 0.8])
+
+# Limites superiores (inclusivos) das faixas de popularidade e o multiplicador de cada faixa;
+# a última posição vale para popularidade acima de 5000
+LIMITES_POPULARIDADE = np.array([10, 50, 100, 500, 1000, 5000])
+MULT_POPULARIDADE = np.array([8.5, 6.0, 4.0, 2.5, 1.8, 1.3, 1.0])
+
+def codificar_status(status):
+    """
+    Converte o status de publicação da API no código usado pelo cálculo em lote
+
+    Args:
+        status: Status de publicação (ex.: "Publishing", "Finished")
+
+    Returns:
+        int: Uma das constantes STATUS_*
+    """
+    if not status:
+        return STATUS_DESCONHECIDO
+
+    status_lower = status.lower()
+    if 'publishing' in status_lower or 'ongoing' in status_lower:
+        return STATUS_PUBLICANDO
+    if 'finished' in status_lower or 'completed' in status_lower:
+        return STATUS_FINALIZADO
+    if 'hiatus' in status_lower or 'discontinued' in status_lower:
+        return STATUS_PAUSADO
+    return STATUS_DESCONHECIDO
+
+def calcular_criptogenes_brutos(popularidade, score, members, favorites, status):
+    """
+    Calcula os valores em Pecinhas sem arredondamento
+
+    Args:
+        popularidade: Rankings de popularidade (menor = melhor; 0 ou NaN = desconhecido)
+        score: Pontuações 0-10 (0 ou NaN = sem nota)
+        members: Quantidades de membros
+        favorites: Quantidades de favoritos
+        status: Códigos de status (ver codificar_status)
+
+    Returns:
+        numpy.ndarray: Valores float64 entre 1 e 999.99
+    """
+    popularidade = np.nan_to_num(np.asarray(popularidade, dtype=np.float64))
+    score = np.nan_to_num(np.asarray(score, dtype=np.float64))
+    members = np.nan_to_num(np.asarray(members, dtype=np.float64))
+    favorites = np.nan_to_num(np.asarray(favorites, dtype=np.float64))
+    status = np.asarray(status, dtype=np.intp)
+
+    valor_base = np.where(score > 0, score / 10.0 * 100, 10.0)
+
+    faixa = np.searchsorted(LIMITES_POPULARIDADE, popularidade, side='left')
+    mult_popularidade = np.where(popularidade > 0, MULT_POPULARIDADE[faixa], 1.0)
+
+    bonus_membros = np.where(
+        members > 0,
+        np.minimum(45, np.log10(np.maximum(1, members / 1000)) * 15),
+        0.0
+    )
+    bonus_favoritos = np.where(
+        favorites > 0,
+        np.minimum(50, np.log10(np.maximum(1, favorites / 100)) * 20),
+        0.0
+    )
+
+    mult_status = MULT_STATUS[status]
+
+    valor_intermediario = (valor_base + bonus_membros + bonus_favoritos) * mult_popularidade * mult_status
+    valor_final = 1000 * (1 - np.exp(-valor_intermediario / 400))
+
+    return np.clip(valor_final, 1, 999.99)
+
+def calcular_criptogenes_lote(popularidade, score, members, favorites, status):
+    """
+    Calcula o valor em Pecinhas de vários mangás a partir de arrays colunares
+
+    Mesmos argumentos de calcular_criptogenes_brutos.
+
+    Returns:
+        numpy.ndarray: Valores arredondados a 2 casas decimais, iguais aos de round(valor, 2)
+    """
+    return arredondar_centavos(calcular_criptogenes_brutos(popularidade, score, members, favorites, status))
+
+def arredondar_centavos(valores):
+    """
+    Arredonda a 2 casas decimais com o mesmo resultado de round(valor, 2)
+
+    np.round multiplica por 100 antes de arredondar e diverge de round() perto
+    de meio centavo (ex.: 14.475); só esses poucos valores passam por round().
+    """
+    valores = np.asarray(valores, dtype=np.float64)
+    arredondados = np.round(valores, 2)
+    centavos = valores * 100
+    for i in np.flatnonzero(np.abs(centavos - np.floor(centavos) - 0.5) < 1e-6):
+        arredondados[i] = round(float(valores[i]), 2)
+    return arredondados
+
+def calcular_criptogenes_registros(mangas):
+    """
+    Calcula o valor em Pecinhas de uma sequência de MangaRecord
+
+    Returns:
+        list: Valores float na mesma ordem dos mangás
+    """
+    if not mangas:
+        return []
+
+    valores = calcular_criptogenes_brutos(
+        [m.popularity or 0 for m in mangas],
+        [m.score or 0 for m in mangas],
+        [m.members or 0 for m in mangas],
+        [m.favorites or 0 for m in mangas],
+        [codificar_status(m.status) for m in mangas],
+    )
+    return [round(float(v), 2) for v in valores]
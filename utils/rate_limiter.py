@@ -0,0 +1,137 @@
+"""
+Limitador de taxa por usuário com janela deslizante em relógio monotônico
+"""
+import math
+import time
+from collections import deque
+
+class SlidingWindowLimiter:
+    """
+    Permite até `limite` eventos por chave em qualquer janela de `janela` segundos
+
+    Cada chave guarda no máximo `limite` instantes, então verificar e registrar
+    custam O(1) amortizado. Chaves inativas são removidas por uma roda de tempo
+    (timing wheel) girada a cada chamada, sem varrer todos os usuários.
+    """
+
+    def __init__(self, limite, janela, clock=time.monotonic, resolucao=None, nome="rate_limit"):
+        """
+        Inicializa o limitador
+
+        Args:
+            limite: Máximo de eventos por chave dentro da janela
+            janela: Duração (s) da janela deslizante
+            clock: Função que retorna o tempo atual em segundos (monotônico)
+            resolucao: Largura (s) de cada posição da roda de expiração (padrão: janela / 60)
+            nome: Nome exibido nas estatísticas
+        """
+        self.limite = limite
+        self.janela = janela
+        self.clock = clock
+        self.nome = nome
+
+        self._eventos = {}
+
+        self.resolucao = resolucao or janela / 60
+        self._roda = [set() for _ in range(math.ceil(janela / self.resolucao) + 2)]
+        self._tick_atual = self._tick(clock())
+
+    def verificar(self, chave):
+        """
+        Verifica se a chave pode registrar um novo evento agora
+
+        Returns:
+            tuple: (permitido, restantes, espera) — restantes é quantos eventos ainda cabem
+                   na janela e espera é quanto tempo (s) falta para a próxima vaga
+        """
+        agora = self.clock()
+        self._girar(agora)
+
+        eventos = self._eventos.get(chave)
+        if eventos is None:
+            return True, self.limite, 0.0
+
+        self._podar(eventos, agora)
+        restantes = self.limite - len(eventos)
+        if restantes > 0:
+            return True, restantes, 0.0
+        return False, 0, eventos[0] + self.janela - agora
+
+    def registrar(self, chave):
+        """Registra um evento da chave no instante atual"""
+        agora = self.clock()
+        self._girar(agora)
+
+        eventos = self._eventos.get(chave)
+        if eventos is None:
+            eventos = self._eventos[chave] = deque(maxlen=self.limite)
+        eventos.append(agora)
+
+        # A chave fica vazia quando seu último evento sai da janela
+        expira_tick = math.ceil((agora + self.janela) / self.resolucao)
+        self._roda[expira_tick % len(self._roda)].add(chave)
+
+    def consumir(self, chave):
+        """
+        Verifica e, se permitido, registra um evento em uma única operação
+
+        Returns:
+            tuple: Mesmo formato de verificar(); `restantes` já desconta o evento registrado
+        """
+        permitido, restantes, espera = self.verificar(chave)
+        if permitido:
+            self.registrar(chave)
+            restantes -= 1
+        return permitido, restantes, espera
+
+    def estornar(self, chave):
+        """Desfaz o evento mais recente da chave (ex.: a ação que ele liberava falhou)"""
+        eventos = self._eventos.get(chave)
+        if eventos:
+            eventos.pop()
+
+    def tempo_ate_proximo_slot(self, chave):
+        """Segundos até a chave poder registrar um novo evento (0 se já pode)"""
+        return self.verificar(chave)[2]
+
+    def get_stats(self):
+        """Retorna estatísticas do limitador"""
+        return {
+            "name": self.nome,
+            "limit": self.limite,
+            "window": self.janela,
+            "active_keys": len(self._eventos),
+        }
+
+    def __len__(self):
+        return len(self._eventos)
+
+    def _tick(self, instante):
+        return math.floor(instante / self.resolucao)
+
+    def _podar(self, eventos, agora):
+        """Descarta os eventos que já saíram da janela"""
+        limite_inferior = agora - self.janela
+        while eventos and eventos[0] <= limite_inferior:
+            eventos.popleft()
+
+    def _girar(self, agora):
+        """Avança a roda até o tick atual, removendo as chaves que ficaram vazias"""
+        tick = self._tick(agora)
+        if tick <= self._tick_atual:
+            return
+
+        # Após um intervalo maior que a roda, basta uma volta completa
+        inicio = max(self._tick_atual + 1, tick - len(self._roda) + 1)
+        for t in range(inicio, tick + 1):
+            posicao = self._roda[t % len(self._roda)]
+            for chave in posicao:
+                eventos = self._eventos.get(chave)
+                if eventos is None:
+                    continue
+                self._podar(eventos, agora)
+                if not eventos:
+                    del self._eventos[chave]
+            posicao.clear()
+
+        self._tick_atual = tick
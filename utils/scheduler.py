@@ -0,0 +1,158 @@
+"""
+Agendador único de tarefas com prazo (expiração de mangás, limpezas periódicas)
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from utils.logger import setup_logger
+from utils.metrics import metrics
+
+logger = setup_logger()
+
+class ExpiryScheduler:
+    """
+    Executa callbacks em prazos monotônicos usando um heap e uma única task
+
+    Reagendar uma chave substitui o agendamento anterior; entradas substituídas
+    ou canceladas ficam no heap e são descartadas quando chegam ao topo.
+    """
+
+    def __init__(self, clock=time.monotonic, max_concorrencia=8, nome="expiracao"):
+        """
+        Inicializa o agendador sem iniciar o worker
+
+        Args:
+            clock: Função que retorna o tempo atual em segundos (monotônico)
+            max_concorrencia: Máximo de callbacks rodando ao mesmo tempo
+            nome: Prefixo das métricas
+        """
+        self.clock = clock
+        self.nome = nome
+
+        self._heap = []
+        self._agendados = {}
+        self._seq = itertools.count()
+        self._acordar = asyncio.Event()
+        self._semaforo = asyncio.Semaphore(max_concorrencia)
+        self._em_execucao = set()
+        self.task = None
+
+        self.executados = 0
+        self.falhas = 0
+        self._atrasos = deque(maxlen=100)
+        self.atraso_maximo = 0.0
+
+    def start(self):
+        """Inicia o worker em background"""
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._worker())
+
+    async def close(self):
+        """Para o worker e cancela os callbacks em andamento"""
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+        for task in list(self._em_execucao):
+            task.cancel()
+        if self._em_execucao:
+            await asyncio.gather(*self._em_execucao, return_exceptions=True)
+
+    def agendar(self, chave, atraso, callback, *args):
+        """
+        Agenda `callback(*args)` para daqui a `atraso` segundos
+
+        Args:
+            chave: Identificador do agendamento; reagendar a mesma chave substitui o anterior
+            atraso: Segundos até a execução
+            callback: Corrotina a executar
+        """
+        prazo = self.clock() + atraso
+        seq = next(self._seq)
+        self._agendados[chave] = seq
+        heapq.heappush(self._heap, (prazo, seq, chave, callback, args))
+
+        # Só precisa acordar o worker se o novo prazo for o mais próximo
+        if self._heap[0][1] == seq:
+            self._acordar.set()
+
+    def cancelar(self, chave):
+        """Cancela o agendamento da chave, se houver"""
+        return self._agendados.pop(chave, None) is not None
+
+    def __len__(self):
+        return len(self._agendados)
+
+    async def _worker(self):
+        """Dorme até o prazo mais próximo e dispara os callbacks vencidos"""
+        while True:
+            self._acordar.clear()
+
+            if not self._heap:
+                await self._acordar.wait()
+                continue
+
+            espera = self._heap[0][0] - self.clock()
+            if espera > 0:
+                try:
+                    await asyncio.wait_for(self._acordar.wait(), timeout=espera)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            agora = self.clock()
+            while self._heap and self._heap[0][0] <= agora:
+                prazo, seq, chave, callback, args = heapq.heappop(self._heap)
+                if self._agendados.get(chave) != seq:
+                    continue
+                del self._agendados[chave]
+
+                atraso = agora - prazo
+                self._atrasos.append(atraso)
+                self.atraso_maximo = max(self.atraso_maximo, atraso)
+
+                await self._semaforo.acquire()
+                task = asyncio.create_task(self._executar(callback, args))
+                self._em_execucao.add(task)
+                task.add_done_callback(self._em_execucao.discard)
+
+            self._publicar_metricas()
+
+    async def _executar(self, callback, args):
+        """Executa um callback, registrando falhas sem derrubar o worker"""
+        try:
+            await callback(*args)
+            self.executados += 1
+        except Exception as e:
+            self.falhas += 1
+            logger.error(f"Erro em tarefa agendada ({self.nome}): {e}")
+            metrics.log_error(f"{self.nome}_callback")
+        finally:
+            self._semaforo.release()
+
+    def _publicar_metricas(self):
+        """Atualiza os medidores de fila, atraso e tasks"""
+        metrics.set_gauge(f"{self.nome}_agendados", len(self._agendados))
+        metrics.set_gauge(f"{self.nome}_lag_ms", round(self._atrasos[-1] * 1000, 1) if self._atrasos else 0.0)
+        metrics.set_gauge(f"{self.nome}_tasks", len(self._em_execucao))
+
+    def get_stats(self):
+        """Retorna estatísticas do agendador"""
+        atraso_medio = sum(self._atrasos) / len(self._atrasos) if self._atrasos else 0.0
+        return {
+            "scheduled": len(self._agendados),
+            "heap_entries": len(self._heap),
+            "running_callbacks": len(self._em_execucao),
+            "event_loop_tasks": len(asyncio.all_tasks()),
+            "executed": self.executados,
+            "failures": self.falhas,
+            "lag_avg_ms": round(atraso_medio * 1000, 1),
+            "lag_max_ms": round(self.atraso_maximo * 1000, 1),
+            "running": self.task is not None and not self.task.done(),
+        }
@@ -0,0 +1,33 @@
+"""
+Medição do tempo de inicialização do bot, fase a fase
+"""
+import time
+from contextlib import contextmanager
+
+class StartupProfiler:
+    """Registra a duração de cada fase da inicialização"""
+
+    def __init__(self):
+        # Importado antes de todo o resto em main.py: marca o início do processo
+        self.inicio = time.perf_counter()
+        self.fases = {}
+
+    @contextmanager
+    def fase(self, nome):
+        """Mede a duração do bloco e a registra como uma fase"""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.fases[nome] = round((time.perf_counter() - inicio) * 1000, 1)
+
+    def marco(self, nome):
+        """Registra o tempo decorrido desde o início do processo; só a primeira marcação vale"""
+        if nome not in self.fases:
+            self.fases[nome] = round((time.perf_counter() - self.inicio) * 1000, 1)
+
+    def get_stats(self):
+        """Retorna as fases registradas, em ms, na ordem em que ocorreram"""
+        return dict(self.fases)
+
+startup = StartupProfiler()
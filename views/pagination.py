@@ -1,72 +1,153 @@
 """
 Views de paginação para o bot Discord
 """
+import asyncio
 import discord
+from api.models import MangaRecord
+from utils.constants import PAGINACAO_CONCORRENCIA
+from utils.logger import setup_logger
+
+logger = setup_logger()
 
 class MangaPaginationView(discord.ui.View):
-    """View para paginação da lista de mangás do usuário"""
-    
-    def __init__(self, manga_list, username, per_page=10):
+    """View para paginação da lista de mangás do usuário, carregando cada página sob demanda"""
+
+    def __init__(self, mangas, username, jikan, per_page=10, concorrencia=PAGINACAO_CONCORRENCIA,
+                 colecao=None):
+        """
+        Inicializa a view
+
+        Args:
+            mangas: Tuplas (manga_id, pecinhas registradas ou None), na ordem de exibição
+            username: Nome exibido no título do embed
+            jikan: Instância de JikanAPI usada para resolver os metadados
+            per_page: Mangás por página
+            concorrencia: Máximo de buscas simultâneas de metadados
+            colecao: Resultado de MangaDatabase.obter_valor_colecao, exibido no rodapé
+        """
         super().__init__(timeout=180)
-        self.manga_list = manga_list
+        self.mangas = mangas
         self.username = username
+        self.jikan = jikan
         self.per_page = per_page
+        self.colecao = colecao
         self.current_page = 0
-        self.total_pages = (len(manga_list) - 1) // per_page + 1
-        
+        self.total_pages = (len(mangas) - 1) // per_page + 1
+
+        self._paginas = {}
+        self._semaforo = asyncio.Semaphore(concorrencia)
+
         self.update_buttons()
-    
+
     def update_buttons(self):
         """Atualiza o estado dos botões de navegação"""
         self.previous_button.disabled = self.current_page == 0
         self.next_button.disabled = self.current_page >= self.total_pages - 1
-    
+
     async def generate_embed(self):
-        """Gera o embed para a página atual"""
-        start_idx = self.current_page * self.per_page
-        end_idx = min(start_idx + self.per_page, len(self.manga_list))
-        current_mangas = self.manga_list[start_idx:end_idx]
-        
-        mangas_formatados = []
-        for manga in current_mangas:
-            if isinstance(manga, dict) and 'title' in manga:
-                from utils.constants import calcular_criptogenes
-                titulo = manga.get('title', 'Sem título')
-                url = manga.get('url', '')
-                criptogenes = calcular_criptogenes(manga_data=manga)
-                
-                if url:
-                    mangas_formatados.append(f"[{titulo}]({url}) - <a:gold_stud:1380069369580748840> **{criptogenes}** Pecinhas")
-                else:
-                    mangas_formatados.append(f"{titulo} - <a:gold_stud:1380069369580748840> **{criptogenes}** Pecinhas")
-            else:
-                mangas_formatados.append(f"{manga}")
-        
+        """Gera o embed para a página atual e pré-carrega a próxima em background"""
+        mangas_formatados = await self._obter_pagina(self.current_page)
+        self._obter_pagina(self.current_page + 1)
+
         embed = discord.Embed(
-            title=f"Mangás de {self.username}", 
+            title=f"Mangás de {self.username}",
             description="\n".join(mangas_formatados) or "Nenhum mangá encontrado."
         )
-        embed.set_footer(text=f"Página {self.current_page + 1}/{self.total_pages}")
+        rodape = f"Página {self.current_page + 1}/{self.total_pages}"
+        if self.colecao and self.colecao['registrados']:
+            rodape += f" • Valor registrado: {self.colecao['valor_total']:.2f} Pecinhas"
+            if self.colecao['registrados'] < self.colecao['mangas']:
+                # Mangás pegos antes do registro de valores aparecem com ≈ e ficam fora da soma
+                rodape += f" ({self.colecao['registrados']} de {self.colecao['mangas']} mangás; ≈ = estimativa atual)"
+        embed.set_footer(text=rodape)
         return embed
-    
+
+    async def on_timeout(self):
+        """Cancela pré-carregamentos pendentes quando a view expira"""
+        for task in self._paginas.values():
+            task.cancel()
+        self._paginas.clear()
+
+    def _obter_pagina(self, pagina):
+        """
+        Retorna a tarefa que resolve as linhas de uma página, criando-a se necessário
+
+        Returns:
+            asyncio.Future: Resolve para a lista de linhas formatadas (vazia se a página não existir)
+        """
+        if not 0 <= pagina < self.total_pages:
+            futuro = asyncio.get_running_loop().create_future()
+            futuro.set_result([])
+            return futuro
+
+        task = self._paginas.get(pagina)
+        if task is None:
+            task = asyncio.create_task(self._carregar_pagina(pagina))
+            self._paginas[pagina] = task
+        return task
+
+    async def _carregar_pagina(self, pagina):
+        """Busca os metadados dos mangás de uma página com concorrência limitada"""
+        inicio = pagina * self.per_page
+        entradas = self.mangas[inicio:inicio + self.per_page]
+        ids = [manga_id for manga_id, _ in entradas]
+
+        async def buscar(manga_id):
+            async with self._semaforo:
+                return await self.jikan.fetch_manga_info(manga_id, return_full_data=True)
+
+        resultados = await asyncio.gather(*(buscar(manga_id) for manga_id in ids), return_exceptions=True)
+
+        # O valor registrado no momento em que o mangá foi pego é o exibido; só mangás
+        # sem registro (anteriores à migração 0005) usam uma estimativa com os dados atuais
+        sem_registro = [
+            manga for manga, (_, pecinhas) in zip(resultados, entradas)
+            if isinstance(manga, MangaRecord) and pecinhas is None
+        ]
+        estimativas = iter(())
+        if sem_registro:
+            # Importado sob demanda: utils.pontuacao carrega o NumPy, evitado na inicialização
+            from utils.pontuacao import calcular_criptogenes_registros
+            estimativas = iter(calcular_criptogenes_registros(sem_registro))
+
+        linhas = []
+        falhou = False
+        for (manga_id, pecinhas), manga in zip(entradas, resultados):
+            if isinstance(manga, MangaRecord):
+                criptogenes = f"{pecinhas:.2f}" if pecinhas is not None else f"≈{next(estimativas):.2f}"
+
+                if manga.url:
+                    linhas.append(f"[{manga.title}]({manga.url}) - <a:gold_stud:1380069369580748840> **{criptogenes}** Pecinhas")
+                else:
+                    linhas.append(f"{manga.title} - <a:gold_stud:1380069369580748840> **{criptogenes}** Pecinhas")
+            else:
+                if isinstance(manga, Exception):
+                    logger.warning(f"Erro ao buscar mangá {manga_id} para paginação: {manga}")
+                falhou = True
+                linhas.append(f"Manga ID {manga_id} (Falha ao buscar informações)")
+
+        if falhou:
+            # Páginas com falhas não ficam memorizadas, para serem buscadas de novo na próxima visita
+            self._paginas.pop(pagina, None)
+
+        return linhas
+
     @discord.ui.button(label="Anterior", style=discord.ButtonStyle.gray, custom_id="previous_page")
     async def previous_button(self, button_interaction: discord.Interaction, button: discord.ui.Button):
         """Botão para página anterior"""
+        await button_interaction.response.defer()
         if self.current_page > 0:
             self.current_page -= 1
             self.update_buttons()
             embed = await self.generate_embed()
-            await button_interaction.response.edit_message(embed=embed, view=self)
-        else:
-            await button_interaction.response.defer()
-    
+            await button_interaction.edit_original_response(embed=embed, view=self)
+
     @discord.ui.button(label="Próxima", style=discord.ButtonStyle.gray, custom_id="next_page")
     async def next_button(self, button_interaction: discord.Interaction, button: discord.ui.Button):
         """Botão para próxima página"""
+        await button_interaction.response.defer()
         if self.current_page < self.total_pages - 1:
             self.current_page += 1
             self.update_buttons()
             embed = await self.generate_embed()
-            await button_interaction.response.edit_message(embed=embed, view=self)
-        else:
-            await button_interaction.response.defer()
+            await button_interaction.edit_original_response(embed=embed, view=self)